@@ -24,7 +24,7 @@ import * as MealPlanController from "./controllers/MealPlanController";
 import * as KioskController from "./controllers/KioskController";
 import * as ShoppingListController from "./controllers/ShoppingListController";
 import * as ShoppingTripController from "./controllers/ShoppingTripController";
-import { isAuthenticated } from "./middleware/auth";
+import { isAuthenticated, isKioskAuthenticated } from "./middleware/auth";
 
 import * as LabelPrinterController from "./controllers/labelPrinterController";
 import * as EquipmentController from "./controllers/EquipmentController";
@@ -226,6 +226,9 @@ app.get("/auth/oauth/callback",
     AuthController.oauthCallback
 );
 
+// Kiosk product cache sync (product_cache.py via the kiosk bridge), with the kiosk's own token
+app.get("/barcodes/index", isKioskAuthenticated, ProductsController.getBarcodeIndex);
+
 // All routes below this are protected
 app.use(isAuthenticated);
 
@@ -220,4 +220,39 @@ export const searchProductByBarcode = async (req: Request, res: Response, next:
     }
 
     res.send(productBarcode.product);
-}
\ No newline at end of file
+}
+
+export const getBarcodeIndex = async (req: Request, res: Response, next: NextFunction): Promise<any> => {
+    // Compact barcode -> product rows for kiosk-side caches. With ?since= only
+    // rows whose barcode or product changed after that time are returned;
+    // deletions are only picked up by a full fetch.
+    const since = req.query.since ? new Date(req.query.since as string) : null;
+    if (since && isNaN(since.getTime())) {
+        res.status(400).send({ error: 'Invalid since timestamp' });
+        return;
+    }
+
+    // Taken before the query so nothing changed meanwhile is missed next time
+    const generatedAt = new Date();
+
+    const barcodes = await prisma.productBarcode.findMany({
+        where: since ? {
+            OR: [
+                { updatedAt: { gt: since } },
+                { product: { updatedAt: { gt: since } } }
+            ]
+        } : undefined,
+        select: {
+            barcode: true,
+            productId: true,
+            product: { select: { title: true } }
+        }
+    });
+
+    res.send({
+        generatedAt: generatedAt.toISOString(),
+        full: !since,
+        columns: ['barcode', 'productId', 'title'],
+        rows: barcodes.map(b => [b.barcode, b.productId, b.product.title])
+    });
+}
@@ -287,10 +287,22 @@ io.on("connection", (socket) => {
         }
     });
 
-    socket.on("barcode_scan", (data) => {
+    socket.on("barcode_scan", async (data) => {
         if (kioskId) {
             // Scanner is configured to prefix all barcodes with '/' — strip it
             let barcode = (data.barcode || '').replace(/^\//, '');
+            // The kiosk sends a canonical code (UPC-E expanded, GS1 reduced to the GTIN, ...)
+            // plus the scanned form in data.raw; products saved before may only know the latter
+            if (data.raw && data.raw !== barcode) {
+                try {
+                    const known = await prisma.productBarcode.findUnique({ where: { barcode } });
+                    if (!known && await prisma.productBarcode.findUnique({ where: { barcode: data.raw } })) {
+                        barcode = data.raw;
+                    }
+                } catch (e) {
+                    console.error("Error resolving raw barcode", e);
+                }
+            }
             data.barcode = barcode;
             const barcodeType = mqttService.determineBarcodeType(barcode);
             console.log(`Received barcode_scan from Kiosk ${kioskId}: ${barcode} (Type: ${barcodeType})`);
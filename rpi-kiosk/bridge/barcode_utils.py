@@ -0,0 +1,240 @@
+"""Barcode validation and normalization for the scanner bridge.
+
+normalize() turns whatever the scanner typed into a canonical lookup code:
+  - strips the '/' prefix the scanners are configured with (the backend does
+    the same, so doing it here is harmless) and any AIM symbology identifier
+  - validates EAN-13 / EAN-8 / UPC-A / UPC-E / GTIN-14 check digits
+  - expands UPC-E to UPC-A (see _classify_numeric for UPC-E vs EAN-8)
+  - parses GS1 element strings, both "(01)...(17)..." and the raw form, and
+    reduces them to the product code plus dates / batch
+  - recognises the pantry's own QR codes (S2-/SK- stock items, R- recipes,
+    E- equipment, HA: Home Assistant actions) and canonicalises their prefix
+Everything else (Code 128 text, URLs, ...) passes through untouched.
+
+When the canonical code differs from what was scanned, the scanned form
+(prefix and AIM identifier stripped) is kept in "raw": products saved
+before normalization may be stored under it.
+"""
+import re
+import datetime
+from functools import lru_cache
+
+# Pantry codes, checked in order: (compiled pattern, type, canonical prefix)
+INTERNAL_PATTERNS = (
+    (re.compile(r'^s2-(\d+)$', re.IGNORECASE), 'StockItem', 'S2-'),
+    (re.compile(r'^sk-(\d+)$', re.IGNORECASE), 'StockItem', 'SK-'),
+    (re.compile(r'^r-(\d+)$', re.IGNORECASE), 'Recipe', 'R-'),
+    (re.compile(r'^e-(\d+)$', re.IGNORECASE), 'Equipment', 'E-'),
+    (re.compile(r'^ha:(.+)$', re.IGNORECASE | re.DOTALL), 'HomeAssistant', 'HA:'),
+)
+
+# AIM symbology identifiers some scanners prepend, e.g. "]E0" for EAN-13
+AIM_PREFIX = re.compile(r'^\][A-Za-z][0-9A-Za-z]')
+AIM_GS1 = {']C1', ']e0', ']d2', ']Q3', ']J1'}
+
+NUMERIC = re.compile(r'^\d+$')
+GTIN_LENGTHS = (8, 12, 13, 14)
+GS1_BRACKETED = re.compile(r'\((\d{2,4})\)([^(]*)')
+
+# GS1 application identifiers: AI -> (name, fixed length or None, is date)
+# Variable length fields end at a GS (0x1d) or at the end of the string.
+GS1_AIS = {
+    '00': ('sscc', 18, False),
+    '01': ('gtin', 14, False),
+    '02': ('content_gtin', 14, False),
+    '10': ('batch', None, False),
+    '11': ('production_date', 6, True),
+    '13': ('packaging_date', 6, True),
+    '15': ('best_before', 6, True),
+    '16': ('sell_by', 6, True),
+    '17': ('expiry', 6, True),
+    '21': ('serial', None, False),
+    '30': ('count', None, False),
+    '37': ('count', None, False),
+}
+# Four digit AIs sharing a three digit prefix; the last digit is the number
+# of decimals in the six digit value
+GS1_MEASURE_AIS = {
+    '310': 'net_weight_kg',
+    '320': 'net_weight_lb',
+}
+GS1_MAX_VARIABLE = 20
+GS = '\x1d'
+
+def gtin_check_digit(body):
+    """Mod-10 check digit for the digits of a GTIN without its check digit."""
+    total = 0
+    # Weights alternate 3,1,3,... starting from the rightmost body digit
+    for i, digit in enumerate(reversed(body)):
+        total += (ord(digit) - 48) * (3 if i % 2 == 0 else 1)
+    return str((10 - total % 10) % 10)
+
+def is_valid_gtin(code):
+    return len(code) > 1 and code[-1] == gtin_check_digit(code[:-1])
+
+def expand_upce(code):
+    """Expands an 8 digit UPC-E (number system + 6 digits + check) to UPC-A."""
+    ns, d, check = code[0], code[1:7], code[7]
+    last = d[5]
+    if last in '012':
+        body = d[0:2] + last + '0000' + d[2:5]
+    elif last == '3':
+        body = d[0:3] + '00000' + d[3:5]
+    elif last == '4':
+        body = d[0:4] + '00000' + d[4]
+    else:
+        body = d[0:5] + '0000' + last
+    return ns + body + check
+
+def _gs1_date(value):
+    """YYMMDD to ISO date, DD=00 meaning the last day of the month."""
+    try:
+        yy, mm, dd = int(value[0:2]), int(value[2:4]), int(value[4:6])
+        # GS1 century rule: within -49..+50 years of today
+        this_year = datetime.date.today().year
+        year = this_year - this_year % 100 + yy
+        if year - this_year > 50:
+            year -= 100
+        elif year - this_year < -49:
+            year += 100
+        if dd == 0:
+            next_month = datetime.date(year + mm // 12, mm % 12 + 1, 1)
+            return (next_month - datetime.timedelta(days=1)).isoformat()
+        return datetime.date(year, mm, dd).isoformat()
+    except ValueError:
+        return None
+
+def _gs1_field(ai, value, fields):
+    if ai in GS1_AIS:
+        name, _, is_date = GS1_AIS[ai]
+        if is_date:
+            value = _gs1_date(value)
+            if value is None:
+                return False
+        fields[name] = value
+        return True
+    name = GS1_MEASURE_AIS.get(ai[:3])
+    if name and len(ai) == 4 and NUMERIC.match(value):
+        decimals = int(ai[3])
+        fields[name] = str(int(value) / (10 ** decimals))
+        return True
+    return False
+
+def parse_gs1(text):
+    """Parses a GS1 element string into {field: value}, or None if it isn't one."""
+    fields = {}
+    if text.startswith('('):
+        pos = 0
+        for match in GS1_BRACKETED.finditer(text):
+            if match.start() != pos or not _gs1_field(match.group(1), match.group(2), fields):
+                return None
+            pos = match.end()
+        return fields if pos == len(text) and fields else None
+
+    pos = 0
+    while pos < len(text):
+        if text[pos] == GS:
+            pos += 1
+            continue
+        ai = text[pos:pos + 2]
+        if ai in GS1_AIS:
+            length = GS1_AIS[ai][1]
+            pos += 2
+        elif text[pos:pos + 3] in GS1_MEASURE_AIS:
+            ai = text[pos:pos + 4]
+            length = 6
+            pos += 4
+        else:
+            return None
+        if length is None:
+            end = text.find(GS, pos)
+            if end < 0:
+                end = len(text)
+            if end - pos > GS1_MAX_VARIABLE:
+                return None
+        else:
+            end = pos + length
+            if end > len(text):
+                return None
+        if not _gs1_field(ai, text[pos:end], fields):
+            return None
+        pos = end
+    return fields or None
+
+def _classify_numeric(code):
+    """(canonical, type, valid) for an all-digit code.
+
+    8 digits are ambiguous: most number system 0/1 UPC-E codes also pass the
+    EAN-8 check. UPC-E wins whenever its UPC-A expansion validates, as EAN-8
+    codes starting with 0 or 1 are rare (restricted circulation and a few
+    national prefixes); everything else is EAN-8.
+    """
+    length = len(code)
+    if length == 13:
+        return code, 'EAN13', is_valid_gtin(code)
+    if length == 12:
+        return code, 'UPCA', is_valid_gtin(code)
+    if length == 14:
+        if not is_valid_gtin(code):
+            return code, 'GTIN14', False
+        # GTIN-14 with indicator 0 is just an EAN-13 with padding
+        if code[0] == '0':
+            return code[1:], 'EAN13', True
+        return code, 'GTIN14', True
+    if length == 8:
+        if code[0] in '01':
+            upca = expand_upce(code)
+            if is_valid_gtin(upca):
+                return upca, 'UPCE', True
+        return code, 'EAN8', is_valid_gtin(code)
+    return code, 'Other', True
+
+def _with_raw(result, text):
+    if result["barcode"] != text:
+        result["raw"] = text
+    return result
+
+@lru_cache(maxsize=1024)
+def normalize(raw):
+    """Returns {"barcode", "type", "valid", **extra fields} for a scanned string.
+
+    Results are cached; treat the returned dict as read-only.
+    """
+    text = raw.strip()
+    # Scanner is configured to prefix all barcodes with '/'
+    if text.startswith('/'):
+        text = text[1:]
+
+    gs1_hint = False
+    aim = AIM_PREFIX.match(text)
+    if aim:
+        gs1_hint = aim.group(0) in AIM_GS1
+        text = text[3:]
+
+    for pattern, barcode_type, prefix in INTERNAL_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return {"barcode": prefix + match.group(1), "type": barcode_type, "valid": True}
+
+    if not gs1_hint and len(text) in GTIN_LENGTHS and NUMERIC.match(text):
+        code, barcode_type, valid = _classify_numeric(text)
+        return _with_raw({"barcode": code, "type": barcode_type, "valid": valid}, text)
+
+    # Without an AIM identifier only GTIN-led element strings are taken as GS1
+    if gs1_hint or text.startswith('(') or (text.startswith('01') and len(text) > 16):
+        fields = parse_gs1(text)
+        if fields is not None:
+            result = {"type": "GS1", "valid": True}
+            gtin = fields.pop('gtin', None)
+            if gtin is not None:
+                code, _, valid = _classify_numeric(gtin)
+                result["barcode"] = code
+                result["valid"] = valid
+            else:
+                result["barcode"] = text
+            result.update(fields)
+            return _with_raw(result, text)
+        if gs1_hint:
+            return {"barcode": text, "type": "GS1", "valid": False}
+
+    return {"barcode": text, "type": "Other", "valid": bool(text)}
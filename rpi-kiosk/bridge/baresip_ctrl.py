@@ -0,0 +1,165 @@
+"""Client for baresip's ctrl_tcp module.
+
+ctrl_tcp takes the same commands as the menu module over a TCP socket,
+one netstring ("<length>:<data>,") per JSON message:
+
+    command   {"command": "dial", "params": "sip:100@pbx", "token": "7"}
+    response  {"response": true, "ok": true, "data": "...", "token": "7"}
+    event     {"event": true, "class": "call", "type": "CALL_INCOMING", "peeruri": ...}
+
+Responses carry the token of their command, so command() can wait for its
+own answer while events keep arriving. Events go to a callback on the
+reader thread, in the order baresip sent them.
+
+Standard library only: sip_bridge.py runs on the system interpreter.
+"""
+import json
+import time
+import socket
+import logging
+import itertools
+import threading
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 4444
+MAX_MESSAGE = 1 << 20
+
+class CtrlError(Exception):
+    pass
+
+def encode(msg):
+    data = json.dumps(msg, separators=(',', ':')).encode('utf-8')
+    return str(len(data)).encode('ascii') + b':' + data + b','
+
+class NetstringReader:
+    """Reassembles JSON messages from chunks of the netstring stream."""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, data):
+        self.buf.extend(data)
+        messages = []
+        while True:
+            colon = self.buf.find(b':')
+            if colon < 0:
+                if len(self.buf) > 10:
+                    raise CtrlError("Netstring length missing")
+                break
+            try:
+                length = int(self.buf[:colon])
+            except ValueError:
+                raise CtrlError(f"Bad netstring length {bytes(self.buf[:colon])!r}")
+            if length > MAX_MESSAGE:
+                raise CtrlError(f"Message too large ({length} bytes)")
+            end = colon + 1 + length
+            if len(self.buf) <= end:
+                break
+            if self.buf[end] != ord(','):
+                raise CtrlError("Netstring not terminated")
+            messages.append(json.loads(self.buf[colon + 1:end]))
+            del self.buf[:end + 1]
+        return messages
+
+class Client:
+    """Connection to one baresip process. command() is thread safe."""
+
+    def __init__(self, sock, on_event, on_close=None):
+        self.sock = sock
+        self.on_event = on_event
+        self.on_close = on_close
+        self.lock = threading.Lock()
+        self.tokens = itertools.count(1)
+        self.pending = {}
+        self.closed = False
+        self.thread = threading.Thread(target=self._read, name="baresip-ctrl", daemon=True)
+        self.thread.start()
+
+    def command(self, command, params=None, timeout=2.0):
+        """Runs a command and returns the response's data; CtrlError if it fails."""
+        token = str(next(self.tokens))
+        msg = {"command": command, "token": token}
+        if params is not None:
+            msg["params"] = params
+        waiter = {"done": threading.Event()}
+        with self.lock:
+            if self.closed:
+                raise CtrlError("Control connection closed")
+            self.pending[token] = waiter
+            try:
+                self.sock.sendall(encode(msg))
+            except OSError as e:
+                del self.pending[token]
+                raise CtrlError(f"Control send failed: {e}")
+        if not waiter["done"].wait(timeout):
+            with self.lock:
+                self.pending.pop(token, None)
+            raise CtrlError(f"No response to {command} within {timeout:.1f}s")
+        response = waiter.get("response")
+        if response is None:
+            raise CtrlError("Control connection closed")
+        if not response.get("ok", False):
+            raise CtrlError(response.get("data") or f"{command} failed")
+        return response.get("data")
+
+    def _read(self):
+        reader = NetstringReader()
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                for msg in reader.feed(data):
+                    if msg.get("response"):
+                        with self.lock:
+                            waiter = self.pending.pop(str(msg.get("token")), None)
+                        if waiter is not None:
+                            waiter["response"] = msg
+                            waiter["done"].set()
+                    elif msg.get("event"):
+                        try:
+                            self.on_event(msg)
+                        except Exception as e:
+                            logging.error(f"baresip event handler failed: {e}")
+        except (OSError, CtrlError, ValueError) as e:
+            if not self.closed:
+                logging.error(f"baresip control connection failed: {e}")
+        self.close()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending, self.pending = self.pending, {}
+        # Wake up commands still waiting; they see no response and raise
+        for waiter in pending.values():
+            waiter["done"].set()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        if self.on_close is not None:
+            self.on_close(self)
+
+def connect(on_event, on_close=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=5.0, alive=None):
+    """Connects to a baresip that is starting up, retrying until timeout.
+
+    alive() is checked between attempts so a baresip that died doesn't keep
+    us waiting. Returns a Client, or None.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.02
+    while True:
+        try:
+            sock = socket.create_connection((host, port), timeout=1.0)
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return Client(sock, on_event, on_close)
+        except OSError:
+            pass
+        if time.monotonic() >= deadline or (alive is not None and not alive()):
+            return None
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
@@ -0,0 +1,112 @@
+const net = require('net');
+const fs = require('fs');
+const EventEmitter = require('events');
+
+// Server side of bridge_ipc.py. Frame layout:
+//   uint32 header length | uint32 payload length | JSON header | payload
+// Helpers connect to the Unix socket, say hello ({ type: 'hello', helper })
+// and then exchange frames; one connection per helper.
+const PREFIX_SIZE = 8;
+const MAX_HEADER = 1 << 20;
+const MAX_PAYLOAD = 16 << 20;
+
+function encodeFrame(header, payload = Buffer.alloc(0)) {
+    const data = Buffer.from(JSON.stringify(header), 'utf8');
+    const prefix = Buffer.alloc(PREFIX_SIZE);
+    prefix.writeUInt32BE(data.length, 0);
+    prefix.writeUInt32BE(payload.length, 4);
+    return Buffer.concat([prefix, data, payload]);
+}
+
+class FrameReader {
+    constructor() {
+        this.buf = Buffer.alloc(0);
+    }
+
+    feed(chunk) {
+        this.buf = this.buf.length ? Buffer.concat([this.buf, chunk]) : chunk;
+        const frames = [];
+        while (this.buf.length >= PREFIX_SIZE) {
+            const headerLen = this.buf.readUInt32BE(0);
+            const payloadLen = this.buf.readUInt32BE(4);
+            if (headerLen > MAX_HEADER || payloadLen > MAX_PAYLOAD) {
+                throw new Error(`Frame too large (${headerLen}/${payloadLen} bytes)`);
+            }
+            const end = PREFIX_SIZE + headerLen + payloadLen;
+            if (this.buf.length < end) break;
+            const header = JSON.parse(this.buf.toString('utf8', PREFIX_SIZE, PREFIX_SIZE + headerLen));
+            const payload = this.buf.subarray(PREFIX_SIZE + headerLen, end);
+            this.buf = this.buf.subarray(end);
+            frames.push({ header, payload });
+        }
+        return frames;
+    }
+}
+
+// Emits ('message', helper, header, payload), ('connect', helper, hello)
+// and ('disconnect', helper).
+class IpcServer extends EventEmitter {
+    constructor(socketPath) {
+        super();
+        this.socketPath = socketPath;
+        this.clients = new Map();
+        this.server = null;
+    }
+
+    listen() {
+        // Left behind by a previous run
+        try { fs.unlinkSync(this.socketPath); } catch (e) { }
+        this.server = net.createServer(conn => this.accept(conn));
+        this.server.on('error', (err) => console.error('IPC server error:', err));
+        this.server.listen(this.socketPath);
+    }
+
+    accept(conn) {
+        const reader = new FrameReader();
+        let helper = null;
+
+        conn.on('data', (chunk) => {
+            let frames;
+            try {
+                frames = reader.feed(chunk);
+            } catch (e) {
+                console.error(`IPC protocol error from ${helper || 'unknown helper'}:`, e.message);
+                conn.destroy();
+                return;
+            }
+            frames.forEach(({ header, payload }) => {
+                if (header.type === 'hello') {
+                    helper = header.helper;
+                    this.clients.set(helper, conn);
+                    this.emit('connect', helper, header);
+                } else if (helper) {
+                    this.emit('message', helper, header, payload);
+                }
+            });
+        });
+
+        conn.on('error', (err) => console.error(`IPC connection error (${helper || 'unknown helper'}):`, err.message));
+
+        conn.on('close', () => {
+            // A restarted helper may already have replaced this connection
+            if (helper && this.clients.get(helper) === conn) {
+                this.clients.delete(helper);
+                this.emit('disconnect', helper);
+            }
+        });
+    }
+
+    isConnected(helper) {
+        const conn = this.clients.get(helper);
+        return !!conn && !conn.destroyed;
+    }
+
+    // Returns false if the helper isn't connected, so callers can fall back to stdin
+    send(helper, header, payload) {
+        if (!this.isConnected(helper)) return false;
+        this.clients.get(helper).write(encodeFrame(header, payload));
+        return true;
+    }
+}
+
+module.exports = { IpcServer, FrameReader, encodeFrame };
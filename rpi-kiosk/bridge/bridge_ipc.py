@@ -0,0 +1,128 @@
+"""Framed messages between the bridge helpers and server.js.
+
+Every message is one frame on a Unix stream socket:
+
+    uint32 header length | uint32 payload length | JSON header | payload
+
+(lengths big endian). The header is a JSON object with a "type"; the
+payload is optional raw bytes that never go through JSON. A helper opens
+one connection, introduces itself with a "hello" frame, then sends its
+events and receives its commands on it. bridge_ipc.js is the server side.
+
+server.js passes the socket path in KIOSK_IPC_SOCKET. Without it, or if
+the connection fails, connect() returns None and the helper keeps using
+stdout/stdin, which server.js still understands.
+
+Standard library only: sip_bridge.py runs on the system interpreter.
+"""
+import os
+import sys
+import json
+import socket
+import struct
+import threading
+
+SOCKET_ENV = "KIOSK_IPC_SOCKET"
+PREFIX = struct.Struct('>II')
+MAX_HEADER = 1 << 20
+MAX_PAYLOAD = 16 << 20
+
+class ProtocolError(Exception):
+    pass
+
+def encode(header, payload=b''):
+    data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return PREFIX.pack(len(data), len(payload)) + data + payload
+
+class FrameReader:
+    """Reassembles (header, payload) frames from chunks of the stream."""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, data):
+        self.buf.extend(data)
+        frames = []
+        while len(self.buf) >= PREFIX.size:
+            header_len, payload_len = PREFIX.unpack_from(self.buf)
+            if header_len > MAX_HEADER or payload_len > MAX_PAYLOAD:
+                raise ProtocolError(f"Frame too large ({header_len}/{payload_len} bytes)")
+            end = PREFIX.size + header_len + payload_len
+            if len(self.buf) < end:
+                break
+            header = json.loads(self.buf[PREFIX.size:PREFIX.size + header_len])
+            payload = bytes(self.buf[PREFIX.size + header_len:end])
+            del self.buf[:end]
+            frames.append((header, payload))
+        return frames
+
+class Client:
+    """One helper's connection to server.js. send() is thread safe."""
+
+    def __init__(self, helper, path):
+        self.helper = helper
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.lock = threading.Lock()
+        self.reader = FrameReader()
+        self.closed = False
+        if not self.send({"type": "hello", "helper": helper, "pid": os.getpid()}):
+            raise ConnectionError("IPC hello failed")
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self, header, payload=b''):
+        """Returns False once the connection is gone, so callers can fall back."""
+        if self.closed:
+            return False
+        frame = encode(header, payload)
+        try:
+            with self.lock:
+                self.sock.sendall(frame)
+            return True
+        except OSError as e:
+            sys.stderr.write(f"IPC send failed, falling back to stdout: {e}\n")
+            self.close()
+            return False
+
+    def read(self):
+        """Reads what is available (call when the socket is readable).
+
+        Returns a list of (header, payload) frames, or None at end of stream.
+        """
+        try:
+            data = self.sock.recv(65536)
+        except OSError:
+            data = b''
+        if not data:
+            self.close()
+            return None
+        return self.reader.feed(data)
+
+    def frames(self):
+        """Blocking iterator over incoming frames, for a reader thread."""
+        while True:
+            frames = self.read()
+            if frames is None:
+                return
+            yield from frames
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+def connect(helper):
+    """Returns a Client, or None when IPC isn't configured or reachable."""
+    path = os.environ.get(SOCKET_ENV)
+    if not path:
+        return None
+    try:
+        return Client(helper, path)
+    except (OSError, ConnectionError) as e:
+        sys.stderr.write(f"IPC unavailable ({path}): {e}, using stdout\n")
+        return None
@@ -0,0 +1,100 @@
+"""Minimal inotify wrapper (ctypes, no extra dependencies).
+
+Used by the bridge helpers to react to file system changes, e.g. scanners
+appearing in /dev/input/by-id, instead of polling. The Watcher exposes
+fileno() so it can be registered with selectors alongside other fds.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT = struct.Struct('iIII')
+
+_libc = None
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(name, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = libc
+    return _libc
+
+def _check(result):
+    if result < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return result
+
+class Watcher:
+    """An inotify instance. Raises OSError if inotify is unavailable."""
+
+    def __init__(self):
+        try:
+            libc = _get_libc()
+        except (OSError, AttributeError) as e:
+            raise OSError(errno.ENOSYS, f"inotify unavailable: {e}")
+        self._libc = libc
+        self.fd = _check(libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+        self.paths = {}
+
+    def fileno(self):
+        return self.fd
+
+    def add(self, path, mask):
+        """Watches path, returns the watch descriptor."""
+        wd = _check(self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask))
+        self.paths[wd] = path
+        return wd
+
+    def remove(self, wd):
+        self.paths.pop(wd, None)
+        try:
+            _check(self._libc.inotify_rm_watch(self.fd, wd))
+        except OSError:
+            pass
+
+    def read(self):
+        """Returns pending events as a list of (path, mask, name) tuples."""
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            path = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+            events.append((path, mask, name))
+        return events
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,210 @@
+"""Resident hardware service: one interpreter for the bridge drivers.
+
+server.js starts this once instead of a process per driver and a fresh
+interpreter per print job. Each driver is a component that runs its usual
+blocking loop on a daemon thread; the asyncio loop here only supervises
+them, restarting a component that raises or returns (with exponential
+backoff) while the others keep running.
+
+    scanner  scanner_bridge.ScannerHub             IPC helper "scanner"
+    scale    scale_bridge.run_monitor(hosted=True) IPC helper "scale"
+    printer  print_label / receipt_printer jobs    IPC helper "printer"
+    sip      sip_bridge.run_hosted()               IPC helper "sip"
+    mqtt     mqtt_bridge.main(), only with MQTT_BROKER set
+
+Components talk to server.js over bridge_ipc under the same helper names
+the separate scripts use, so server.js handles both the same way. Driver
+modules are imported by their component: a missing library only takes
+that component down (and keeps it retrying), not the service.
+
+    python3 hardware_service.py              # every component
+    python3 hardware_service.py scanner sip  # just these
+"""
+import os
+import time
+import signal
+import asyncio
+import logging
+import argparse
+import threading
+
+import metrics
+import bridge_ipc
+
+# Before the drivers are imported, so their basicConfig() calls are no-ops
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(threadName)s] %(message)s')
+logger = logging.getLogger("hardware_service")
+
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+STABLE_RUN = 60.0   # A component that ran this long restarts after RESTART_DELAY again
+
+def run_scanner():
+    import scanner_bridge
+
+    # Without IPC barcodes go to our stdout, which server.js also parses
+    scanner_bridge.ipc = bridge_ipc.connect("scanner")
+    hub = scanner_bridge.ScannerHub(scanner_bridge.DEFAULT_DEVICE_CONFIG)
+    try:
+        hub.run()
+    finally:
+        hub.close()
+        if scanner_bridge.ipc is not None:
+            scanner_bridge.ipc.close()
+
+def run_scale():
+    import scale_bridge
+
+    # server.js sends set_ports as soon as the "scale" helper connects
+    scale_bridge.run_monitor([], hosted=True)
+
+def print_label_job(job):
+    import print_label
+
+    args = argparse.Namespace(
+        input_file=job["file"],
+        model=job.get("model") or print_label.DEFAULT_MODEL,
+        printer=job.get("printer") or print_label.DEFAULT_PRINTER,
+        backend=job.get("backend") or print_label.DEFAULT_BACKEND
+    )
+    return print_label.print_label_cmd(args)
+
+def print_receipt_job(job):
+    import receipt_printer
+
+    return receipt_printer.print_receipt_cmd(argparse.Namespace(input_file=job["file"], printer=job["printer"]))
+
+PRINT_JOBS = {
+    "print_label": print_label_job,
+    "print_receipt": print_receipt_job,
+}
+
+def run_printer():
+    """Runs print jobs from server.js one at a time, answering print_complete."""
+    client = bridge_ipc.connect("printer")
+    if client is None:
+        raise ConnectionError("Printer component needs the bridge IPC socket")
+    try:
+        for job, _ in client.frames():
+            handler = PRINT_JOBS.get(job.get("cmd"))
+            if handler is None:
+                success, message = False, f"Unknown print command: {job.get('cmd')}"
+            else:
+                try:
+                    success = bool(handler(job))
+                    message = None if success else "Could not read the print job"
+                except SystemExit:
+                    # print_label.py exits when brother_ql can't be imported
+                    success, message = False, "Printer driver library missing"
+                except Exception as e:
+                    success, message = False, str(e) or type(e).__name__
+                if not success:
+                    logger.error(f"Print job {job.get('requestId')} failed: {message}")
+            client.send({"type": "print_complete", "requestId": job.get("requestId"),
+                         "success": success, "message": message})
+    finally:
+        client.close()
+    raise ConnectionError("Bridge IPC connection closed")
+
+def run_sip():
+    import sip_bridge
+    sip_bridge.run_hosted()
+
+def run_mqtt():
+    import mqtt_bridge
+    mqtt_bridge.main()
+
+COMPONENTS = {
+    "scanner": run_scanner,
+    "scale": run_scale,
+    "printer": run_printer,
+    "sip": run_sip,
+    "mqtt": run_mqtt,
+}
+
+def default_components():
+    names = list(COMPONENTS)
+    if not os.getenv("MQTT_BROKER"):
+        names.remove("mqtt")
+    return names
+
+def run_in_thread(name, target):
+    """Runs target on a daemon thread; the future gets the exception it ended with, or None.
+
+    Daemon threads rather than an executor: driver loops can't be cancelled,
+    and a thread stuck in a device read must not hold up shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def finish(result):
+        if not done.done():
+            done.set_result(result)
+
+    def run():
+        result = None
+        try:
+            target()
+        except BaseException as e:
+            result = e
+        try:
+            loop.call_soon_threadsafe(finish, result)
+        except RuntimeError:
+            # Loop already closed, the service is exiting
+            pass
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return done
+
+async def supervise(name, target):
+    up = metrics.gauge("hardware_component_up", "1 while the component is running", {"component": name})
+    restarts = metrics.counter("hardware_component_restarts_total", "Component restarts after a failure or exit",
+                               {"component": name})
+    delay = RESTART_DELAY
+    while True:
+        started = time.monotonic()
+        logger.info(f"Starting {name}")
+        up.set(1)
+        error = await run_in_thread(name, target)
+        up.set(0)
+
+        if time.monotonic() - started >= STABLE_RUN:
+            delay = RESTART_DELAY
+        if error is None:
+            logger.error(f"{name} returned, restarting in {delay:.0f}s")
+        else:
+            logger.error(f"{name} failed: {error!r}, restarting in {delay:.0f}s", exc_info=error)
+        restarts.inc()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_RESTART_DELAY)
+
+async def serve(names):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    tasks = [asyncio.create_task(supervise(name, COMPONENTS[name])) for name in names]
+    await stop.wait()
+    logger.info("Stopping")
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Kiosk hardware service')
+    parser.add_argument('components', nargs='*',
+                        help=f"Components to run: {', '.join(COMPONENTS)} (default: all, mqtt only with MQTT_BROKER set)")
+    args = parser.parse_args()
+    unknown = [name for name in args.components if name not in COMPONENTS]
+    if unknown:
+        parser.error(f"unknown component: {', '.join(unknown)}")
+    names = args.components or default_components()
+
+    metrics.start("hardware_service")
+    logger.info(f"Hardware service starting: {', '.join(names)}")
+    # Daemon threads end with the process; atexit still flushes metrics and scale config
+    asyncio.run(serve(names))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Lightweight metrics shared by the bridge helpers.
+
+Counters, gauges and fixed-bucket histograms that cost an attribute update
+(plus a bisect for histograms) on the hot path. Each process writes its
+values as JSON to METRICS_DIR/<job>.json; server.js merges those files into
+Prometheus text on GET /metrics.
+
+Long running helpers call start(job) and get a snapshot every few seconds.
+One-shot CLIs (print_label.py, receipt_printer.py) call
+start(job, accumulate=True): their values are added to the previous
+snapshot at exit so counters keep counting across invocations.
+
+    import metrics
+    SEND_TIME = metrics.histogram("label_send_seconds", "Time sending a label to the printer")
+    started = time.perf_counter()
+    ...
+    SEND_TIME.observe(time.perf_counter() - started)
+"""
+import os
+import json
+import time
+import fcntl
+import atexit
+import tempfile
+import threading
+from bisect import bisect_left
+
+METRICS_DIR = os.getenv("KIOSK_METRICS_DIR", "/tmp/kiosk_metrics")
+FLUSH_INTERVAL = 10.0
+
+# Seconds, from sub-millisecond parsing up to slow USB printing
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+_metrics = {}
+_lock = threading.Lock()
+_job = None
+_accumulate = False
+_thread = None
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+class Counter:
+    __slots__ = ('name', 'help', 'labels', 'value')
+    kind = "counter"
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dump(self):
+        return {"value": self.value}
+
+    def reset(self):
+        self.value = 0
+
+class Gauge(Counter):
+    __slots__ = ()
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def reset(self):
+        # A gauge is a current value, it isn't summed across flushes
+        pass
+
+class Histogram:
+    __slots__ = ('name', 'help', 'labels', 'buckets', 'counts', 'sum', 'count')
+    kind = "histogram"
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus +Inf, not cumulative
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def dump(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+def _get(cls, name, help, labels, *args):
+    key = _key(name, labels)
+    metric = _metrics.get(key)
+    if metric is None:
+        with _lock:
+            metric = _metrics.get(key)
+            if metric is None:
+                metric = cls(name, help, dict(labels or {}), *args)
+                _metrics[key] = metric
+    return metric
+
+def counter(name, help="", labels=None):
+    return _get(Counter, name, help, labels)
+
+def gauge(name, help="", labels=None):
+    return _get(Gauge, name, help, labels)
+
+def histogram(name, help="", labels=None, buckets=LATENCY_BUCKETS):
+    return _get(Histogram, name, help, labels, buckets)
+
+def snapshot():
+    with _lock:
+        metrics = list(_metrics.values())
+    return [dict(name=m.name, type=m.kind, help=m.help, labels=m.labels, **m.dump()) for m in metrics]
+
+def _path(job):
+    return os.path.join(METRICS_DIR, f"{job}.json")
+
+def _merge_previous(path, entries):
+    """Adds the counters/histograms of the last snapshot at path into entries.
+
+    Gauges are a current value and are not carried over.
+    """
+    try:
+        with open(path, 'r') as f:
+            previous = json.load(f).get("metrics", [])
+    except (OSError, ValueError):
+        return entries
+    by_key = {_key(e["name"], e["labels"]): e for e in previous}
+    merged = []
+    for entry in entries:
+        old = by_key.pop(_key(entry["name"], entry["labels"]), None)
+        if old is not None and old.get("type") == entry["type"]:
+            if entry["type"] == "counter":
+                entry["value"] += old.get("value", 0)
+            elif entry["type"] == "histogram" and old.get("buckets") == entry["buckets"]:
+                entry["counts"] = [a + b for a, b in zip(entry["counts"], old["counts"])]
+                entry["sum"] += old.get("sum", 0.0)
+                entry["count"] += old.get("count", 0)
+        merged.append(entry)
+    # Metrics this run never touched keep their old values
+    merged.extend(by_key.values())
+    return merged
+
+def flush():
+    """Writes this process's metrics to METRICS_DIR/<job>.json atomically."""
+    if _job is None:
+        return
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = _path(_job)
+        with open(path + ".lock", 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = snapshot()
+            if _accumulate:
+                entries = _merge_previous(path, entries)
+            fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, prefix=f".{_job}.")
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"job": _job, "pid": os.getpid(), "updated": time.time(), "metrics": entries}, f)
+            os.replace(tmp_path, path)
+            if _accumulate:
+                # Now part of the file, don't add them again on the next flush
+                with _lock:
+                    for metric in _metrics.values():
+                        metric.reset()
+    except Exception:
+        # Metrics must never break the helper they measure
+        pass
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+def start(job, accumulate=False):
+    """Names this process's metrics file and arranges for it to be written."""
+    global _job, _accumulate, _thread
+    if _job is None:
+        atexit.register(flush)
+    _job = job
+    _accumulate = accumulate
+    if not accumulate and _thread is None:
+        _thread = threading.Thread(target=_flush_loop, name="metrics", daemon=True)
+        _thread.start()
@@ -3,10 +3,19 @@ import json
 import logging
 import time
 import subprocess
+import threading
+import select
+import re
 import paho.mqtt.client as mqtt
 import socket
-import urllib.request
-import json
+import http.client
+import queue
+import uuid
+import urllib.parse
+from collections import OrderedDict
+
+import fswatch
+import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -14,11 +23,19 @@ logger = logging.getLogger("MQTTBridge")
 
 # Globals for current state
 current_display_state = "ON"
+display_monitor = None
+
+# With a persistent X connection a DPMS query is one round trip on an open
+# socket, so it can run often; the xset fallback forks and stays at 2 s.
+DPMS_POLL_INTERVAL = 1.0
+XSET_POLL_INTERVAL = 2.0
+X_RECONNECT_INTERVAL = 30.0
 CONFIG_FILE = "kiosk_config.json"
 if os.path.exists('/data'):
     CONFIG_FILE = "/data/kiosk_config.json"
 
 def get_config():
+    """Returns (device_id, device_name), or None if the file can't be read."""
     # Defaults from Env
     device_id = os.getenv('KIOSK_ID', 'pantry_kiosk')
     device_name = os.getenv('KIOSK_NAME', 'Pantry Kiosk')
@@ -33,24 +50,275 @@ def get_config():
                 logger.info(f"Loaded config from file: {device_name} ({device_id})")
         except Exception as e:
             logger.error(f"Error reading config file: {e}")
+            return None
 
     return device_id, device_name
 
-def notify_bridge_server(state):
-    try:
-        url = "http://localhost:8080/display-state"
-        data = json.dumps({"state": state}).encode('utf-8')
-        req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
-        with urllib.request.urlopen(req) as response:
-            if response.getcode() == 200:
+class ConfigWatcher:
+    """Reports completed writes of CONFIG_FILE.
+
+    Watches the containing directory with inotify so the file may be created,
+    rewritten or replaced; falls back to mtime polling without inotify.
+    """
+
+    POLL_INTERVAL = 2.0
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = os.path.abspath(path)
+        self.name = os.path.basename(self.path)
+        self.mtime = self._mtime()
+        try:
+            self.watcher = fswatch.Watcher()
+            self.watcher.add(os.path.dirname(self.path), fswatch.IN_CLOSE_WRITE | fswatch.IN_MOVED_TO)
+        except OSError as e:
+            logger.warning(f"inotify unavailable ({e}), polling {self.path}")
+            self.watcher = None
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return 0
+
+    def wait(self, timeout=None):
+        """Blocks until the config file has been written. False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if self.watcher is None:
+                time.sleep(self.POLL_INTERVAL if remaining is None else min(self.POLL_INTERVAL, remaining))
+                mtime = self._mtime()
+                if mtime != self.mtime:
+                    self.mtime = mtime
+                    return True
+            else:
+                ready, _, _ = select.select([self.watcher], [], [], remaining)
+                if ready and any(name == self.name for _, _, name in self.watcher.read()):
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+class BridgeConnection:
+    """Keep-alive HTTP connection to the local bridge server (server.js)."""
+
+    HOST = "localhost"
+    PORT = 8080
+    TIMEOUT = 5
+
+    def __init__(self, timeout=None):
+        self.conn = None
+        self.timeout = timeout or self.TIMEOUT
+
+    def request(self, method, path, payload=None):
+        """Returns the decoded JSON response, raises on errors and non-200 replies."""
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        # A kept-alive connection may have been closed by the server while
+        # idle; that gets one immediate retry on a fresh connection.
+        reused = self.conn is not None
+        while True:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.HOST, self.PORT, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body, headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                self.close()
+                if not reused:
+                    raise
+                reused = False
+                continue
+            except Exception:
+                self.close()
+                raise
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            return json.loads(data) if data else None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class BridgeNotifier:
+    """Delivers display state to the bridge server from a background thread.
+
+    notify() only records the latest state and returns, so the paho network
+    thread never waits on HTTP. Rapid flips collapse into the last state, the
+    connection to the bridge server is kept alive between posts, and failed
+    posts are retried with backoff unless a newer state supersedes them.
+    """
+
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 0.5  # doubles per attempt
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = None
+        self.delivered = None
+        self.bridge = BridgeConnection()
+        self.thread = None
+
+    def notify(self, state):
+        with self.cond:
+            self.pending = state
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="bridge-notifier", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None:
+                    self.cond.wait()
+                state = self.pending
+                self.pending = None
+            if state != self.delivered:
+                self._deliver(state)
+
+    def _deliver(self, state):
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                self._post(state)
+                self.delivered = state
                 logger.info(f"Notified bridge server of display state: {state}")
-    except Exception as e:
-        logger.error(f"Failed to notify bridge server: {e}")
+                return
+            except Exception as e:
+                logger.error(f"Failed to notify bridge server (attempt {attempt + 1}): {e}")
+            with self.cond:
+                # Wakes early when a newer state arrives, which replaces this one
+                if self.pending is None:
+                    self.cond.wait(self.RETRY_DELAY * (2 ** attempt))
+                if self.pending is not None:
+                    return
+        logger.error(f"Giving up notifying bridge server of display state: {state}")
 
-def set_display(state):
-    global current_display_state
-    target = state.upper()
-    
+    def _post(self, state):
+        started = time.perf_counter()
+        try:
+            self.bridge.request("POST", "/display-state", {"state": state})
+        except Exception:
+            NOTIFY_ERRORS.inc()
+            raise
+        NOTIFY_TIME.observe(time.perf_counter() - started)
+
+bridge_notifier = BridgeNotifier()
+
+MESSAGE_TIME = metrics.histogram("mqtt_message_seconds", "Handling one MQTT command message")
+NOTIFY_TIME = metrics.histogram("mqtt_notify_seconds", "POSTing a display state to the bridge server")
+NOTIFY_ERRORS = metrics.counter("mqtt_notify_errors_total", "Failed display state POSTs")
+
+def notify_bridge_server(state):
+    bridge_notifier.notify(state)
+
+class DisplayMonitor:
+    """Tracks the monitor's DPMS state and reports changes from a background thread.
+
+    Uses a long-lived python-xlib connection with the DPMS extension when
+    available, otherwise falls back to `xset`. Forcing the display through
+    force() wakes the thread so the new state is confirmed right away.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.display = None
+        self.dpms = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = None
+        self.reconnect_at = None
+        self.connect()
+
+    def connect(self):
+        try:
+            from Xlib import display as xdisplay
+            from Xlib.ext import dpms
+            disp = xdisplay.Display()
+            if not disp.has_extension('DPMS'):
+                disp.close()
+                raise RuntimeError("X server has no DPMS extension")
+            self.display = disp
+            self.dpms = dpms
+            logger.info("Watching display state through X DPMS")
+        except Exception as e:
+            logger.warning(f"X DPMS unavailable ({e}), falling back to xset")
+            self.display = None
+            # At boot X is usually not up yet; keep trying
+            self.reconnect_at = time.monotonic() + X_RECONNECT_INTERVAL
+
+    def _drop(self, e):
+        logger.error(f"X connection lost: {e}")
+        try:
+            self.display.close()
+        except Exception:
+            pass
+        self.display = None
+        self.reconnect_at = time.monotonic() + X_RECONNECT_INTERVAL
+
+    def query(self):
+        with self.lock:
+            if self.display is not None:
+                try:
+                    info = self.display.dpms_info()
+                    if not info.state:
+                        # DPMS disabled, xset q doesn't report a monitor state either
+                        return None
+                    return "ON" if info.power_level == self.dpms.DPMSModeOn else "OFF"
+                except Exception as e:
+                    self._drop(e)
+        return check_display_state()
+
+    def force(self, target):
+        """Switches the monitor ON or OFF, raises on failure."""
+        with self.lock:
+            if self.display is not None:
+                try:
+                    from Xlib import X
+                    if target == "ON":
+                        # Same as xset s reset / dpms 0 0 0 / dpms force on
+                        self.display.force_screen_saver(X.ScreenSaverReset)
+                        self.display.dpms_set_timeouts(0, 0, 0)
+                        self.display.dpms_enable()
+                        self.display.dpms_force_level(self.dpms.DPMSModeOn)
+                    else:
+                        self.display.dpms_enable()
+                        self.display.dpms_force_level(self.dpms.DPMSModeOff)
+                    self.display.sync()
+                    self.wake.set()
+                    return
+                except Exception as e:
+                    self._drop(e)
+        xset_display(target)
+        self.wake.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="display-monitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+    def _run(self):
+        global current_display_state
+        while not self.stopped:
+            if self.display is None and self.reconnect_at is not None and time.monotonic() >= self.reconnect_at:
+                self.connect()
+            actual_state = self.query()
+            if actual_state and actual_state != current_display_state:
+                logger.info(f"Display state sync: {current_display_state} -> {actual_state}")
+                current_display_state = actual_state
+                if self.on_change:
+                    self.on_change(actual_state)
+            interval = DPMS_POLL_INTERVAL if self.display is not None else XSET_POLL_INTERVAL
+            self.wake.wait(interval)
+            self.wake.clear()
+
+def xset_display(target):
     cmd_args = []
     if target == "ON":
         cmd_args = ['xset', 'dpms', 'force', 'on']
@@ -61,14 +329,25 @@ def set_display(state):
              pass
     else:
         cmd_args = ['xset', 'dpms', 'force', 'off']
+    subprocess.run(cmd_args, check=True)
 
+def set_display(state):
+    global current_display_state
+    target = state.upper()
+
+    # Set first so the monitor thread doesn't report our own change back
+    previous = current_display_state
+    current_display_state = target
     try:
-        subprocess.run(cmd_args, check=True)
-        current_display_state = target
+        if display_monitor is not None:
+            display_monitor.force(target)
+        else:
+            xset_display(target)
         logger.info(f"Display set to {target}")
         notify_bridge_server(target)
         return True
     except Exception as e:
+        current_display_state = previous
         logger.error(f"Failed to set display: {e}")
         return False
 
@@ -85,8 +364,320 @@ def check_display_state():
         logger.error(f"Error checking display state: {e}")
     return None
 
-def run_mqtt(device_id, device_name):
-    global current_display_state
+def device_info(device_id, device_name):
+    """Home Assistant device block shared by every entity of this kiosk."""
+    return {
+        "identifiers": [device_id],
+        "name": device_name,
+        "model": "Raspberry Pi Kiosk",
+        "manufacturer": "Pantry App",
+        "sw_version": "1.1"
+    }
+
+# Telemetry is sampled every TELEMETRY_INTERVAL and published as one retained
+# JSON message when any value moved past its deadband (or at least every
+# TELEMETRY_MAX_SILENCE seconds), with one discovered sensor per key.
+TELEMETRY_INTERVAL = 5.0
+TELEMETRY_MAX_SILENCE = 300.0
+
+# key -> (name, unit, device_class, state_class, icon, deadband)
+# A deadband of None publishes on any change (text and timestamps).
+SYSTEM_SENSORS = {
+    "cpu_temperature": ("CPU Temperature", "°C", "temperature", "measurement", None, 1.0),
+    "memory_used": ("Memory Used", "%", None, "measurement", "mdi:memory", 2.0),
+    "scans": ("Barcode Scans", None, None, "total_increasing", "mdi:barcode-scan", 0),
+    "last_scan": ("Last Barcode Scan", None, "timestamp", None, "mdi:barcode-scan", None),
+}
+# A sensor value that is known to be unavailable (published as null, which Home
+# Assistant shows as unknown), as opposed to None for "missing from this sample"
+UNAVAILABLE = object()
+
+SCALE_WEIGHT_SENSOR = ("{name} Weight", "g", "weight", "measurement", "mdi:scale", 2.0)
+PRINTER_STATUS_SENSOR = ("{name} Status", None, None, None, "mdi:printer", None)
+PRINTER_MEDIA_SENSOR = ("{name} Media", None, None, None, "mdi:label-outline", None)
+
+def read_cpu_temperature():
+    try:
+        with open('/sys/class/thermal/thermal_zone0/temp') as f:
+            return round(int(f.read().strip()) / 1000.0, 1)
+    except (OSError, ValueError):
+        return None
+
+def read_memory_used():
+    try:
+        info = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                info[key] = int(value.split()[0])
+        return round(100.0 * (1 - info['MemAvailable'] / info['MemTotal']), 1)
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return None
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+class Telemetry:
+    """Publishes kiosk hardware telemetry as Home Assistant sensors.
+
+    System values come from /proc and /sys, scale, printer and scanner state
+    from the bridge server's /telemetry endpoint.
+    """
+
+    def __init__(self, client, device_id, device_name, topic_availability):
+        self.client = client
+        self.device_id = device_id
+        self.device_name = device_name
+        self.topic_availability = topic_availability
+        self.topic = f"pantry/{device_id}/telemetry"
+        self.bridge = BridgeConnection()
+        self.sensors = {}
+        self.discovered = set()
+        self.values = {}
+        self.published = {}
+        self.last_publish = 0
+        self.bridge_error = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.bridge.close()
+
+    def on_connected(self):
+        # Retained discovery may be gone (broker restart), send everything again
+        self.discovered.clear()
+        self.published = {}
+
+    def set_name(self, device_name):
+        self.device_name = device_name
+        self.discovered.clear()
+
+    def sample(self):
+        values = {}
+        sensors = {}
+        for key, spec in SYSTEM_SENSORS.items():
+            sensors[key] = spec
+        values["cpu_temperature"] = read_cpu_temperature()
+        values["memory_used"] = read_memory_used()
+
+        try:
+            data = self.bridge.request("GET", "/telemetry") or {}
+            self.bridge_error = None
+        except Exception as e:
+            if str(e) != self.bridge_error:
+                logger.warning(f"Bridge telemetry unavailable: {e}")
+                self.bridge_error = str(e)
+            data = {}
+
+        scanner = data.get("scanner") or {}
+        if scanner:
+            values["scans"] = scanner.get("scans")
+            values["last_scan"] = scanner.get("lastScanAt")
+        for port, state in (data.get("scales") or {}).items():
+            key = f"scale_{_slug(os.path.basename(port))}_weight"
+            sensors[key] = self._named(SCALE_WEIGHT_SENSOR, f"Scale {os.path.basename(port)}")
+            # A scale on its side reads nonsense; don't keep reporting the weight from before
+            values[key] = UNAVAILABLE if state.get("storageMode") else state.get("weight")
+        for identifier, state in (data.get("printers") or {}).items():
+            slug = _slug(identifier)
+            sensors[f"printer_{slug}_status"] = self._named(PRINTER_STATUS_SENSOR, "Label Printer")
+            sensors[f"printer_{slug}_media"] = self._named(PRINTER_MEDIA_SENSOR, "Label Printer")
+            values[f"printer_{slug}_status"] = state.get("status")
+            values[f"printer_{slug}_media"] = state.get("media")
+
+        self.sensors.update(sensors)
+        # Keep the last known value of sensors missing from this sample
+        for key, value in values.items():
+            if value is UNAVAILABLE:
+                self.values[key] = None
+            elif value is not None or key not in self.values:
+                self.values[key] = value
+        return self.values
+
+    @staticmethod
+    def _named(spec, name):
+        return (spec[0].format(name=name),) + spec[1:]
+
+    def changed(self, values):
+        for key, value in values.items():
+            old = self.published.get(key)
+            if key not in self.published:
+                return True
+            deadband = self.sensors[key][5]
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and deadband is not None:
+                if abs(value - old) > deadband:
+                    return True
+            elif value != old:
+                return True
+        return False
+
+    def publish_discovery(self, key):
+        name, unit, device_class, state_class, icon, _ = self.sensors[key]
+        config = {
+            "name": f"{self.device_name} {name}",
+            "unique_id": f"{self.device_id}_{key}",
+            "state_topic": self.topic,
+            "value_template": "{{ value_json.%s }}" % key,
+            "availability_topic": self.topic_availability,
+            "device": device_info(self.device_id, self.device_name)
+        }
+        if unit:
+            config["unit_of_measurement"] = unit
+        if device_class:
+            config["device_class"] = device_class
+        if state_class:
+            config["state_class"] = state_class
+        if icon:
+            config["icon"] = icon
+        self.client.publish(f"homeassistant/sensor/{self.device_id}_{key}/config",
+                            json.dumps(config), retain=True)
+        self.discovered.add(key)
+
+    def tick(self, now):
+        values = self.sample()
+        for key in self.sensors:
+            if key not in self.discovered:
+                self.publish_discovery(key)
+        if self.changed(values) or now - self.last_publish >= TELEMETRY_MAX_SILENCE:
+            self.client.publish(self.topic, json.dumps(values), retain=True)
+            self.published = dict(values)
+            self.last_publish = now
+
+    def _run(self):
+        while not self.stopped.wait(TELEMETRY_INTERVAL):
+            try:
+                self.tick(time.monotonic())
+            except Exception as e:
+                logger.error(f"Telemetry error: {e}")
+
+# MQTT command topics: a JSON request on pantry/<id>/<command> is answered on
+# pantry/<id>/<command>/response. Each command maps to a worker lane so a tare
+# never waits behind a slow print; the timeout covers the bridge server's
+# print queue.
+COMMAND_LANES = {
+    "print-label": "print",
+    "print-receipt": "print",
+    "tare": "scale",
+    "read-weight": "scale",
+}
+COMMAND_TIMEOUTS = {"print": 120, "scale": 20}
+LABEL_TYPES = ("QUICK_LABEL", "STOCK_LABEL", "SAMPLE_LABEL", "MODIFIER_LABEL", "RECIPE_LABEL", "CUSTOM_QR_LABEL")
+RECEIPT_TYPES = ("RECEIPT", "CUSTOM_QR_RECEIPT")
+RECENT_REQUESTS = 64
+
+class CommandHandler:
+    """Runs MQTT commands against the local bridge server's HTTP API.
+
+    Requests are JSON objects with an optional requestId that is echoed in the
+    response; both directions use QoS 1. QoS 1 may deliver a request twice, so
+    a recently seen requestId is not run again, its response is republished.
+    """
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.recent = OrderedDict()  # requestId -> response, None while running
+        self.queues = {}
+        for lane, timeout in COMMAND_TIMEOUTS.items():
+            q = queue.Queue()
+            self.queues[lane] = q
+            threading.Thread(target=self._run, args=(q, BridgeConnection(timeout)),
+                             name=f"commands-{lane}", daemon=True).start()
+
+    def topics(self):
+        return [(f"{self.prefix}/{command}", 1) for command in COMMAND_LANES]
+
+    def command_for(self, topic):
+        command = topic[len(self.prefix) + 1:] if topic.startswith(self.prefix + "/") else None
+        return command if command in COMMAND_LANES else None
+
+    def submit(self, command, payload):
+        """Called from the paho thread; only queues the request."""
+        try:
+            request = json.loads(payload) if payload.strip() else {}
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self.respond(command, {"requestId": None, "success": False, "message": f"Invalid request: {e}"})
+            return
+
+        request_id = request.get("requestId")
+        if request_id is not None:
+            with self.lock:
+                duplicate = request_id in self.recent
+                response = self.recent.get(request_id)
+                if not duplicate:
+                    self.recent[request_id] = None
+                    while len(self.recent) > RECENT_REQUESTS:
+                        self.recent.popitem(last=False)
+            if duplicate:
+                if response is not None:
+                    self.respond(command, response)
+                return
+        self.queues[COMMAND_LANES[command]].put((command, request_id, request))
+
+    def respond(self, command, response):
+        self.client.publish(f"{self.prefix}/{command}/response", json.dumps(response), qos=1)
+
+    def stop(self):
+        for q in self.queues.values():
+            q.put(None)
+
+    def _run(self, q, bridge):
+        while True:
+            item = q.get()
+            if item is None:
+                bridge.close()
+                return
+            command, request_id, request = item
+            logger.info(f"MQTT command {command} ({request_id})")
+            started = time.perf_counter()
+            try:
+                response = self.execute(bridge, command, request)
+            except Exception as e:
+                logger.error(f"MQTT command {command} failed: {e}")
+                response = {"success": False, "message": str(e)}
+            metrics.histogram("mqtt_command_seconds", "MQTT command round trip through the bridge server",
+                              {"command": command}).observe(time.perf_counter() - started)
+            response = dict(response or {}, requestId=request_id)
+            with self.lock:
+                if request_id in self.recent:
+                    self.recent[request_id] = response
+            self.respond(command, response)
+
+    def execute(self, bridge, command, request):
+        # The bridge server gets its own requestId (it ends up in temp file
+        # names); the caller's is only used for correlation here
+        local_id = f"mqtt-{uuid.uuid4().hex}"
+        extra = ("requestId", "type", "printerId")
+        if command in ("print-label", "print-receipt"):
+            types = LABEL_TYPES if command == "print-label" else RECEIPT_TYPES
+            print_type = request.get("type", types[0])
+            if print_type not in types:
+                return {"success": False, "message": f"Unsupported type for {command}: {print_type}"}
+            job = {
+                "requestId": local_id,
+                "type": print_type,
+                "data": request.get("data", {k: v for k, v in request.items() if k not in extra}),
+            }
+            if command == "print-receipt" and request.get("printerId"):
+                job["printerId"] = request["printerId"]
+            return bridge.request("POST", "/print", job)
+        if command == "tare":
+            return bridge.request("POST", "/scale/tare", {"requestId": local_id, "port": request.get("port")})
+        path = "/scale/weight"
+        if request.get("port"):
+            path += "?" + urllib.parse.urlencode({"port": request["port"]})
+        return bridge.request("GET", path)
+
+def run_mqtt(device_id, device_name, config_watcher):
+    """Runs until the device_id changes (which needs a new client id and topics)."""
     mqtt_broker = os.getenv('MQTT_BROKER')
     mqtt_port = int(os.getenv('MQTT_PORT', 1883))
     mqtt_user = os.getenv('MQTT_USER')
@@ -111,36 +702,48 @@ def run_mqtt(device_id, device_name):
     
     client.will_set(topic_availability, "offline", retain=True)
 
+    def publish_discovery(c):
+        config = {
+            "name": f"{device_name} Display",
+            "unique_id": f"{device_id}_display",
+            "command_topic": topic_set,
+            "state_topic": topic_state,
+            "availability_topic": topic_availability,
+            "device": device_info(device_id, device_name),
+            "icon": "mdi:monitor"
+        }
+        c.publish(discovery_topic, json.dumps(config), retain=True)
+        # One-tap tare from Home Assistant through the tare command topic
+        tare_button = {
+            "name": f"{device_name} Tare Scale",
+            "unique_id": f"{device_id}_tare",
+            "command_topic": f"{prefix}/tare",
+            "payload_press": "{}",
+            "qos": 1,
+            "availability_topic": topic_availability,
+            "device": device_info(device_id, device_name),
+            "icon": "mdi:scale-balance"
+        }
+        c.publish(f"homeassistant/button/{device_id}_tare/config", json.dumps(tare_button), retain=True)
+
     def on_connect(c, userdata, flags, rc):
         if rc == 0:
             logger.info(f"Connected to MQTT Broker as {device_id}")
             c.publish(topic_availability, "online", retain=True)
             
             # Discovery
-            config = {
-                "name": f"{device_name} Display",
-                "unique_id": f"{device_id}_display",
-                "command_topic": topic_set,
-                "state_topic": topic_state,
-                "availability_topic": topic_availability,
-                "device": {
-                     "identifiers": [device_id],
-                     "name": device_name,
-                     "model": "Raspberry Pi Kiosk",
-                     "manufacturer": "Pantry App",
-                     "sw_version": "1.1"
-                },
-                "icon": "mdi:monitor"
-            }
-            c.publish(discovery_topic, json.dumps(config), retain=True)
+            publish_discovery(c)
+            telemetry.on_connected()
             
             c.subscribe(topic_set)
+            c.subscribe(commands.topics())
             # Sync Initial
             c.publish(topic_state, current_display_state, retain=True)
         else:
             logger.error(f"Connection failed: {rc}")
 
     def on_message(c, userdata, msg):
+        started = time.perf_counter()
         try:
             if msg.topic == topic_set:
                 payload = msg.payload.decode().upper()
@@ -148,8 +751,21 @@ def run_mqtt(device_id, device_name):
                 if payload in ["ON", "OFF"]:
                     if set_display(payload):
                         c.publish(topic_state, payload, retain=True)
+            else:
+                command = commands.command_for(msg.topic)
+                if command:
+                    commands.submit(command, msg.payload.decode())
         except Exception as e:
             logger.error(f"Message error: {e}")
+        MESSAGE_TIME.observe(time.perf_counter() - started)
+
+    def on_display_change(state):
+        # Called from the display monitor thread
+        client.publish(topic_state, state, retain=True)
+        notify_bridge_server(state)
+
+    telemetry = Telemetry(client, device_id, device_name, topic_availability)
+    commands = CommandHandler(client, prefix)
 
     client.on_connect = on_connect
     client.on_message = on_message
@@ -157,45 +773,45 @@ def run_mqtt(device_id, device_name):
     try:
         client.connect(mqtt_broker, mqtt_port, 60)
         client.loop_start()
-        
-        # Monitoring Loop
-        last_mtime = 0
-        if os.path.exists(CONFIG_FILE):
-            last_mtime = os.path.getmtime(CONFIG_FILE)
+        display_monitor.on_change = on_display_change
+        telemetry.start()
 
+        # Sleep until the config file is written. External display state
+        # changes are reported by display_monitor.
         while True:
-            time.sleep(2)
-            # Check for config change
-            if os.path.exists(CONFIG_FILE):
-                mtime = os.path.getmtime(CONFIG_FILE)
-                if mtime > last_mtime:
-                    logger.info("Config file changed. Restarting MQTT...")
-                    break
-                # Update last_mtime anyway if we just started monitoring? 
-                # No, we only want to break if it CHANGES from what we started with.
-                # If we started with no file, and file appears:
-                if last_mtime == 0:
-                    logger.info("Config file created. Restarting MQTT...")
-                    break
-            
-            # Check for external state changes
-            actual_state = check_display_state()
-            if actual_state and actual_state != current_display_state:
-                logger.info(f"Display state sync: {current_display_state} -> {actual_state}")
-                current_display_state = actual_state
-                client.publish(topic_state, current_display_state, retain=True)
-                notify_bridge_server(current_display_state)
+            config_watcher.wait()
+            config = get_config()
+            if config is None:
+                # Half-written or broken file, keep the current connection
+                continue
+            new_id, new_name = config
+            if new_id != device_id:
+                logger.info(f"Device id changed ({device_id} -> {new_id}). Restarting MQTT...")
+                break
+            if new_name != device_name:
+                logger.info(f"Device name changed to {new_name}, republishing discovery")
+                device_name = new_name
+                publish_discovery(client)
+                telemetry.set_name(new_name)
 
-            # Simple keepalive check? loop_start handles reconnects.
-            
     except Exception as e:
         logger.error(f"Runtime error: {e}")
     finally:
+        telemetry.stop()
+        commands.stop()
+        display_monitor.on_change = None
         client.loop_stop()
         client.disconnect()
         logger.info("MQTT Disconnected")
 
-if __name__ == "__main__":
+def main():
+    global display_monitor
+    # Kept across restarts when hosted by hardware_service.py
+    if display_monitor is None:
+        display_monitor = DisplayMonitor()
+        display_monitor.start()
+    config_watcher = ConfigWatcher()
+
     while True:
         # Check if config exists or if mandatory env vars are provided to override waiting
         # But per user request, we basically want to wait for login.
@@ -209,8 +825,16 @@ if __name__ == "__main__":
              # Let's check if the file is missing, we wait.
              logger.info("Waiting for Kiosk Login (config file)...")
              while not os.path.exists(CONFIG_FILE):
-                 time.sleep(5)
-        
-        d_id, d_name = get_config()
-        run_mqtt(d_id, d_name)
+                 config_watcher.wait()
+
+        config = get_config()
+        if config is None:
+            config_watcher.wait()
+            continue
+        d_id, d_name = config
+        run_mqtt(d_id, d_name, config_watcher)
         time.sleep(2) # Breathe before restart
+
+if __name__ == "__main__":
+    metrics.start("mqtt_bridge")
+    main()
@@ -1,37 +1,45 @@
 
 import sys
 import json
+import time
 import argparse
 import logging
+import importlib
 
-try:
-    # Try importing from brother_ql_inventree
-    import brother_ql_inventree.conversion
-    import brother_ql_inventree.backends.helpers
-    import brother_ql_inventree.raster
-    from brother_ql_inventree.conversion import convert
-    from brother_ql_inventree.backends.helpers import send
-    from brother_ql_inventree.raster import BrotherQLRaster
-except ImportError:
-    # Fallback to standard brother_ql if inventree specific import fails
-    # (Handling case where package name might be different or it shadows brother_ql)
-    try:
-        from brother_ql.conversion import convert
-        from brother_ql.backends.helpers import send
-        from brother_ql.raster import BrotherQLRaster
-    except ImportError:
-        print("Error: Could not import brother_ql or brother_ql_inventree", file=sys.stderr)
-        sys.exit(1)
-
-from PIL import Image, ImageDraw, ImageFont
-import qrcode
-from datetime import datetime
+import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RENDER_TIME = metrics.histogram("label_render_seconds", "Time drawing the label image")
+CONVERT_TIME = metrics.histogram("label_convert_seconds", "Time converting the image to raster instructions")
+SEND_TIME = metrics.histogram("label_send_seconds", "Time sending one copy to the printer")
+LABELS_PRINTED = metrics.counter("labels_printed_total", "Label copies sent to the printer")
+SEND_ERRORS = metrics.counter("label_send_errors_total", "Label copies the printer backend failed to take")
+
+DEFAULT_MODEL = 'QL-600'
+DEFAULT_PRINTER = 'usb://0x04f9:0x20c0' # QL-600
+DEFAULT_BACKEND = 'pyusb'
+
+# brother_ql (which pulls in PIL), PIL and qrcode are most of this script's
+# start-up time, so each subcommand imports only what it uses. The bridge
+# runs discover / status every 30 s; startup_bench.py keeps an eye on it.
+def _brother_ql(submodule):
+    """Imports brother_ql_inventree.<submodule>, or brother_ql.<submodule> without it."""
+    for package in ('brother_ql_inventree', 'brother_ql'):
+        try:
+            return importlib.import_module(f"{package}.{submodule}")
+        except ImportError:
+            continue
+    print("Error: Could not import brother_ql or brother_ql_inventree", file=sys.stderr)
+    sys.exit(1)
+
 def create_label_image(data):
+    from PIL import Image, ImageDraw, ImageFont
+    import qrcode
+    from datetime import datetime
+
     # Label properties (Brother QL-600 with 62mm tape)
     # 62mm tape is approx 696 pixels wide
     width = 696
@@ -415,6 +423,8 @@ def create_label_image(data):
     
     return img
 
+# Returns False if the input file can't be loaded and raises if the printer
+# fails; hardware_service.py also calls this in-process.
 def print_label_cmd(args):
     try:
         with open(args.input_file, 'r') as f:
@@ -427,11 +437,17 @@ def print_label_cmd(args):
             
     except Exception as e:
         logger.error(f"Failed to load input file: {e}")
-        return
+        return False
 
     logger.info(f"Printing label for: {data.get('title') or data.get('text')}")
+    # Before rendering, so a missing library fails fast
+    convert = _brother_ql('conversion').convert
+    BrotherQLRaster = _brother_ql('raster').BrotherQLRaster
+    send = _brother_ql('backends.helpers').send
     
+    started = time.perf_counter()
     img = create_label_image(data)
+    RENDER_TIME.observe(time.perf_counter() - started)
     
     # Select label type
     label_type = '62'
@@ -452,6 +468,7 @@ def print_label_cmd(args):
     # For multiple copies: generate no-cut instructions for all but the last copy
     # so the printer doesn't cut between each label (especially useful for die-cut labels)
     instructions_nocut = None
+    started = time.perf_counter()
     if copies > 1 and should_cut:
         qlr_nocut = BrotherQLRaster(args.model)
         qlr_nocut.exception_on_warning = True
@@ -477,6 +494,7 @@ def print_label_cmd(args):
         compress=False, 
         red=data.get('red', False)
     )
+    CONVERT_TIME.observe(time.perf_counter() - started)
     
     logger.info(f"Printing {copies} copies...")
 
@@ -484,26 +502,54 @@ def print_label_cmd(args):
         is_last = (i == copies - 1)
         instr = instructions_final if is_last else instructions_nocut
         logger.info(f"Sending copy {i+1} of {copies} (cut={'yes' if is_last and should_cut else 'no'})")
-        send(
-            instructions=instr, 
-            printer_identifier=args.printer, 
-            backend_identifier=args.backend, 
-            blocking=True
-        )
+        started = time.perf_counter()
+        try:
+            send(
+                instructions=instr, 
+                printer_identifier=args.printer, 
+                backend_identifier=args.backend, 
+                blocking=True
+            )
+        except Exception:
+            SEND_ERRORS.inc()
+            raise
+        SEND_TIME.observe(time.perf_counter() - started)
+        LABELS_PRINTED.inc()
             
     logger.info("Print successful")
+    return True
+
+def _discover_pyusb():
+    """Same listing as brother_ql.backends.pyusb.list_available_devices().
+
+    Importing any brother_ql module runs its package __init__, which loads
+    the raster code and PIL; discover runs every 30 s and needs neither.
+    """
+    import usb.core
+    import usb.util
+
+    def is_printer(dev):
+        if dev.bDeviceClass == 7:
+            return True
+        return any(usb.util.find_descriptor(cfg, bInterfaceClass=7) is not None for cfg in dev)
+
+    devices = []
+    for dev in usb.core.find(find_all=True, custom_match=is_printer, idVendor=0x04f9):
+        identifier = 'usb://0x{:04x}:0x{:04x}'.format(dev.idVendor, dev.idProduct)
+        try:
+            identifier += '_' + usb.util.get_string(dev, 256, dev.iSerialNumber)
+        except Exception:
+            pass
+        devices.append({'identifier': identifier})
+    return devices
 
 def discover_cmd(args):
-    # Try to use discovery from the library
     try:
-        # Depending on version, discovery might be in different places
-        # brother_ql 0.9.x has brother_ql.backends.helpers.discover
-        try:
-            from brother_ql_inventree.backends.helpers import discover
-        except ImportError:
-            from brother_ql.backends.helpers import discover
-            
-        devices = discover(backend_identifier=args.backend)
+        if args.backend == 'pyusb':
+            devices = _discover_pyusb()
+        else:
+            # brother_ql 0.9.x has brother_ql.backends.helpers.discover
+            devices = _brother_ql('backends.helpers').discover(backend_identifier=args.backend)
         # devices is list of (identifier, description) usually? or similar.
         # Actually it returns specific object list or strings.
         # Let's assume standard brother_ql behavior: returns list of dicts or objects
@@ -645,6 +691,7 @@ def status_cmd(args):
     print(json.dumps(status_data))
 
 def configure_cmd(args):
+    send = _brother_ql('backends.helpers').send
     args_printer = args.printer
     args_backend = args.backend
     
@@ -716,29 +763,30 @@ if __name__ == "__main__":
     # Print Command
     print_parser = subparsers.add_parser('print', help='Print a label')
     print_parser.add_argument('input_file', help='Path to JSON data file')
-    print_parser.add_argument('--model', default='QL-600', help='Printer Model')
-    print_parser.add_argument('--printer', default='usb://0x04f9:0x20c0', help='Printer Identifier') # QL-600 default
-    print_parser.add_argument('--backend', default='pyusb', help='Backend Identifier')
+    print_parser.add_argument('--model', default=DEFAULT_MODEL, help='Printer Model')
+    print_parser.add_argument('--printer', default=DEFAULT_PRINTER, help='Printer Identifier')
+    print_parser.add_argument('--backend', default=DEFAULT_BACKEND, help='Backend Identifier')
     
     # Discover Command
     discover_parser = subparsers.add_parser('discover', help='Discover printers')
-    discover_parser.add_argument('--backend', default='pyusb', help='Backend Identifier')
+    discover_parser.add_argument('--backend', default=DEFAULT_BACKEND, help='Backend Identifier')
 
     # Status Command
     status_parser = subparsers.add_parser('status', help='Get printer status')
-    status_parser.add_argument('--printer', default='usb://0x04f9:0x20c0', help='Printer Identifier')
-    status_parser.add_argument('--backend', default='pyusb', help='Backend Identifier')
-    status_parser.add_argument('--model', default='QL-600', help='Printer Model')
+    status_parser.add_argument('--printer', default=DEFAULT_PRINTER, help='Printer Identifier')
+    status_parser.add_argument('--backend', default=DEFAULT_BACKEND, help='Backend Identifier')
+    status_parser.add_argument('--model', default=DEFAULT_MODEL, help='Printer Model')
 
     # Configure Command
     configure_parser = subparsers.add_parser('configure', help='Configure printer settings')
     configure_parser.add_argument('printer', help='Printer Identifier')
     configure_parser.add_argument('input_file', help='Path to JSON config file')
-    configure_parser.add_argument('--backend', default='pyusb', help='Backend Identifier')
+    configure_parser.add_argument('--backend', default=DEFAULT_BACKEND, help='Backend Identifier')
 
     args = parser.parse_args()
     
     if args.command == 'print':
+        metrics.start("print_label", accumulate=True)
         print_label_cmd(args)
     elif args.command == 'discover':
         discover_cmd(args)
@@ -751,6 +799,7 @@ if __name__ == "__main__":
         if hasattr(args, 'input_file') and args.input_file:
              # Need to mock args object
              args.command = 'print'
+             metrics.start("print_label", accumulate=True)
              print_label_cmd(args)
         else:
             parser.print_help()
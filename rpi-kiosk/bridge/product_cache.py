@@ -0,0 +1,147 @@
+"""Kiosk-local barcode -> product index (SQLite).
+
+server.js pulls GET /barcodes/index from the backend and pipes the response
+into `product_cache.py import`; scanner_bridge.py uses ProductCache.lookup()
+to tag each scan with the product before it leaves the kiosk.
+
+Usage:
+  product_cache.py import < index.json   # full or incremental update
+  product_cache.py status                # row count and last sync time
+  product_cache.py lookup <barcode>
+"""
+import sys
+import os
+import json
+import sqlite3
+import argparse
+
+DB_FILE = "product_cache.db"
+if os.path.isdir("/data"):
+    DB_FILE = "/data/product_cache.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    barcode TEXT PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    title TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def barcode_variants(barcode):
+    """The same GTIN written as UPC-A or as EAN-13 with a leading 0."""
+    yield barcode
+    if barcode.isdigit():
+        if len(barcode) == 12:
+            yield '0' + barcode
+        elif len(barcode) == 13 and barcode[0] == '0':
+            yield barcode[1:]
+
+class ProductCache:
+    """Read side used by the scanner bridge. Missing database = empty cache."""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            if not os.path.exists(self.path):
+                return None
+            self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return self.conn
+
+    def lookup(self, barcode):
+        """Returns (product_id, title) or None."""
+        try:
+            conn = self._connect()
+            if conn is None:
+                return None
+            for candidate in barcode_variants(barcode):
+                row = conn.execute(
+                    "SELECT product_id, title FROM products WHERE barcode = ?", (candidate,)).fetchone()
+                if row:
+                    return row
+        except sqlite3.Error as e:
+            sys.stderr.write(f"Product cache lookup failed: {e}\n")
+            self.close()
+        return None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+def open_db(path=DB_FILE):
+    conn = sqlite3.connect(path)
+    # WAL lets the scanner bridge keep reading while an import runs
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def import_index(index, path=DB_FILE):
+    """Applies a /barcodes/index response. A full index replaces the table."""
+    columns = index.get("columns", ["barcode", "productId", "title"])
+    b, p, t = columns.index("barcode"), columns.index("productId"), columns.index("title")
+    rows = [(row[b], row[p], row[t] or "") for row in index.get("rows", [])]
+
+    conn = open_db(path)
+    try:
+        with conn:
+            if index.get("full"):
+                conn.execute("DELETE FROM products")
+            conn.executemany(
+                "INSERT INTO products (barcode, product_id, title) VALUES (?, ?, ?) "
+                "ON CONFLICT(barcode) DO UPDATE SET product_id = excluded.product_id, title = excluded.title",
+                rows)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_at', ?)",
+                         (index.get("generatedAt"),))
+            if index.get("full"):
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('full_synced_at', ?)",
+                             (index.get("generatedAt"),))
+        count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    finally:
+        conn.close()
+    return len(rows), count
+
+def status(path=DB_FILE):
+    if not os.path.exists(path):
+        return {"rows": 0, "synced_at": None, "full_synced_at": None}
+    conn = open_db(path)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    finally:
+        conn.close()
+    return {"rows": count, "synced_at": meta.get("synced_at"), "full_synced_at": meta.get("full_synced_at")}
+
+def get_args():
+    parser = argparse.ArgumentParser(description='Kiosk barcode -> product cache')
+    parser.add_argument('command', choices=['import', 'status', 'lookup'])
+    parser.add_argument('barcode', nargs='?', help='lookup: barcode to find')
+    parser.add_argument('--db', default=DB_FILE, help='Database file')
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_args()
+    try:
+        if args.command == 'import':
+            changed, total = import_index(json.load(sys.stdin), args.db)
+            print(json.dumps({"success": True, "changed": changed, "rows": total}))
+        elif args.command == 'status':
+            print(json.dumps({"success": True, **status(args.db)}))
+        elif args.command == 'lookup':
+            if not args.barcode:
+                print(json.dumps({"success": False, "message": "Barcode required"}))
+                sys.exit(1)
+            row = ProductCache(args.db).lookup(args.barcode)
+            if row:
+                print(json.dumps({"success": True, "productId": row[0], "title": row[1]}))
+            else:
+                print(json.dumps({"success": False, "message": "Not found"}))
+    except Exception as e:
+        print(json.dumps({"success": False, "message": str(e)}))
+        sys.exit(1)
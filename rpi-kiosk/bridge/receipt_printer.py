@@ -1,13 +1,14 @@
 
 import sys
 import json
+import time
 import argparse
 import logging
-import usb.core
-import usb.util
 import subprocess
 import textwrap
 
+import metrics
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,6 +16,11 @@ logger = logging.getLogger(__name__)
 BROTHER_VENDOR_ID = 0x04f9
 BROTHER_PRODUCT_ID = 0x20c0 # QL-600
 
+# python-escpos writes each command straight to USB, so this covers the whole receipt
+SEND_TIME = metrics.histogram("receipt_send_seconds", "Time from opening the printer to the cut")
+RECEIPTS_PRINTED = metrics.counter("receipts_printed_total", "Receipts printed")
+SEND_ERRORS = metrics.counter("receipt_send_errors_total", "Receipts that failed to print")
+
 def get_lsusb_info():
     """Returns a list of dicts with VID, PID, Bus, Address, Name from lsusb."""
     devices = []
@@ -54,6 +60,9 @@ def get_lsusb_info():
 
 def get_usb_printers():
     """Find all USB printers using both usb.core (Class 7) and lsusb keywords."""
+    # Only discover / status scan the bus, print goes through python-escpos
+    import usb.core
+
     printers = []
     seen_ids = set()
 
@@ -164,11 +173,15 @@ def sanitize_text(text):
     return text.encode('ascii', 'replace').decode()
 
 def print_receipt_cmd(args):
+    """Prints args.input_file on args.printer.
+
+    Returns False if the job can't be started (bad file or identifier),
+    raises if printing fails. Also run in-process by hardware_service.py.
+    """
     try:
         from escpos.printer import Usb
     except ImportError:
-        logger.error("python-escpos library not found")
-        sys.exit(1)
+        raise RuntimeError("python-escpos library not found")
 
     try:
         with open(args.input_file, 'r') as f:
@@ -176,7 +189,7 @@ def print_receipt_cmd(args):
             logger.info(f"Receipt Data: {data}")
     except Exception as e:
         logger.error(f"Failed to load input file: {e}")
-        return
+        return False
 
     # Parse identifier
     # Format: usb:0x1234:0x5678
@@ -188,11 +201,12 @@ def print_receipt_cmd(args):
         else:
             # Fallback or error
             logger.error("Invalid printer identifier format. Expected 'usb:0xVID:0xPID'")
-            return
+            return False
     except ValueError:
         logger.error(f"Invalid VID/PID in identifier: {args.printer}")
-        return
+        return False
 
+    started = time.perf_counter()
     try:
         # Initialize printer
         # profile="default" might work for most
@@ -365,12 +379,14 @@ def print_receipt_cmd(args):
         # Cut
         print("Cutting...")
         p.cut()
+        SEND_TIME.observe(time.perf_counter() - started)
+        RECEIPTS_PRINTED.inc()
         print("Done.")
+        return True
         
-    except Exception as e:
-        logger.error(f"Print failed: {e}")
-        print(f"CRITICAL ERROR: {e}") 
-        sys.exit(1)
+    except Exception:
+        SEND_ERRORS.inc()
+        raise
     
 def status_cmd(args):
     # Just check if we can find it via USB scanning
@@ -432,7 +448,13 @@ if __name__ == "__main__":
     if args.command == 'discover':
         discover_cmd(args)
     elif args.command == 'print':
-        print_receipt_cmd(args)
+        metrics.start("receipt_printer", accumulate=True)
+        try:
+            print_receipt_cmd(args)
+        except Exception as e:
+            logger.error(f"Print failed: {e}")
+            print(f"CRITICAL ERROR: {e}") 
+            sys.exit(1)
     elif args.command == 'status':
         status_cmd(args)
     else:
@@ -2,46 +2,301 @@ import sys
 import json
 import time
 import argparse
-import serial
-import serial.tools.list_ports
 import os
+import atexit
+import fcntl
+import signal
+import struct
+import tempfile
+import threading
 from collections import deque
 
+import metrics
+import bridge_ipc
+
+try:
+    import serial
+    import serial.tools.list_ports
+except ImportError:
+    # Only needed for real hardware; 'replay' runs without pyserial
+    serial = None
+
 CONFIG_FILE = "scale_config.json"
 if os.path.isdir("/data"):
     CONFIG_FILE = "/data/scale_config.json"
 
+# Monitor event tuning (grams / seconds)
+SETTLE_TIME = 0.5            # Readings must agree for this long to count as settled
+SETTLE_TOLERANCE = 0.3       # Max spread of readings within the settle window
+CHANGE_THRESHOLD = 1.0       # Report unsettled movement only beyond this delta
+PRESENCE_THRESHOLD = 2.0     # Above this an item is considered placed
+HEARTBEAT_INTERVAL = 10.0    # Re-send the current weight if nothing else was sent
+MAX_WEIGHT = 5000.0          # Load cell capacity
+HX711_RAW_LIMIT = 8388000    # Close to the 24-bit ADC rails (0x7FFFFF)
+
+# Serial polling
+SERIAL_BAUD = 9600
+POLL_INTERVAL = 0.05         # Delay between a response and the next 'R' request
+RESPONSE_TIMEOUT = 2.0       # Re-send 'R' if the firmware didn't answer
+ARDUINO_RESET_DELAY = 2.0    # Most Arduinos reset when the port is opened
+RECONNECT_DELAY = 2.0
+COMMAND_TIMEOUT = 5.0        # Give up on tare/calibrate if no fresh samples arrive
+READ_MAX_AGE = 1.0           # A 'read' only answers with a sample at most this old
+MEDIAN_WINDOW = 3
+
+# Minimum seconds between config writes from the monitor (SD card wear)
+CONFIG_FLUSH_INTERVAL = 60.0
+
+DEFAULT_DEVICE_CONFIG = {"tare_offset": 0, "calibration_factor": 420.0}
+
+# Calibration
+CAL_TABLE_SIZE = 1024        # Interpolation table entries between the calibration extremes
+CAL_POINT_MERGE = 0.05       # A new point within 5% of an existing weight replaces it
+
+# Zero drift tracking (replaces the old "stable near zero for 30s" auto-tare)
+DRIFT_ZERO_BAND = 0.5        # Only track while the settled reading is within this many grams of zero
+DRIFT_TIME_CONSTANT = 60.0   # Seconds; slow enough that a real load is never tracked away
+DRIFT_PERSIST_STEP = 0.2     # Grams of accumulated drift before the tare is re-saved
+
+# Storage mode: scale stored on its side reads persistently negative
+STORAGE_MODE_THRESHOLD = -50.0
+STORAGE_MODE_DELAY = 5 * 60.0
+
 def get_args():
     parser = argparse.ArgumentParser()
-    parser.add_argument('command', choices=['discover', 'read', 'monitor', 'status', 'tare', 'calibrate'])
-    parser.add_argument('--port', help='Serial port')
+    parser.add_argument('command', choices=['discover', 'read', 'monitor', 'status', 'tare', 'calibrate', 'replay'])
+    parser.add_argument('--port', help='Serial port (monitor accepts a comma separated list)')
     parser.add_argument('--weight', help='Known weight for calibration', type=float)
+    parser.add_argument('--reset', help='Discard existing calibration points before calibrating', action='store_true')
+    parser.add_argument('--fit', help='Calibration curve through the points', choices=['linear', 'poly'])
+    parser.add_argument('--heartbeat', help='Seconds between heartbeat events in monitor mode', type=float, default=HEARTBEAT_INTERVAL)
+    parser.add_argument('--change-threshold', help='Grams of movement reported while unsettled', type=float, default=CHANGE_THRESHOLD)
+    parser.add_argument('--record', help='Monitor: append raw samples to this recording file')
+    parser.add_argument('--file', help='Replay: recording to play back')
+    parser.add_argument('--speed', help='Replay: 0 = as fast as possible, N = N times real time', type=float, default=0)
+    parser.add_argument('--events-out', help='Replay: write the produced events (JSON lines) here')
+    parser.add_argument('--expect', help='Replay: compare events against a previous --events-out file')
     return parser.parse_args()
 
-def load_config():
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {}
+class ConfigStore:
+    """In-memory scale configuration with atomic, rate-limited persistence.
+
+    Reads hit memory only. Writes mark the port dirty and are flushed at
+    most once per ``min_interval`` (or explicitly via ``flush``). A flush
+    re-reads the file under an exclusive lock and only overlays the ports
+    this process changed, so a monitor and a one-shot CLI (or several
+    scales) never clobber each other's settings. The file is replaced via
+    temp file + rename so a power cut can't leave it half written.
+    """
+
+    def __init__(self, path, min_interval=CONFIG_FLUSH_INTERVAL):
+        self.path = path
+        self.min_interval = min_interval
+        self._data = None
+        self._dirty = {}  # port -> {key: value}
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def _read_file(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                    if isinstance(data, dict):
+                        return data
+            except Exception as e:
+                print(f"Error reading {self.path}: {e}", file=sys.stderr)
+        return {}
+
+    def _ensure_loaded(self):
+        if self._data is None:
+            self._data = self._read_file()
+
+    def get(self, port):
+        with self._lock:
+            self._ensure_loaded()
+            cfg = dict(DEFAULT_DEVICE_CONFIG)
+            cfg.update(self._data.get(port, {}))
+            return cfg
 
-def save_config(config):
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+    def set(self, port, key, value):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._data.setdefault(port, dict(DEFAULT_DEVICE_CONFIG))
+            if entry.get(key) == value:
+                return
+            entry[key] = value
+            self._dirty.setdefault(port, {})[key] = value
+
+    def maybe_flush(self, now=None):
+        """Flush pending changes if the rate limit allows it."""
+        if not self._dirty:
+            return False
+        now = time.time() if now is None else now
+        if now - self._last_flush < self.min_interval:
+            return False
+        self.flush(now)
+        return True
+
+    @classmethod
+    def detached(cls, data):
+        """A store that never touches disk (used by replay)."""
+        store = cls(None)
+        store._data = json.loads(json.dumps(data))
+        return store
+
+    def flush(self, now=None):
+        with self._lock:
+            if not self._dirty:
+                return
+            if self.path is None:
+                self._dirty = {}
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with open(self.path + ".lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Merge with what is on disk so other ports/processes are preserved
+                merged = self._read_file()
+                for port, changes in self._dirty.items():
+                    entry = merged.setdefault(port, dict(DEFAULT_DEVICE_CONFIG))
+                    entry.update(changes)
+
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".scale_config.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(merged, f, indent=2)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+                except Exception:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+
+            self._data = merged
+            self._dirty = {}
+            self._last_flush = time.time() if now is None else now
+
+config_store = ConfigStore(CONFIG_FILE)
+atexit.register(config_store.flush)
 
 def get_device_config(port):
-    cfg = load_config()
-    # Default calibration factor 420.0, tare 0
-    return cfg.get(port, {"tare_offset": 0, "calibration_factor": 420.0})
+    return config_store.get(port)
+
+def update_device_config(port, key, value, persist=True):
+    """Update one setting. ``persist=False`` defers the write to the next rate-limited flush."""
+    config_store.set(port, key, value)
+    if persist:
+        config_store.flush()
+
+def _polyfit(xs, ys, degree):
+    """Least squares fit of y = c1*x + ... + cn*x^n (through the origin, since
+    the tare defines zero). Returns [c1, ..., cn]."""
+    n = degree
+    a = [[sum(x ** (i + j + 2) for x in xs) for j in range(n)] for i in range(n)]
+    b = [sum(y * x ** (i + 1) for x, y in zip(xs, ys)) for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        b[col], b[pivot] = b[pivot], b[col]
+        for r in range(n):
+            if r != col and a[col][col]:
+                f = a[r][col] / a[col][col]
+                a[r] = [rv - f * cv for rv, cv in zip(a[r], a[col])]
+                b[r] -= f * b[col]
+    return [b[i] / a[i][i] if a[i][i] else 0.0 for i in range(n)]
+
+class Calibration:
+    """Raw-to-grams conversion for one scale.
+
+    Without calibration points this is the classic ``delta / factor``.
+    With points (stored as ``[raw - tare, grams]`` pairs) a piecewise-linear
+    curve, or a quadratic least squares fit when ``calibration_fit`` is
+    ``"poly"``, is sampled once into a uniform table so converting a
+    sample is an index plus one interpolation, whatever the number of
+    points. Readings outside the table extrapolate along the edge slope.
+    """
+
+    def __init__(self, factor=420.0, points=None, fit="linear"):
+        self.factor = factor or 1
+        self.table = None
+
+        pts = {}
+        for raw_delta, grams in points or []:
+            if raw_delta:
+                pts[float(raw_delta)] = float(grams)
+        if not pts:
+            return
+
+        pts[0.0] = 0.0
+        xs = sorted(pts)
+        ys = [pts[x] for x in xs]
 
-def update_device_config(port, key, value):
-    cfg = load_config()
-    if port not in cfg:
-        cfg[port] = {"tare_offset": 0, "calibration_factor": 420.0}
-    cfg[port][key] = value
-    save_config(cfg)
+        if fit == "poly" and len(xs) >= 3:
+            # Scale x to keep the normal equations well conditioned
+            x_scale = max(abs(x) for x in xs)
+            coeffs = _polyfit([x / x_scale for x in xs], ys, 2)
+            curve = lambda x: sum(c * (x / x_scale) ** (i + 1) for i, c in enumerate(coeffs))
+        else:
+            def curve(x):
+                for i in range(1, len(xs) - 1):
+                    if x < xs[i]:
+                        break
+                else:
+                    i = len(xs) - 1
+                x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+                return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+        self.lo = xs[0]
+        self.hi = xs[-1]
+        step = (self.hi - self.lo) / CAL_TABLE_SIZE
+        self.inv_step = 1.0 / step
+        self.table = [curve(self.lo + i * step) for i in range(CAL_TABLE_SIZE + 1)]
+        self.slope_lo = (self.table[1] - self.table[0]) * self.inv_step
+        self.slope_hi = (self.table[-1] - self.table[-2]) * self.inv_step
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("calibration_factor", 420.0),
+                   config.get("calibration_points"),
+                   config.get("calibration_fit", "linear"))
+
+    def to_grams(self, delta):
+        table = self.table
+        if table is None:
+            return delta / self.factor
+        pos = (delta - self.lo) * self.inv_step
+        if pos < 0:
+            return table[0] + (delta - self.lo) * self.slope_lo
+        i = int(pos)
+        if i >= CAL_TABLE_SIZE:
+            return table[-1] + (delta - self.hi) * self.slope_hi
+        y0 = table[i]
+        return y0 + (table[i + 1] - y0) * (pos - i)
+
+def add_calibration_point(port, raw_delta, grams, reset=False, fit=None):
+    """Store a calibration point for the port and return the updated config.
+
+    A point close to an existing weight replaces it, so repeating a
+    calibration with the same reference weight refines rather than piles up.
+    ``calibration_factor`` tracks the slope to the heaviest point for
+    single-factor consumers.
+    """
+    config = get_device_config(port)
+    points = [] if reset else [p for p in config.get("calibration_points", [])
+                               if abs(p[1] - grams) > abs(grams) * CAL_POINT_MERGE]
+    points.append([round(raw_delta, 1), grams])
+    points.sort(key=lambda p: p[1])
+
+    heaviest = max(points, key=lambda p: abs(p[1]))
+    config_store.set(port, "calibration_points", points)
+    config_store.set(port, "calibration_factor", heaviest[0] / heaviest[1])
+    if fit:
+        config_store.set(port, "calibration_fit", fit)
+    config_store.flush()
+    return get_device_config(port)
 
 def send_command(port, cmd, timeout=2):
     try:
@@ -60,6 +315,10 @@ def send_command(port, cmd, timeout=2):
         return None
 
 def discover():
+    print(json.dumps(find_scales()))
+
+def find_scales():
+    """Serial ports answering the 'V' query with scale firmware."""
     devices = []
     ports = serial.tools.list_ports.comports()
     for p in ports:
@@ -77,7 +336,7 @@ def discover():
                 })
         except:
             continue
-    print(json.dumps(devices))
+    return devices
 
 def read_raw(port):
     resp = send_command(port, "R", timeout=3)
@@ -98,17 +357,16 @@ def read_weight(port):
         config = get_device_config(port)
         tare = config.get("tare_offset", 0)
         cal = config.get("calibration_factor", 420.0)
-        
-        if cal == 0: cal = 1 # Avoid div by zero
-        
-        weight = (raw - tare) / cal
-        
+
+        weight = Calibration.from_config(config).to_grams(raw - tare)
+
         print(json.dumps({
             "weight": round(weight, 2), 
             "unit": "g", 
             "raw": raw,
             "tare": tare,
-            "cal_factor": cal
+            "cal_factor": cal,
+            "cal_points": len(config.get("calibration_points", []))
         }))
     else:
         print(json.dumps({"error": "Failed to read from scale"}))
@@ -125,7 +383,7 @@ def tare_scale(port):
     else:
         print(json.dumps({"error": "Failed to read for tare"}))
 
-def calibrate_scale(port, known_weight):
+def calibrate_scale(port, known_weight, reset=False, fit=None):
     if not port or known_weight is None:
         print(json.dumps({"error": "Port and known weight required"}))
         return
@@ -135,193 +393,764 @@ def calibrate_scale(port, known_weight):
         config = get_device_config(port)
         tare = config.get("tare_offset", 0)
         
-        # formula: weight = (raw - tare) / factor
-        # factor = (raw - tare) / weight
-        
+        # Each calibration adds a (raw - tare, grams) point to the curve
         if known_weight == 0:
             print(json.dumps({"error": "Known weight cannot be zero"}))
             return
-            
-        factor = (raw - tare) / known_weight
-        update_device_config(port, "calibration_factor", factor)
-        
+
+        config = add_calibration_point(port, raw - tare, known_weight, reset=reset, fit=fit)
+
         print(json.dumps({
             "success": True, 
             "message": "Calibration complete", 
-            "factor": factor,
+            "factor": config["calibration_factor"],
+            "points": config["calibration_points"],
             "raw": raw,
             "tare": tare
         }))
     else:
         print(json.dumps({"error": "Failed to read for calibration"}))
 
-def monitor(port):
-    import select
-    
-    if not port:
-        print("ERROR: Port required for monitor", file=sys.stderr)
+class WeightEventDetector:
+    """Turns the filtered weight stream into a sparse set of events.
+
+    Instead of reporting every sample, an event is only produced when the
+    weight settles, moves by more than the change threshold, an item is
+    placed or removed, the load cell overloads or storage mode toggles.
+    A heartbeat covers the quiet periods in between.
+    """
+
+    def __init__(self, heartbeat=HEARTBEAT_INTERVAL, change_threshold=CHANGE_THRESHOLD):
+        self.heartbeat = heartbeat
+        self.change_threshold = change_threshold
+        self.window = deque()  # (timestamp, weight)
+        self.stable = False
+        self.loaded = False
+        self.overloaded = False
+        self.storage_mode = False
+        self.negative_since = None
+        self.last_reported = None
+        self.last_event_time = 0.0
+
+    def _event(self, name, weight, raw, now, **extra):
+        self.last_reported = weight
+        self.last_event_time = now
+        event = {
+            "type": "weight",
+            "event": name,
+            "weight": weight,
+            "raw": raw,
+            "stable": self.stable,
+            "unit": "g"
+        }
+        event.update(extra)
+        return event
+
+    def update(self, weight, raw, now):
+        """Feed one filtered sample, returns the list of events it caused."""
+        events = []
+        weight = round(weight, 1) or 0.0  # avoid reporting -0.0
+
+        # Overload (ADC rails or beyond rated capacity)
+        overloaded = abs(raw) >= HX711_RAW_LIMIT or weight > MAX_WEIGHT
+        if overloaded != self.overloaded:
+            self.overloaded = overloaded
+            events.append(self._event("overload", weight, raw, now, active=overloaded))
+        if overloaded:
+            return events
+
+        # Storage mode
+        if weight < STORAGE_MODE_THRESHOLD:
+            if self.negative_since is None:
+                self.negative_since = now
+            elif not self.storage_mode and now - self.negative_since >= STORAGE_MODE_DELAY:
+                self.storage_mode = True
+                events.append(self._event("storage_mode", weight, raw, now, active=True))
+        else:
+            self.negative_since = None
+            if self.storage_mode:
+                self.storage_mode = False
+                events.append(self._event("storage_mode", weight, raw, now, active=False))
+
+        # Stability over a sliding time window
+        self.window.append((now, weight))
+        while self.window and now - self.window[0][0] > SETTLE_TIME:
+            self.window.popleft()
+        weights = [w for _, w in self.window]
+        spread = max(weights) - min(weights)
+        covered = now - self.window[0][0] >= SETTLE_TIME * 0.8
+        was_stable = self.stable
+        self.stable = covered and spread <= SETTLE_TOLERANCE
+
+        # Presence (with hysteresis so noise around the threshold is ignored)
+        if not self.loaded and self.stable and weight >= PRESENCE_THRESHOLD:
+            self.loaded = True
+            events.append(self._event("placed", weight, raw, now))
+        elif self.loaded and weight < PRESENCE_THRESHOLD / 2:
+            self.loaded = False
+            events.append(self._event("removed", weight, raw, now))
+
+        if self.stable and not was_stable:
+            events.append(self._event("settled", weight, raw, now))
+        elif not self.stable and (self.last_reported is None or abs(weight - self.last_reported) >= self.change_threshold):
+            events.append(self._event("changed", weight, raw, now))
+        elif not events and now - self.last_event_time >= self.heartbeat:
+            events.append(self._event("heartbeat", weight, raw, now))
+
+        return events
+
+# Monitor's connection to server.js (bridge_ipc), None = JSON lines on stdout
+ipc = None
+
+def emit_event(event):
+    if ipc is not None and ipc.send(event):
         return
+    print(json.dumps(event))
+    sys.stdout.flush()
 
-    print(f"Scale Monitor Started on {port} (Ctrl+C to stop)", file=sys.stderr)
-    
-    ser = None
-    config = get_device_config(port)
-    raw_history = deque()
-    
-    stable_zero_start = None
-    
+class ScaleChannel:
+    """Connection, filter and event state for one serial scale in the monitor."""
+
+    def __init__(self, port, heartbeat=HEARTBEAT_INTERVAL, change_threshold=CHANGE_THRESHOLD,
+                 recorder=None, serial_factory=None):
+        self.port = port
+        self.ser = None
+        self.recorder = recorder
+        self.serial_factory = serial_factory
+        self.raw_history = deque()
+        self.detector = WeightEventDetector(heartbeat=heartbeat, change_threshold=change_threshold)
+        self.reload_config()
+        self.last_sample_time = None
+        self.rx = bytearray()
+        self.ready_at = 0.0         # Arduino resets when the port opens; don't poll before this
+        self.primed = False
+        self.retry_at = 0.0
+        self.request_sent_at = None
+        self.next_poll_at = 0.0
+        self.samples_seen = 0       # Filtered samples produced so far
+        self.last_filtered_raw = None
+        self.last_weight = None     # Latest filtered weight, whether or not it made an event
+        self.last_weight_at = None
+        labels = {"port": port}
+        self.sample_time = metrics.histogram("scale_sample_seconds", "Time from 'R' request to reading", labels)
+        self.filter_time = metrics.histogram("scale_filter_seconds", "Median filter, calibration and event detection per sample", labels)
+        self.bad_lines = metrics.counter("scale_bad_lines_total", "Non-numeric lines from the scale", labels)
+
+    def reload_config(self):
+        """Pick up stored tare/calibration and recompile the conversion table."""
+        self.config = get_device_config(self.port)
+        self.tare = float(self.config.get("tare_offset", 0))
+        self.saved_tare = self.tare
+        self.calibration = Calibration.from_config(self.config)
+
+    def open(self, now):
+        if self.serial_factory:
+            self.ser = self.serial_factory(self.port)
+        else:
+            self.ser = serial.Serial(self.port, SERIAL_BAUD, timeout=0)
+        self.rx.clear()
+        self.ready_at = now + ARDUINO_RESET_DELAY
+        self.primed = False
+        self.request_sent_at = None
+
+    def close(self, now):
+        if self.ser:
+            try:
+                self.ser.close()
+            except:
+                pass
+        self.ser = None
+        self.retry_at = now + RECONNECT_DELAY
+
+    def poll(self, now):
+        """Send the next 'R' request when one is due."""
+        if self.ser is None or now < self.ready_at:
+            return
+        if not self.primed:
+            # Drop the boot banner and anything else sent during reset
+            self.ser.reset_input_buffer()
+            self.rx.clear()
+            self.primed = True
+        if self.request_sent_at is not None:
+            if now - self.request_sent_at < RESPONSE_TIMEOUT:
+                return
+            # Response lost, ask again
+        elif now < self.next_poll_at:
+            return
+        self.ser.write(b'R')
+        self.request_sent_at = now
+
+    def read_lines(self):
+        self.rx.extend(self.ser.read(self.ser.in_waiting or 1))
+        return drain_lines(self.rx)
+
+    def handle_line(self, line, now):
+        if self.request_sent_at is not None:
+            self.sample_time.observe(now - self.request_sent_at)
+        self.request_sent_at = None
+        self.next_poll_at = now + POLL_INTERVAL
+        try:
+            raw = int(line)
+        except ValueError:
+            self.bad_lines.inc()
+            return []  # ERR_TIMEOUT, banners, noise
+        if self.recorder:
+            self.recorder.sample(self.port, raw, now)
+        started = time.perf_counter()
+        events = self.process_raw(raw, now)
+        self.filter_time.observe(time.perf_counter() - started)
+        return events
+
+    def process_raw(self, raw, now):
+        # Median Filter
+        self.raw_history.append(raw)
+        if len(self.raw_history) > MEDIAN_WINDOW: # Keep window small for responsiveness
+            self.raw_history.popleft()
+
+        sorted_raw = sorted(self.raw_history)
+        filtered_raw = sorted_raw[len(sorted_raw) // 2]
+        self.last_filtered_raw = filtered_raw
+        self.samples_seen += 1
+
+        weight = self.calibration.to_grams(filtered_raw - self.tare)
+        self.last_weight = round(weight, 1) or 0.0
+        self.last_weight_at = now
+        events = self.detector.update(weight, filtered_raw, now)
+        for event in events:
+            event["port"] = self.port
+
+        self.track_drift(filtered_raw, weight, now)
+        return events
+
+    def track_drift(self, filtered_raw, weight, now):
+        """Let the zero point follow slow drift (temperature, creep) while the pan is empty.
+
+        The tare moves toward the settled reading with a long time constant, so
+        sub-gram zero wander is absorbed continuously instead of by a sudden
+        auto-tare, while anything placed on the scale settles well outside the
+        tracking band. Persisting is rate limited by the config store.
+        """
+        dt = 0.0 if self.last_sample_time is None else now - self.last_sample_time
+        self.last_sample_time = now
+
+        det = self.detector
+        if not det.stable or det.loaded or det.overloaded or abs(weight) > DRIFT_ZERO_BAND:
+            return
+
+        alpha = min(1.0, dt / DRIFT_TIME_CONSTANT)
+        self.tare += (filtered_raw - self.tare) * alpha
+
+        if abs(self.calibration.to_grams(self.tare - self.saved_tare)) >= DRIFT_PERSIST_STEP:
+            self.saved_tare = self.tare
+            update_device_config(self.port, "tare_offset", round(self.tare, 1), persist=False)
+
+def drain_lines(buf):
+    """Pop every complete line out of a bytearray receive buffer."""
+    lines = []
     while True:
+        idx = buf.find(b'\n')
+        if idx < 0:
+            return lines
+        lines.append(bytes(buf[:idx]).decode('utf-8', 'replace').strip())
+        del buf[:idx + 1]
+
+def command_response(msg_type, req_id, port, success, data=None, message=None):
+    resp = {"type": msg_type, "requestId": req_id, "port": port, "success": success}
+    if data is not None:
+        resp["data"] = data
+    if message is not None:
+        resp["message"] = message
+    return resp
+
+COMMAND_RESPONSE_TYPES = {
+    'tare': 'tare_complete',
+    'calibrate': 'calibration_complete',
+    'read': 'read_complete',
+}
+
+def read_response(req_id, ch, now):
+    """Answers 'read' right away from the latest filtered sample.
+
+    Events only go out past the change threshold, so the last event can be
+    off by up to that much; this is the current reading.
+    """
+    if ch.last_weight_at is None or now - ch.last_weight_at > READ_MAX_AGE:
+        return command_response('read_complete', req_id, ch.port, False, message="No recent reading from scale")
+    det = ch.detector
+    return command_response('read_complete', req_id, ch.port, True, data={
+        "weight": ch.last_weight,
+        "unit": "g",
+        "stable": det.stable,
+        "storageMode": det.storage_mode,
+        "overload": det.overloaded,
+        "age": round(now - ch.last_weight_at, 3)
+    })
+
+class CommandTable:
+    """Outstanding tare/calibrate requests, keyed by requestId.
+
+    Commands never touch the serial port themselves. They wait for the
+    channel to produce enough fresh samples to refill the median window and
+    are then answered from the filtered value, so the weight feed keeps
+    flowing while a command is in progress.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self._auto_id = 0
+
+    def add(self, cmd_req, ch, now):
+        req_id = cmd_req.get('requestId')
+        if req_id is None:
+            self._auto_id += 1
+            req_id = f"auto-{self._auto_id}"
+        self.pending[req_id] = {
+            "cmd": cmd_req.get('cmd'),
+            "port": ch.port,
+            "weight": cmd_req.get('weight'),
+            "reset": bool(cmd_req.get('reset')),
+            "fit": cmd_req.get('fit') if cmd_req.get('fit') in ('linear', 'poly') else None,
+            "ready_at_sample": ch.samples_seen + MEDIAN_WINDOW,
+            "deadline": now + COMMAND_TIMEOUT
+        }
+
+    def resolve(self, ch):
+        """Answer every request for this channel whose samples are in."""
+        responses = []
+        for req_id, req in list(self.pending.items()):
+            if req["port"] == ch.port and ch.samples_seen >= req["ready_at_sample"]:
+                del self.pending[req_id]
+                responses.append(complete_command(req_id, req, ch))
+        return responses
+
+    def expire(self, now):
+        responses = []
+        for req_id, req in list(self.pending.items()):
+            if now >= req["deadline"]:
+                del self.pending[req_id]
+                responses.append(command_response(COMMAND_RESPONSE_TYPES[req["cmd"]], req_id, req["port"], False,
+                                                  message="No response from scale"))
+        return responses
+
+def complete_command(req_id, req, ch):
+    resp_type = COMMAND_RESPONSE_TYPES[req["cmd"]]
+    raw_val = ch.last_filtered_raw
+    try:
+        if req["cmd"] == 'tare':
+            update_device_config(ch.port, "tare_offset", raw_val)
+            ch.reload_config()
+            return command_response(resp_type, req_id, ch.port, True, data={"value": raw_val})
+
+        config = add_calibration_point(ch.port, raw_val - ch.tare, float(req["weight"]),
+                                       reset=req["reset"], fit=req["fit"])
+        ch.reload_config()
+        return command_response(resp_type, req_id, ch.port, True, data={
+            "factor": config["calibration_factor"],
+            "points": len(config["calibration_points"])
+        })
+    except Exception as e:
+        return command_response(resp_type, req_id, ch.port, False, message=str(e))
+
+def handle_monitor_command(cmd_req, channels, commands, sel, make_channel, now):
+    cmd = cmd_req.get('cmd')
+    req_id = cmd_req.get('requestId')
+
+    if cmd == 'set_ports':
+        # Add/remove scales without restarting the monitor
+        wanted = [p for p in cmd_req.get('ports', []) if p]
+        for port in list(channels):
+            if port not in wanted:
+                ch = channels.pop(port)
+                if ch.ser:
+                    sel.unregister(ch.ser)
+                ch.close(now)
+                print(f"Stopped monitoring {port}", file=sys.stderr)
+        for port in wanted:
+            if port not in channels:
+                channels[port] = make_channel(port)
+                print(f"Monitoring {port}", file=sys.stderr)
+        return None
+
+    if cmd not in COMMAND_RESPONSE_TYPES:
+        print(f"Unknown command: {cmd}", file=sys.stderr)
+        return None
+
+    resp_type = COMMAND_RESPONSE_TYPES[cmd]
+    port = cmd_req.get('port') or next(iter(channels), None)
+    ch = channels.get(port)
+
+    if ch is None or ch.ser is None:
+        return command_response(resp_type, req_id, port, False, message="Scale not connected")
+
+    if cmd == 'read':
+        return read_response(req_id, ch, now)
+
+    if cmd == 'calibrate':
         try:
-            # 1. Manage Connection
-            if ser is None:
-                ser = serial.Serial(port, 9600, timeout=2)
-                time.sleep(2) # Wait for auto-reset on connect
-                ser.reset_input_buffer()
-            
-            # 2. Check for Incoming Commands (Stdin)
-            # Non-blocking check
-            if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-                line = sys.stdin.readline()
-                if line:
+            weight = float(cmd_req.get('weight', 0))
+        except (TypeError, ValueError):
+            weight = 0
+        if weight <= 0:
+            return command_response(resp_type, req_id, port, False, message="Invalid weight")
+
+    commands.add(cmd_req, ch, now)
+    return None
+
+def monitor(ports, heartbeat=HEARTBEAT_INTERVAL, change_threshold=CHANGE_THRESHOLD, record=None):
+    """Command line entry point for the monitor, see run_monitor()."""
+    if not ports:
+        print("ERROR: Port required for monitor", file=sys.stderr)
+        return
+
+    print(f"Scale Monitor Started on {', '.join(ports)} (Ctrl+C to stop)", file=sys.stderr)
+
+    # The bridge stops us with SIGTERM; exit normally so pending config is flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    metrics.start("scale_bridge")
+    run_monitor(ports, heartbeat, change_threshold, record)
+
+def run_monitor(ports, heartbeat=HEARTBEAT_INTERVAL, change_threshold=CHANGE_THRESHOLD, record=None,
+                hosted=False):
+    """Monitor any number of scales from one process.
+
+    Each port gets its own ScaleChannel (connection, median filter, auto-tare
+    and event detector); serial reads and commands are multiplexed with a
+    selector so a slow or missing scale never holds up the others. Nothing
+    in the loop blocks: commands are queued in a CommandTable and answered
+    from the sample stream, and reconnects are scheduled per port.
+
+    hosted: running inside hardware_service.py. Commands then only come over
+    IPC (ports included, via set_ports), and losing the IPC connection ends
+    the monitor so the service restarts it.
+    """
+    import selectors
+
+    recorder = None
+    if record:
+        recorder = SampleRecorder(record)
+        atexit.register(recorder.close)
+        print(f"Recording raw samples to {record}", file=sys.stderr)
+
+    def make_channel(port):
+        return ScaleChannel(port, heartbeat, change_threshold, recorder=recorder)
+
+    channels = {port: make_channel(port) for port in ports}
+    commands = CommandTable()
+    stdin_fd = sys.stdin.fileno()
+    stdin_buf = bytearray()
+    sel = selectors.DefaultSelector()
+    if not hosted:
+        sel.register(stdin_fd, selectors.EVENT_READ, None)
+
+    # Commands arrive on IPC when connected, on stdin otherwise (or before it connects)
+    global ipc
+    ipc = bridge_ipc.connect("scale")
+    if ipc is not None:
+        sel.register(ipc, selectors.EVENT_READ, None)
+    elif hosted:
+        raise ConnectionError("Scale monitor needs the bridge IPC socket when hosted")
+
+    def run_command(cmd_req, now):
+        try:
+            resp = handle_monitor_command(cmd_req, channels, commands, sel, make_channel, now)
+            if resp:
+                emit_event(resp)
+        except Exception as e:
+            print(f"Error processing command: {e}", file=sys.stderr)
+
+    def fail(ch, err, now):
+        print(f"Error reading scale {ch.port}: {err}", file=sys.stderr)
+        if ch.ser:
+            try:
+                sel.unregister(ch.ser)
+            except (KeyError, ValueError):
+                pass
+        ch.close(now)
+
+    try:
+        while True:
+            now = time.time()
+
+            # 1. Manage Connections (per port, without blocking the others)
+            for ch in list(channels.values()):
+                if ch.ser is None and now >= ch.retry_at:
                     try:
-                        cmd_req = json.loads(line)
-                        cmd = cmd_req.get('cmd')
-                        req_id = cmd_req.get('requestId')
-                        
-                        if cmd == 'tare':
-                            # Perform Tare: Read RAW specifically for this? 
-                            # We can just do a read right now.
-                            ser.reset_input_buffer()
-                            ser.write(b'R')
-                            resp = ser.readline().decode('utf-8').strip()
-                            if resp:
-                                try:
-                                    raw_val = int(resp)
-                                    config['tare_offset'] = raw_val
-                                    save_config({port: config}) # Current logic saves entire file, need to be careful? 
-                                    # actually save_config expects full config object? 
-                                    # The helper update_device_config loads file, updates, saves.
-                                    # We should just call update_device_config logic but efficiently.
-                                    # Re-using local helper for safety:
-                                    update_device_config(port, "tare_offset", raw_val)
-                                    
-                                    # Reload local config variable
-                                    config = get_device_config(port)
-                                    
-                                    print(json.dumps({
-                                        "type": "tare_complete",
-                                        "requestId": req_id,
-                                        "success": True,
-                                        "data": {"value": raw_val}
-                                    }))
-                                except Exception as e:
-                                    print(json.dumps({
-                                        "type": "tare_complete",
-                                        "requestId": req_id,
-                                        "success": False,
-                                        "message": str(e)
-                                    }))
-                            else:
-                                print(json.dumps({
-                                    "type": "tare_complete",
-                                    "requestId": req_id,
-                                    "success": False,
-                                    "message": "No response from scale"
-                                }))
-                                
-                        elif cmd == 'calibrate':
-                            weight = float(cmd_req.get('weight', 0))
-                            if weight <= 0:
-                                print(json.dumps({
-                                        "type": "calibration_complete",
-                                        "requestId": req_id,
-                                        "success": False,
-                                        "message": "Invalid weight"
-                                }))
-                            else:
-                                ser.reset_input_buffer()
-                                ser.write(b'R')
-                                resp = ser.readline().decode('utf-8').strip()
-                                if resp:
-                                    try:
-                                        raw_val = int(resp)
-                                        tare = config.get("tare_offset", 0)
-                                        factor = (raw_val - tare) / weight
-                                        
-                                        update_device_config(port, "calibration_factor", factor)
-                                        config = get_device_config(port)
-                                        
-                                        print(json.dumps({
-                                            "type": "calibration_complete",
-                                            "requestId": req_id,
-                                            "success": True,
-                                            "data": {"factor": factor}
-                                        }))
-                                    except Exception as e:
-                                        print(json.dumps({
-                                            "type": "calibration_complete",
-                                            "requestId": req_id,
-                                            "success": False,
-                                            "message": str(e)
-                                        }))
-                        
-                        sys.stdout.flush()
-                        
+                        ch.open(now)
+                        sel.register(ch.ser, selectors.EVENT_READ, ch)
                     except Exception as e:
-                        print(f"Error processing command: {e}", file=sys.stderr)
+                        fail(ch, e, now)
 
-            # 3. Regular Polling
-            ser.write(b'R')
-            line = ser.readline().decode('utf-8').strip()
-            
-            if line:
+            # 2. Request the next sample from every scale that is due
+            for ch in list(channels.values()):
                 try:
-                    raw = int(line)
-                    # Median Filter
-                    raw_history.append(raw)
-                    if len(raw_history) > 3: # Keep window small for responsiveness
-                         raw_history.popleft()
-                    
-                    sorted_raw = sorted(raw_history)
-                    filtered_raw = sorted_raw[len(sorted_raw) // 2]
-                    
-                    # Use current in-memory config
-                    tare = config.get("tare_offset", 0)
-                    cal = config.get("calibration_factor", 420.0)
-                    if cal == 0: cal = 1
-                    
-                    weight = (filtered_raw - tare) / cal
-                    
-                    # Stable Zero Algorithm
-                    if abs(weight) <= 0.4:
-                        if stable_zero_start is None:
-                            stable_zero_start = time.time()
-                        elif time.time() - stable_zero_start >= 30.0:
-                            print(f"Auto-tare triggered: Weight {weight:.2f}g stable near 0 for 30s", file=sys.stderr)
-                            # Update Tare
-                            config['tare_offset'] = filtered_raw
-                            update_device_config(port, "tare_offset", filtered_raw)
-                            stable_zero_start = None
-                    else:
-                        stable_zero_start = None
-
-                    # Output weight
-                    print(f"WEIGHT:{weight:.2f} (Raw: {filtered_raw})")
-                    sys.stdout.flush()
-                except ValueError:
-                    pass
-            
-            time.sleep(0.05)
+                    ch.poll(now)
+                except Exception as e:
+                    fail(ch, e, now)
 
-        except Exception as e:
-            print(f"Error reading scale: {e}", file=sys.stderr)
-            if ser:
+            # 3. Wait for serial data or a command
+            for key, _ in sel.select(timeout=POLL_INTERVAL):
+                now = time.time()
+                if key.fileobj is ipc:
+                    try:
+                        frames = ipc.read()
+                    except (bridge_ipc.ProtocolError, ValueError) as e:
+                        # A garbled stream can't be resynchronised: drop the connection
+                        print(f"IPC protocol error: {e}", file=sys.stderr)
+                        ipc.close()
+                        frames = None
+                    if frames is None:
+                        if hosted:
+                            raise ConnectionError("Bridge IPC connection closed")
+                        # Bridge went away; events fall back to stdout
+                        sel.unregister(ipc)
+                        continue
+                    for header, _ in frames:
+                        run_command(header, now)
+                    continue
+
+                if key.data is None:
+                    # Read whatever is there; partial lines wait in the buffer
+                    data = os.read(stdin_fd, 4096)
+                    if not data:
+                        # Bridge closed our stdin; keep monitoring but stop selecting on it
+                        sel.unregister(stdin_fd)
+                        continue
+                    stdin_buf.extend(data)
+                    for line in drain_lines(stdin_buf):
+                        if not line:
+                            continue
+                        try:
+                            cmd_req = json.loads(line)
+                        except ValueError as e:
+                            print(f"Error processing command: {e}", file=sys.stderr)
+                            continue
+                        run_command(cmd_req, now)
+                    continue
+
+                ch = key.data
+                if ch.port not in channels or ch.ser is None:
+                    continue
                 try:
-                    ser.close()
-                except:
-                    pass
-                ser = None
-            time.sleep(2) # Wait before reconnect attempt
+                    for line in ch.read_lines():
+                        for event in ch.handle_line(line, now):
+                            emit_event(event)
+                except Exception as e:
+                    fail(ch, e, now)
+                    continue
+
+                for resp in commands.resolve(ch):
+                    emit_event(resp)
+
+            for resp in commands.expire(time.time()):
+                emit_event(resp)
+
+            config_store.maybe_flush()
+    finally:
+        for ch in channels.values():
+            ch.close(time.time())
+        if ipc is not None:
+            ipc.close()
+        sel.close()
+
+
+# Recording format: header (magic, version, start time) followed by
+# fixed-size records. A port record names a port index once; sample
+# records are 10 bytes (kind, port index, ms since start, raw value).
+RECORD_MAGIC = b"SCALEREC"
+RECORD_VERSION = 1
+_REC_HEADER = struct.Struct('<8sHd')
+_REC_KIND = struct.Struct('<B')
+_REC_PORT = struct.Struct('<BBH')
+_REC_SAMPLE = struct.Struct('<BBIi')
+_REC_KIND_PORT = 0
+_REC_KIND_SAMPLE = 1
+
+class SampleRecorder:
+    """Appends raw scale samples with timestamps to a compact binary file."""
+
+    def __init__(self, path):
+        self.start = time.time()
+        self.ports = {}
+        self.f = open(path, 'wb')
+        self.f.write(_REC_HEADER.pack(RECORD_MAGIC, RECORD_VERSION, self.start))
+
+    def sample(self, port, raw, now):
+        idx = self.ports.get(port)
+        if idx is None:
+            idx = self.ports[port] = len(self.ports)
+            name = port.encode('utf-8')
+            self.f.write(_REC_PORT.pack(_REC_KIND_PORT, idx, len(name)) + name)
+        self.f.write(_REC_SAMPLE.pack(_REC_KIND_SAMPLE, idx, int((now - self.start) * 1000), raw))
+
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+def read_recording(path):
+    """Yield (port, seconds since start, raw) from a recording file."""
+    with open(path, 'rb') as f:
+        magic, version, _start = _REC_HEADER.unpack(f.read(_REC_HEADER.size))
+        if magic != RECORD_MAGIC or version != RECORD_VERSION:
+            raise ValueError(f"{path} is not a scale recording (v{RECORD_VERSION})")
+        ports = {}
+        while True:
+            kind_byte = f.read(1)
+            if not kind_byte:
+                return
+            kind = kind_byte[0]
+            if kind == _REC_KIND_PORT:
+                _, idx, length = _REC_PORT.unpack(kind_byte + f.read(_REC_PORT.size - 1))
+                ports[idx] = f.read(length).decode('utf-8')
+            elif kind == _REC_KIND_SAMPLE:
+                data = f.read(_REC_SAMPLE.size - 1)
+                if len(data) < _REC_SAMPLE.size - 1:
+                    return  # Truncated tail (recorder killed mid-write)
+                _, idx, ms, raw = _REC_SAMPLE.unpack(kind_byte + data)
+                yield ports[idx], ms / 1000.0, raw
+            else:
+                raise ValueError(f"Corrupt recording: unknown record kind {kind}")
+
+class ReplaySerial:
+    """Fake serial port that answers each 'R' with the next queued recorded sample."""
+
+    def __init__(self, port=None):
+        self.port = port
+        self.samples = deque()
+        self.out = bytearray()
+
+    @property
+    def in_waiting(self):
+        return len(self.out)
+
+    def write(self, data):
+        for _ in range(data.count(b'R')):
+            if self.samples:
+                self.out.extend(f"{self.samples.popleft()}\r\n".encode())
+        return len(data)
+
+    def read(self, size=1):
+        chunk = bytes(self.out[:size])
+        del self.out[:size]
+        return chunk
+
+    def reset_input_buffer(self):
+        self.out.clear()
+
+    def close(self):
+        pass
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+def replay(path, heartbeat=HEARTBEAT_INTERVAL, change_threshold=CHANGE_THRESHOLD,
+           speed=0, events_out=None, expect=None):
+    """Run a recording through the monitor pipeline on a virtual clock.
+
+    Samples go through ScaleChannel exactly as in monitor() (poll, serial
+    read, median filter, calibration, drift tracking, event detector) but
+    via ReplaySerial and with the recorded timestamps, so a run is
+    deterministic and as fast as the CPU allows. Prints a JSON report with
+    throughput, per-sample processing latency and settle times; with
+    --expect the produced events must match a previous run.
+    """
+    global config_store
+    if not path:
+        print(json.dumps({"error": "Recording file required (--file)"}))
+        return 2
+
+    # Use the stored calibration, but never write back to it
+    config_store = ConfigStore.detached(ConfigStore(CONFIG_FILE)._read_file())
+
+    samples = list(read_recording(path))
+    channels = {}
+    events = []
+    counts = {}
+    process_times = []
+    event_times = []
+    settle_times = []
+    moving_since = {}
+
+    wall_start = time.perf_counter()
+    for port, t, raw in samples:
+        ch = channels.get(port)
+        if ch is None:
+            ch = channels[port] = ScaleChannel(port, heartbeat, change_threshold, serial_factory=ReplaySerial)
+            ch.open(t - ARDUINO_RESET_DELAY)
+
+        if speed > 0:
+            delay = t / speed - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        now = max(t, ch.next_poll_at)
+        ch.ser.samples.append(raw)
+        started = time.perf_counter()
+        ch.poll(now)
+        if ch.ser.samples:
+            # Poll wasn't due on the virtual clock; the recording says a sample arrived
+            ch.ser.write(b'R')
+        produced = []
+        for line in ch.read_lines():
+            produced.extend(ch.handle_line(line, now))
+        elapsed = time.perf_counter() - started
+
+        process_times.append(elapsed)
+        for event in produced:
+            name = event["event"]
+            counts[name] = counts.get(name, 0) + 1
+            event_times.append(elapsed)
+            if name == "changed":
+                moving_since.setdefault(port, t)
+            elif name == "settled" and port in moving_since:
+                settle_times.append(t - moving_since.pop(port))
+            events.append(dict(event, t=round(t, 3)))
+    wall = time.perf_counter() - wall_start
+
+    duration = samples[-1][1] - samples[0][1] if samples else 0.0
+    us = lambda v: None if v is None else round(v * 1e6, 1)
+    report = {
+        "samples": len(samples),
+        "ports": sorted(channels),
+        "recording_seconds": round(duration, 3),
+        "wall_seconds": round(wall, 4),
+        "samples_per_second": round(len(samples) / wall, 1) if wall > 0 else None,
+        "speedup": round(duration / wall, 1) if wall > 0 else None,
+        "events": counts,
+        "event_ratio": round(len(events) / len(samples), 4) if samples else 0,
+        "sample_latency_us": {"p50": us(_percentile(process_times, 50)), "p99": us(_percentile(process_times, 99))},
+        "event_latency_us": {"p50": us(_percentile(event_times, 50)), "p99": us(_percentile(event_times, 99))},
+        "settle_seconds": {
+            "p50": round(_percentile(settle_times, 50), 3) if settle_times else None,
+            "max": round(max(settle_times), 3) if settle_times else None
+        }
+    }
+
+    if events_out:
+        with open(events_out, 'w') as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+    status = 0
+    if expect:
+        with open(expect, 'r') as f:
+            expected = [json.loads(line) for line in f if line.strip()]
+        key = lambda e: (e.get("port"), e.get("event"), e.get("weight"), e.get("t"))
+        mismatches = [i for i, (a, b) in enumerate(zip(events, expected)) if key(a) != key(b)]
+        if len(events) != len(expected):
+            mismatches.append(min(len(events), len(expected)))
+        report["regression"] = {
+            "expected": len(expected),
+            "actual": len(events),
+            "first_mismatch": mismatches[0] if mismatches else None,
+            "passed": not mismatches
+        }
+        status = 0 if not mismatches else 1
+
+    print(json.dumps(report, indent=2))
+    return status
 
 if __name__ == '__main__':
     args = get_args()
@@ -332,9 +1161,13 @@ if __name__ == '__main__':
     elif args.command == 'tare':
         tare_scale(args.port)
     elif args.command == 'calibrate':
-        calibrate_scale(args.port, args.weight)
+        calibrate_scale(args.port, args.weight, reset=args.reset, fit=args.fit)
     elif args.command == 'monitor':
-        monitor(args.port)
+        ports = [p for p in (args.port or '').split(',') if p]
+        monitor(ports, heartbeat=args.heartbeat, change_threshold=args.change_threshold, record=args.record)
+    elif args.command == 'replay':
+        sys.exit(replay(args.file, heartbeat=args.heartbeat, change_threshold=args.change_threshold,
+                        speed=args.speed, events_out=args.events_out, expect=args.expect))
     elif args.command == 'status':
          try:
             s = serial.Serial(args.port, 9600, timeout=1)
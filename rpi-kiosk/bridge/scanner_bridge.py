@@ -2,8 +2,17 @@ import sys
 import os
 import glob
 import time
+import json
 import signal
-from evdev import InputDevice, categorize, ecodes, list_devices
+import argparse
+import tempfile
+from bisect import bisect
+
+import fswatch
+import metrics
+import bridge_ipc
+import barcode_utils
+from product_cache import ProductCache
 
 # Mapping for standard US keyboard (scancode -> char)
 # This handles the main alphanumeric keys.
@@ -37,79 +46,674 @@ SHIFT_KEYS = {
     ' ': ' '
 }
 
-def find_scanner():
-    """Finds the first device in /dev/input/by-id/ ending in -kbd"""
+# evdev constants (linux/input-event-codes.h); kept local so the decoder
+# and benchmark don't need evdev itself
+EV_KEY = 1
+KEY_UP = 0
+KEY_DOWN = 1
+KEY_ENTER = 28
+KEY_KPENTER = 96
+KEY_LEFTSHIFT = 42
+KEY_RIGHTSHIFT = 54
+
+def _build_tables():
+    """Expand KEYS/SHIFT_KEYS into 256-entry tuples of ASCII codes (0 = unmapped)."""
+    normal = [0] * 256
+    shifted = [0] * 256
+    for code, char in KEYS.items():
+        normal[code] = ord(char)
+        shifted[code] = ord(SHIFT_KEYS.get(char, char.upper()))
+    return tuple(normal), tuple(shifted)
+
+NORMAL_TABLE, SHIFT_TABLE = _build_tables()
+
+class ScanDecoder:
+    """Keystroke-to-barcode decoder working on raw event code/value.
+
+    The shift state is simply which lookup table is active, characters are
+    appended to a bytearray as ASCII codes, and nothing is allocated per key
+    event; a string is only built when Enter completes a barcode.
+    """
+
+    __slots__ = ('buffer', 'table')
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.table = NORMAL_TABLE
+
+    def feed(self, code, value):
+        """Process one EV_KEY event, returns the barcode when Enter completes one."""
+        if value == KEY_DOWN:
+            char = self.table[code] if code < 256 else 0
+            if char:
+                self.buffer.append(char)
+            elif code == KEY_ENTER or code == KEY_KPENTER:
+                if self.buffer:
+                    barcode = self.buffer.decode('ascii')
+                    self.buffer.clear()
+                    return barcode
+            elif code == KEY_LEFTSHIFT or code == KEY_RIGHTSHIFT:
+                self.table = SHIFT_TABLE
+        elif value == KEY_UP and (code == KEY_LEFTSHIFT or code == KEY_RIGHTSHIFT):
+            self.table = NORMAL_TABLE
+        return None
+
+BY_ID_DIR = '/dev/input/by-id'
+RESCAN_INTERVAL = 2.0     # polling fallback when inotify is unavailable
+OPEN_RETRY_DELAY = 0.25   # first retry after a failed open/grab, doubles up to MAX_RETRY_DELAY
+MAX_RETRY_DELAY = 30.0
+
+CONFIG_FILE = "scanner_config.json"
+PROFILE_FILE = "scanner_profiles.json"
+if os.path.isdir("/data"):
+    CONFIG_FILE = "/data/scanner_config.json"
+    PROFILE_FILE = "/data/scanner_profiles.json"
+
+# Scanner vs keyboard classification from inter-key timing. Scanners type a
+# whole code in a few ms per key, people need 50ms+ between keys.
+TIMING_BUCKETS = (0.001, 0.002, 0.005, 0.010, 0.020, 0.050, 0.100, 0.250)  # upper bounds, s
+SCANNER_KEY_INTERVAL = 0.015
+BURST_GAP = 1.0        # a pause this long ends a line without Enter (and drops it)
+MIN_LINE_KEYS = 6      # shorter lines say nothing about the device
+SCANNER_LINE_RATIO = 0.8
+KEYBOARD_LINES = 2     # human-speed lines needed before calling it a keyboard
+
+# dedup_window: drop a repeat of the same barcode from the same device within
+# this many seconds (handhelds often send one read two or three times).
+# burst_window: when > 0, identical scans closer together than this are
+# coalesced into one BARCODE line with count=N.
+# validate: drop reads whose check digit / structure is wrong (see barcode_utils).
+# role: "auto" classifies the device from its timing, "scanner" always grabs
+# it, "keyboard" never does.
+DEFAULT_DEVICE_CONFIG = {
+    "dedup_window": 0.3,
+    "burst_window": 0,
+    "validate": True,
+    "role": "auto"
+}
+
+def get_device_config(device_id, defaults):
+    """Per-device settings from CONFIG_FILE ({device_id: {...}}) over the defaults."""
+    config = dict(defaults)
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                stored = json.load(f)
+            config.update(stored.get(device_id, {}))
+        except Exception as e:
+            sys.stderr.write(f"Error loading {CONFIG_FILE}: {e}\n")
+    return config
+
+def load_profiles():
+    """Cached device verdicts and timing statistics, {device_id: {...}}."""
+    if os.path.exists(PROFILE_FILE):
+        try:
+            with open(PROFILE_FILE, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            sys.stderr.write(f"Error loading {PROFILE_FILE}: {e}\n")
+    return {}
+
+def save_profiles(profiles):
+    directory = os.path.dirname(os.path.abspath(PROFILE_FILE))
     try:
-        devices = glob.glob('/dev/input/by-id/*-kbd')
-        if not devices:
-            return None
-        
-        # Pick the first one. 
-        # In a robust system we might want to exclude real keyboards if any, 
-        # but the prompt implies this is for integration where the scanner is the target.
-        device_path = devices[0]
-        # Resolve symlink
-        real_path = os.path.realpath(device_path)
-        return real_path
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.scanner_profiles.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, PROFILE_FILE)
     except Exception as e:
-        sys.stderr.write(f"Error finding scanner: {e}\n")
+        sys.stderr.write(f"Error saving {PROFILE_FILE}: {e}\n")
+
+class KeyTiming:
+    """Inter-key interval histogram plus per-line counters for one device."""
+
+    __slots__ = ('histogram', 'last', 'line_keys', 'line_fast',
+                 'keys', 'lines', 'scanner_lines', 'keyboard_lines')
+
+    def __init__(self, profile=None):
+        profile = profile or {}
+        histogram = profile.get("histogram") or []
+        if len(histogram) != len(TIMING_BUCKETS) + 1:
+            histogram = [0] * (len(TIMING_BUCKETS) + 1)
+        self.histogram = histogram
+        self.keys = profile.get("keys", 0)
+        self.lines = profile.get("lines", 0)
+        self.scanner_lines = profile.get("scanner_lines", 0)
+        self.keyboard_lines = 0
+        self.last = None
+        self.line_keys = 0
+        self.line_fast = 0
+
+    def key(self, t):
+        """Records a key press at event time t, returns False after a BURST_GAP pause."""
+        last = self.last
+        self.last = t
+        self.keys += 1
+        if last is None:
+            return True
+        interval = t - last
+        if interval >= BURST_GAP or interval < 0:
+            self.line_keys = self.line_fast = 0
+            return False
+        self.histogram[bisect(TIMING_BUCKETS, interval)] += 1
+        self.line_keys += 1
+        if interval < SCANNER_KEY_INTERVAL:
+            self.line_fast += 1
+        return True
+
+    def end_line(self):
+        """Classifies the line just finished: "scanner", "keyboard" or None."""
+        keys, fast = self.line_keys, self.line_fast
+        self.line_keys = self.line_fast = 0
+        self.lines += 1
+        if keys < MIN_LINE_KEYS:
+            return None
+        if fast >= keys * SCANNER_LINE_RATIO:
+            self.scanner_lines += 1
+            return "scanner"
+        if fast <= keys * (1 - SCANNER_LINE_RATIO):
+            self.keyboard_lines += 1
+            return "keyboard"
         return None
 
-def main():
-    device_path = find_scanner()
-    if not device_path:
-        sys.stderr.write("No scanner found\n")
-        sys.exit(1)
+    def profile(self, role):
+        return {
+            "role": role,
+            "keys": self.keys,
+            "lines": self.lines,
+            "scanner_lines": self.scanner_lines,
+            "histogram_buckets_ms": [b * 1000 for b in TIMING_BUCKETS],
+            "histogram": self.histogram
+        }
 
-    print(f"Connecting to {device_path}...", flush=True)
+def find_scanners():
+    """Finds every device in /dev/input/by-id/ ending in -kbd.
 
+    Returns {device_id: real_path}, where device_id is the by-id name without
+    the -event-kbd suffix. Several by-id links can point at the same event
+    node, only the first is kept.
+    """
+    scanners = {}
     try:
-        device = InputDevice(device_path)
-        
-        # Exclusive grab
-        device.grab()
-        print(f"Grabbed {device.name}", flush=True)
-
-        buffer = []
-        caps = False # basic caps lock support if needed, usually scanner doesn't use it
-        shift = False
-
-        for event in device.read_loop():
-            if event.type == ecodes.EV_KEY:
-                data = categorize(event)
-                # data.keystate: 0=up, 1=down, 2=hold
-                if data.keystate == 1: # Key Down
-                    if data.scancode == 42 or data.scancode == 54: # Left/Right Shift
-                        shift = True
-                        continue
-                    
-                    if data.scancode == 28 or data.scancode == 96: # Enter
-                        barcode = "".join(buffer)
-                        if barcode:
-                            print(f"BARCODE:{barcode}", flush=True)
-                        buffer = []
+        seen = set()
+        for link in sorted(glob.glob(os.path.join(BY_ID_DIR, '*-kbd'))):
+            # Real keyboards are opened too; KeyTiming tells them apart from scanners
+            real_path = os.path.realpath(link)
+            if real_path in seen:
+                continue
+            seen.add(real_path)
+            device_id = os.path.basename(link)
+            for suffix in ('-event-kbd', '-kbd'):
+                if device_id.endswith(suffix):
+                    device_id = device_id[:-len(suffix)]
+                    break
+            scanners[device_id] = real_path
+    except Exception as e:
+        sys.stderr.write(f"Error finding scanners: {e}\n")
+    return scanners
+
+class ScannerDevice:
+    """One keyboard-like input device with its own decoder (buffer and shift state).
+
+    Devices start ungrabbed unless already known to be scanners and are only
+    grabbed once a line typed at scanner speed shows up; until then nothing
+    they type is emitted, so a real keyboard keeps working. Also applies the
+    device's dedup window and burst coalescing; a burst in progress is held
+    in `pending` as [barcode, count, deadline].
+    """
+
+    def __init__(self, device_id, path, device, config=DEFAULT_DEVICE_CONFIG, profile=None):
+        self.device_id = device_id
+        self.path = path
+        self.device = device
+        self.decoder = ScanDecoder()
+        self.timing = KeyTiming(profile)
+        self.forced_role = config.get("role", "auto") in ("scanner", "keyboard")
+        if self.forced_role:
+            self.role = config["role"]
+        else:
+            self.role = (profile or {}).get("role", "unknown")
+        self.grabbed = False
+        self.dedup_window = float(config.get("dedup_window", 0) or 0)
+        self.burst_window = float(config.get("burst_window", 0) or 0)
+        self.validate = bool(config.get("validate", True))
+        self.last_barcode = None
+        self.last_seen = 0.0
+        self.pending = None
+
+    def fileno(self):
+        return self.device.fd
+
+    def read(self):
+        """Drains pending events.
+
+        Returns (barcodes, reclassified): the barcodes completed on a grabbed
+        device or typed at scanner speed, and whether the role changed.
+        """
+        feed = self.decoder.feed
+        timing = self.timing
+        barcodes = []
+        reclassified = False
+        try:
+            for event in self.device.read():
+                if event.type != EV_KEY:
+                    continue
+                if event.value == KEY_DOWN and not timing.key(event.sec + event.usec * 1e-6):
+                    # Long pause: whatever was buffered isn't part of one scan
+                    self.decoder.buffer.clear()
+                barcode = feed(event.code, event.value)
+                if barcode is None:
+                    continue
+                verdict = timing.end_line()
+                if verdict and self.classify(verdict):
+                    reclassified = True
+                if self.grabbed or verdict == "scanner":
+                    barcodes.append(barcode)
+        except BlockingIOError:
+            pass
+        return barcodes, reclassified
+
+    def classify(self, verdict):
+        """Applies a line verdict, returns True if the device role changed."""
+        if self.forced_role or self.role == "scanner":
+            return False
+        if verdict == "scanner":
+            self.role = "scanner"
+            return True
+        if self.role == "unknown" and self.timing.keyboard_lines >= KEYBOARD_LINES:
+            self.role = "keyboard"
+            return True
+        return False
+
+    def grab(self):
+        if not self.grabbed:
+            # Exclusive grab
+            self.device.grab()
+            self.grabbed = True
+            print(f"Grabbed {self.device.name} as {self.device_id}", flush=True)
+
+    def accept(self, barcode, now):
+        """Runs a decoded barcode through dedup and burst coalescing.
+
+        Returns the (barcode, count) pairs ready to be emitted.
+        """
+        repeat = barcode == self.last_barcode
+        if repeat and now - self.last_seen < self.dedup_window:
+            # Keep extending the window so a stuck trigger stays quiet
+            self.last_seen = now
+            SCANS_DEDUPED.inc()
+            return []
+        self.last_barcode = barcode
+        self.last_seen = now
+
+        if self.burst_window <= 0:
+            return [(barcode, 1)]
+
+        ready = []
+        if self.pending is not None:
+            if self.pending[0] == barcode:
+                self.pending[1] += 1
+                self.pending[2] = now + self.burst_window
+                return ready
+            ready.append(self.flush())
+        self.pending = [barcode, 1, now + self.burst_window]
+        return ready
+
+    def deadline(self):
+        return self.pending[2] if self.pending is not None else None
+
+    def flush(self):
+        barcode, count, _ = self.pending
+        self.pending = None
+        return barcode, count
+
+    def close(self):
+        if self.grabbed:
+            try:
+                self.device.ungrab()
+            except OSError:
+                pass
+            self.grabbed = False
+        try:
+            self.device.close()
+        except OSError:
+            pass
+
+# Pantry's own codes are resolved by the backend, everything else may be a product
+NON_PRODUCT_TYPES = ('StockItem', 'Recipe', 'Equipment', 'HomeAssistant')
+
+products = ProductCache()
+
+READ_TIME = metrics.histogram("scanner_read_seconds", "Draining and decoding key events for one wakeup")
+EMIT_TIME = metrics.histogram("scanner_emit_seconds", "Normalizing, looking up and printing one barcode")
+SCANS = metrics.counter("scanner_scans_total", "Barcodes emitted")
+SCANS_REJECTED = metrics.counter("scanner_rejected_total", "Reads dropped by check digit validation")
+SCANS_DEDUPED = metrics.counter("scanner_deduplicated_total", "Repeat reads dropped inside the dedup window")
+
+# Connection to server.js (bridge_ipc), None = print BARCODE: lines instead
+ipc = None
+
+def emit_barcode(barcode, device_id, count=1):
+    """Sends the normalized barcode to server.js.
+
+    Over IPC it is a 'barcode' frame with the extra fields in "info"; on
+    stdout the same fields are tab separated key=value pairs.
+    """
+    started = time.perf_counter()
+    normalized = barcode_utils.normalize(barcode)
+    info = {"device": device_id, "type": normalized['type']}
+    if count > 1:
+        info["count"] = count
+    if normalized['type'] not in NON_PRODUCT_TYPES:
+        product = products.lookup(normalized['barcode'])
+        if product is None and 'raw' in normalized:
+            product = products.lookup(normalized['raw'])
+        if product:
+            info["product_id"] = product[0]
+            info["product"] = product[1]
+    for key, value in normalized.items():
+        if key not in ("barcode", "type", "valid"):
+            info[key] = value
+
+    if ipc is None or not ipc.send({"type": "barcode", "barcode": normalized['barcode'], "info": info}):
+        line = f"BARCODE:{normalized['barcode']}"
+        for key, value in info.items():
+            value = str(value).replace('\t', ' ').replace('\n', ' ')
+            line += f"\t{key}={value}"
+        print(line, flush=True)
+    SCANS.inc()
+    EMIT_TIME.observe(time.perf_counter() - started)
+
+def open_scanner(device_id, path, config, profile=None):
+    from evdev import InputDevice
+
+    print(f"Connecting to {device_id} ({path})...", flush=True)
+    scanner = ScannerDevice(device_id, path, InputDevice(path), config, profile)
+    try:
+        if scanner.role == "scanner":
+            scanner.grab()
+        else:
+            print(f"Watching {device_id} ({scanner.role}), grabbing once it types like a scanner", flush=True)
+    except OSError:
+        scanner.close()
+        raise
+    return scanner
+
+class ScannerHub:
+    """Keeps every present scanner grabbed, following hotplug via inotify.
+
+    Every *-kbd device is opened; which ones get grabbed is decided by
+    ScannerDevice from key timing, with verdicts cached in PROFILE_FILE so a
+    known scanner is grabbed straight away next time.
+
+    /dev/input/by-id only exists while some input device is attached, so until
+    it appears the closest existing parent is watched instead. Without inotify
+    the directory is rescanned every RESCAN_INTERVAL seconds.
+    """
+
+    def __init__(self, defaults=DEFAULT_DEVICE_CONFIG):
+        import selectors
+
+        self.defaults = defaults
+        self.profiles = load_profiles()
+        self.sel = selectors.DefaultSelector()
+        self.scanners = {}
+        self.idle = False
+        self.retry_at = None
+        self.retry_delay = OPEN_RETRY_DELAY
+        self.watch_wd = None
+        self.watch_path = None
+        try:
+            self.watcher = fswatch.Watcher()
+            self.sel.register(self.watcher, selectors.EVENT_READ)
+        except OSError as e:
+            sys.stderr.write(f"Hotplug watching unavailable, polling instead: {e}\n")
+            self.watcher = None
+
+    def rewatch(self):
+        if self.watcher is None:
+            return
+        path = BY_ID_DIR
+        while not os.path.isdir(path):
+            path = os.path.dirname(path)
+        if path == self.watch_path and self.watch_wd in self.watcher.paths:
+            return
+        if self.watch_wd is not None:
+            self.watcher.remove(self.watch_wd)
+        mask = (fswatch.IN_CREATE | fswatch.IN_DELETE | fswatch.IN_MOVED_TO |
+                fswatch.IN_MOVED_FROM | fswatch.IN_DELETE_SELF | fswatch.IN_ONLYDIR)
+        self.watch_wd = self.watcher.add(path, mask)
+        self.watch_path = path
+
+    def sync(self, now):
+        """Grabs new scanners and releases the ones whose by-id link went away."""
+        import selectors
+
+        self.rewatch()
+        found = find_scanners()
+        for device_id, scanner in list(self.scanners.items()):
+            if found.get(device_id) != scanner.path:
+                self.release(scanner, "removed")
+
+        failed = False
+        for device_id, path in found.items():
+            if device_id in self.scanners:
+                continue
+            try:
+                scanner = open_scanner(device_id, path, get_device_config(device_id, self.defaults),
+                                       self.profiles.get(device_id))
+            except OSError as e:
+                # udev may still be setting permissions on a fresh node
+                sys.stderr.write(f"Device error on {device_id}: {e}\n")
+                failed = True
+                continue
+            self.scanners[device_id] = scanner
+            self.sel.register(scanner, selectors.EVENT_READ)
+
+        if failed:
+            self.retry_at = now + self.retry_delay
+            self.retry_delay = min(self.retry_delay * 2, MAX_RETRY_DELAY)
+        else:
+            self.retry_at = None
+            self.retry_delay = OPEN_RETRY_DELAY
+
+        if not self.scanners and not self.idle:
+            print("No scanner found, waiting for one to be plugged in", flush=True)
+        self.idle = not self.scanners
+
+    def release(self, scanner, reason):
+        if self.scanners.get(scanner.device_id) is not scanner:
+            return
+        del self.scanners[scanner.device_id]
+        self.sel.unregister(scanner)
+        scanner.close()
+        self.profiles[scanner.device_id] = scanner.timing.profile(scanner.role)
+        save_profiles(self.profiles)
+        if scanner.pending is not None:
+            barcode, count = scanner.flush()
+            emit_barcode(barcode, scanner.device_id, count)
+        print(f"Released {scanner.device_id} ({reason})", flush=True)
+
+    def timeout(self, now):
+        deadlines = []
+        if self.retry_at is not None:
+            deadlines.append(self.retry_at)
+        if self.watcher is None:
+            deadlines.append(self.next_poll)
+        for scanner in self.scanners.values():
+            deadline = scanner.deadline()
+            if deadline is not None:
+                deadlines.append(deadline)
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - now)
+
+    def run(self):
+        now = time.monotonic()
+        self.sync(now)
+        self.next_poll = now + RESCAN_INTERVAL
+
+        while True:
+            rescan = False
+            for key, _ in self.sel.select(self.timeout(time.monotonic())):
+                if key.fileobj is self.watcher:
+                    if self.watcher.read():
+                        rescan = True
+                    continue
+
+                scanner = key.fileobj
+                if self.scanners.get(scanner.device_id) is not scanner:
+                    continue
+                try:
+                    started = time.perf_counter()
+                    barcodes, reclassified = scanner.read()
+                    READ_TIME.observe(time.perf_counter() - started)
+                    if reclassified:
+                        print(f"Classified {scanner.device_id} as {scanner.role}", flush=True)
+                        if scanner.role == "scanner":
+                            scanner.grab()
+                        self.profiles[scanner.device_id] = scanner.timing.profile(scanner.role)
+                        save_profiles(self.profiles)
+                except OSError as e:
+                    self.release(scanner, str(e))
+                    continue
+                now = time.monotonic()
+                for barcode in barcodes:
+                    if scanner.validate and not barcode_utils.normalize(barcode)["valid"]:
+                        SCANS_REJECTED.inc()
+                        sys.stderr.write(f"Rejected invalid read from {scanner.device_id}: {barcode!r}\n")
                         continue
-                    
-                    # Map key
-                    if data.scancode in KEYS:
-                        char = KEYS[data.scancode]
-                        if shift:
-                            char = SHIFT_KEYS.get(char, char.upper())
-                        
-                        buffer.append(char)
-                        
-                elif data.keystate == 0: # Key Up
-                    if data.scancode == 42 or data.scancode == 54:
-                        shift = False
-
-    except OSError as e:
-        sys.stderr.write(f"Device error: {e}\n")
-        sys.exit(1)
+                    for code, count in scanner.accept(barcode, now):
+                        emit_barcode(code, scanner.device_id, count)
+
+            now = time.monotonic()
+            for scanner in self.scanners.values():
+                deadline = scanner.deadline()
+                if deadline is not None and now >= deadline:
+                    barcode, count = scanner.flush()
+                    emit_barcode(barcode, scanner.device_id, count)
+            if self.watcher is None and now >= self.next_poll:
+                self.next_poll = now + RESCAN_INTERVAL
+                rescan = True
+            if rescan or (self.retry_at is not None and now >= self.retry_at):
+                self.sync(now)
+
+    def close(self):
+        for scanner in list(self.scanners.values()):
+            self.release(scanner, "shutdown")
+        if self.watcher is not None:
+            self.watcher.close()
+
+def main(defaults=DEFAULT_DEVICE_CONFIG):
+    # The service stops us with SIGTERM, make sure grabs are released
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    metrics.start("scanner_bridge")
+    global ipc
+    ipc = bridge_ipc.connect("scanner")
+
+    hub = ScannerHub(defaults)
+    try:
+        hub.run()
     except KeyboardInterrupt:
         pass
     except Exception as e:
         sys.stderr.write(f"Unexpected error: {e}\n")
         sys.exit(1)
+    finally:
+        hub.close()
+
+class _SyntheticEvent:
+    __slots__ = ('type', 'code', 'value')
+
+    def __init__(self, type, code, value):
+        self.type = type
+        self.code = code
+        self.value = value
+
+def _synthetic_scan(text):
+    """Events a USB HID scanner produces for one barcode (MSC/KEY/SYN per stroke)."""
+    reverse = {c: code for code, c in enumerate(NORMAL_TABLE) if c}
+    reverse_shift = {c: code for code, c in enumerate(SHIFT_TABLE) if c and c not in reverse}
+    events = []
+
+    def stroke(code, value):
+        events.append(_SyntheticEvent(4, 4, code))  # EV_MSC / MSC_SCAN
+        events.append(_SyntheticEvent(EV_KEY, code, value))
+        events.append(_SyntheticEvent(0, 0, 0))  # EV_SYN
+
+    for char in text.encode('ascii'):
+        if char in reverse:
+            stroke(reverse[char], KEY_DOWN)
+            stroke(reverse[char], KEY_UP)
+        else:
+            stroke(KEY_LEFTSHIFT, KEY_DOWN)
+            stroke(reverse_shift[char], KEY_DOWN)
+            stroke(reverse_shift[char], KEY_UP)
+            stroke(KEY_LEFTSHIFT, KEY_UP)
+    stroke(KEY_ENTER, KEY_DOWN)
+    stroke(KEY_ENTER, KEY_UP)
+    return events
+
+def bench(scans=20000):
+    """Decode synthetic evdev streams and report events/sec and scan-to-output latency."""
+    import json
+    import random
+
+    rng = random.Random(42)
+    samples = ["".join(rng.choice("0123456789") for _ in range(13)) for _ in range(scans // 2)]
+    samples += [f"/S2-{rng.randint(1, 99999)}" for _ in range(scans - len(samples))]
+    streams = [_synthetic_scan(text) for text in samples]
+    flat = [event for stream in streams for event in stream]
+
+    # Throughput over one continuous stream
+    decoder = ScanDecoder()
+    feed = decoder.feed
+    decoded = 0
+    started = time.perf_counter()
+    for event in flat:
+        if event.type == EV_KEY:
+            if feed(event.code, event.value):
+                decoded += 1
+    elapsed = time.perf_counter() - started
+
+    # Latency from the first event of a scan to its barcode
+    latencies = []
+    for stream, expected in zip(streams, samples):
+        t0 = time.perf_counter()
+        for event in stream:
+            if event.type == EV_KEY:
+                barcode = feed(event.code, event.value)
+                if barcode:
+                    latencies.append(time.perf_counter() - t0)
+                    if barcode != expected:
+                        raise AssertionError(f"Decoded {barcode!r}, expected {expected!r}")
+    latencies.sort()
+
+    print(json.dumps({
+        "scans": decoded,
+        "events": len(flat),
+        "events_per_second": round(len(flat) / elapsed),
+        "scans_per_second": round(decoded / elapsed),
+        "scan_latency_us": {
+            "p50": round(latencies[len(latencies) // 2] * 1e6, 2),
+            "p99": round(latencies[int(len(latencies) * 0.99)] * 1e6, 2)
+        }
+    }, indent=2))
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='USB keyboard barcode scanner bridge')
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'bench'])
+    parser.add_argument('--scans', type=int, default=20000, help='bench: number of synthetic scans')
+    parser.add_argument('--dedup-window', type=float, default=DEFAULT_DEVICE_CONFIG["dedup_window"],
+                        help='Seconds within which a repeated barcode from the same device is dropped')
+    parser.add_argument('--burst-window', type=float, default=DEFAULT_DEVICE_CONFIG["burst_window"],
+                        help='Coalesce identical scans closer together than this into one line with count=N (0 = off)')
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help='Pass reads with bad check digits through instead of dropping them')
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        bench(args.scans)
+    else:
+        main({"dedup_window": args.dedup_window, "burst_window": args.burst_window,
+              "validate": args.validate})
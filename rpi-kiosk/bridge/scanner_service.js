@@ -3,14 +3,26 @@ const EventEmitter = require('events');
 const path = require('path');
 
 class ScannerService extends EventEmitter {
-    constructor() {
+    // ipc: bridge_ipc IpcServer; scanner_bridge.py sends 'barcode' frames there
+    // and only falls back to BARCODE: lines on stdout without it.
+    // spawn: false when hardware_service.py hosts the scanner; server.js then
+    // passes that process's output lines to handleLine().
+    constructor(ipc = null, { spawn: spawnBridge = true } = {}) {
         super();
         this.process = null;
         this.respawnTimer = null;
         this.isShuttingDown = false;
 
+        if (ipc) {
+            ipc.on('message', (helper, header) => {
+                if (helper === 'scanner' && header.type === 'barcode') {
+                    this.handleBarcode(header.barcode, header.info || {});
+                }
+            });
+        }
+
         // Start immediately
-        this.start();
+        if (spawnBridge) this.start();
     }
 
     start() {
@@ -28,11 +40,7 @@ class ScannerService extends EventEmitter {
             const lines = data.toString().split('\n');
             lines.forEach(line => {
                 line = line.trim();
-                if (line.startsWith('BARCODE:')) {
-                    const barcode = line.substring(8);
-                    console.log(`Scanner detected: ${barcode}`);
-                    this.emit('scan', barcode);
-                } else if (line) {
+                if (!this.handleLine(line) && line) {
                     // Log other output as debug
                     console.log(`[Scanner]: ${line}`);
                 }
@@ -48,14 +56,33 @@ class ScannerService extends EventEmitter {
             this.process = null;
 
             if (!this.isShuttingDown) {
-                // Restart after 5 seconds
-                // If it exited with 1 (not found), we still want to retry periodically
+                // The bridge stays resident and follows hotplug itself, so an
+                // exit means it crashed. Restart after 5 seconds.
                 console.log('Restarting scanner in 5s...');
                 this.respawnTimer = setTimeout(() => this.start(), 5000);
             }
         });
     }
 
+    // Returns false for anything that isn't a BARCODE: line
+    handleLine(line) {
+        if (!line.startsWith('BARCODE:')) return false;
+        // BARCODE:<code>\tkey=value\t...
+        const [barcode, ...fields] = line.substring(8).split('\t');
+        const info = {};
+        fields.forEach(field => {
+            const eq = field.indexOf('=');
+            if (eq > 0) info[field.substring(0, eq)] = field.substring(eq + 1);
+        });
+        this.handleBarcode(barcode, info);
+        return true;
+    }
+
+    handleBarcode(barcode, info) {
+        console.log(`Scanner detected: ${barcode}${info.device ? ` (${info.device})` : ''}`);
+        this.emit('scan', barcode, info);
+    }
+
     stop() {
         this.isShuttingDown = true;
         if (this.respawnTimer) clearTimeout(this.respawnTimer);
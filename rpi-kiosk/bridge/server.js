@@ -29,10 +29,89 @@ app.get('/health', (req, res) => {
         connected: !!(socket && socket.connected),
         device: 'Brother QL-600', // Hardcoded support for now
         version: packageJson.version,
-        scales: scaleList
+        scales: scaleList,
+        // Last product cache sync: rows fetched / cached, or the error it failed with
+        productCache: productSync.last
     });
 });
 
+// Hardware state for mqtt_bridge.py's Home Assistant telemetry sensors
+app.get('/telemetry', (req, res) => {
+    const printers = {};
+    Object.entries(knownPrinters).forEach(([identifier, info]) => {
+        printers[identifier] = { status: info.status, media: info.media, errors: info.errors };
+    });
+
+    res.json({
+        scales: scaleStates,
+        printers,
+        scanner: scannerStats
+    });
+});
+
+// Hot path latency from the Python helpers (metrics.py), in Prometheus text format.
+// Each helper writes <job>.json into the metrics dir; they're merged here on every scrape.
+const METRICS_DIR = process.env.KIOSK_METRICS_DIR || '/tmp/kiosk_metrics';
+
+function promLabels(labels) {
+    const parts = Object.entries(labels).map(([k, v]) =>
+        `${k}="${String(v).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')}"`);
+    return parts.length ? `{${parts.join(',')}}` : '';
+}
+
+function renderMetrics(snapshots) {
+    const families = new Map();
+    const lines = [];
+    snapshots.forEach(snapshot => {
+        lines.push(`kiosk_metrics_updated_seconds${promLabels({ job: snapshot.job })} ${snapshot.updated}`);
+        (snapshot.metrics || []).forEach(m => {
+            const name = `kiosk_${m.name}`;
+            if (!families.has(name)) families.set(name, { type: m.type, help: m.help, samples: [] });
+            const family = families.get(name);
+            const labels = { job: snapshot.job, ...m.labels };
+            if (m.type === 'histogram') {
+                let cumulative = 0;
+                m.buckets.forEach((le, i) => {
+                    cumulative += m.counts[i];
+                    family.samples.push(`${name}_bucket${promLabels({ ...labels, le })} ${cumulative}`);
+                });
+                family.samples.push(`${name}_bucket${promLabels({ ...labels, le: '+Inf' })} ${m.count}`);
+                family.samples.push(`${name}_sum${promLabels(labels)} ${m.sum}`);
+                family.samples.push(`${name}_count${promLabels(labels)} ${m.count}`);
+            } else {
+                family.samples.push(`${name}${promLabels(labels)} ${m.value}`);
+            }
+        });
+    });
+
+    const out = ['# HELP kiosk_metrics_updated_seconds Last time a helper wrote its metrics',
+        '# TYPE kiosk_metrics_updated_seconds gauge', ...lines];
+    families.forEach((family, name) => {
+        out.push(`# HELP ${name} ${family.help}`);
+        out.push(`# TYPE ${name} ${family.type}`);
+        out.push(...family.samples);
+    });
+    return out.join('\n') + '\n';
+}
+
+app.get('/metrics', async (req, res) => {
+    let files = [];
+    try {
+        files = (await fs.promises.readdir(METRICS_DIR)).filter(f => f.endsWith('.json'));
+    } catch (e) {
+        // No helper has written metrics yet
+    }
+    const snapshots = [];
+    for (const file of files) {
+        try {
+            snapshots.push(JSON.parse(await fs.promises.readFile(path.join(METRICS_DIR, file), 'utf8')));
+        } catch (e) {
+            console.error(`Skipping metrics file ${file}: ${e.message}`);
+        }
+    }
+    res.type('text/plain; version=0.0.4').send(renderMetrics(snapshots));
+});
+
 // API to connect to backend
 const fs = require('fs');
 const path = require('path');
@@ -48,10 +127,16 @@ const SIP_CONFIG_FILE = useDataDir ? path.join(DATA_DIR, 'sip_config.json') : 's
 // ============================
 // PRINT QUEUE
 // ============================
-// Serializes print jobs so only one subprocess accesses the USB printer at a time.
-// Each queue entry: { cmd, tmpFile, requestId, type, onComplete }
+// Serializes print jobs so only one job accesses the USB printer at a time.
+// Each queue entry: { cmd, ipcCommand, tmpFile, requestId, type, onComplete }
+// Jobs run in hardware_service.py (ipcCommand) when its printer component is
+// connected, otherwise as a print_label.py / receipt_printer.py subprocess (cmd).
 const printQueue = [];
 let printQueueProcessing = false;
+const PRINT_TIMEOUT = 30000;
+// Job the hardware service is printing: { job, timer }. A timed out job stays
+// here (timer = null) until the service answers, and later jobs use exec.
+let hostedPrint = null;
 
 function enqueuePrintJob(job) {
     printQueue.push(job);
@@ -66,7 +151,18 @@ function processPrintQueue() {
     const job = printQueue.shift();
     console.log(`[PrintQueue] Processing job ${job.requestId || 'unknown'} (${job.type}). Remaining: ${printQueue.length}`);
 
-    exec(job.cmd, { timeout: 30000 }, (err, stdout, stderr) => {
+    if (job.ipcCommand && !hostedPrint && ipc.isConnected('printer')) {
+        const timer = setTimeout(() => {
+            hostedPrint.timer = null;
+            console.error(`[PrintQueue] Job ${job.requestId} timed out in the hardware service`);
+            finishPrintJob(job, false, 'Printer timed out (hung). Check hardware connection.');
+        }, PRINT_TIMEOUT);
+        hostedPrint = { job, timer };
+        ipc.send('printer', { ...job.ipcCommand, requestId: job.requestId });
+        return;
+    }
+
+    exec(job.cmd, { timeout: PRINT_TIMEOUT }, (err, stdout, stderr) => {
         let success = true;
         let message = job.successMessage || 'Print successful';
 
@@ -83,21 +179,150 @@ function processPrintQueue() {
             if (stderr) console.error(`[PrintQueue] Job ${job.requestId} stderr:`, stderr);
         }
 
-        // Report result
-        if (job.requestId && job.onComplete) {
-            job.onComplete({ requestId: job.requestId, success, message });
-        }
+        finishPrintJob(job, success, message);
+    });
+}
 
-        // Clean up temp file
-        if (job.tmpFile) {
-            try { fs.unlinkSync(job.tmpFile); } catch (e) { }
-        }
+// print_complete from the hardware service, or null if it went away mid-job
+function handlePrintComplete(msg) {
+    if (!hostedPrint) return;
+    if (msg && msg.requestId !== hostedPrint.job.requestId) return;
+    const { job, timer } = hostedPrint;
+    hostedPrint = null;
+    // Already reported as timed out
+    if (!timer) return;
+    clearTimeout(timer);
+
+    if (!msg) {
+        finishPrintJob(job, false, 'Hardware service restarted during the print job');
+    } else if (msg.success) {
+        console.log(`[PrintQueue] Job ${job.requestId} printed by the hardware service`);
+        finishPrintJob(job, true, job.successMessage || 'Print successful');
+    } else {
+        console.error(`[PrintQueue] Error for job ${job.requestId}:`, msg.message);
+        finishPrintJob(job, false, msg.message || 'Unknown print error');
+    }
+}
+
+function finishPrintJob(job, success, message) {
+    // Report result
+    if (job.requestId && job.onComplete) {
+        job.onComplete({ requestId: job.requestId, success, message });
+    }
+
+    // Clean up temp file
+    if (job.tmpFile) {
+        try { fs.unlinkSync(job.tmpFile); } catch (e) { }
+    }
+
+    // Small delay between jobs to let the USB interface fully release
+    setTimeout(() => {
+        printQueueProcessing = false;
+        processPrintQueue();
+    }, 200);
+}
 
-        // Small delay between jobs to let the USB interface fully release
-        setTimeout(() => {
-            printQueueProcessing = false;
-            processPrintQueue();
-        }, 200);
+// ============================
+// LOCAL IPC
+// ============================
+// Helpers (scanner_bridge.py, scale_bridge.py monitor, sip_bridge.py, or the
+// hardware_service.py components hosting them) connect back over a Unix socket using bridge_ipc.py framing and send their events
+// and receive commands there. Helpers that can't connect fall back to
+// stdout/stdin, which are still parsed below.
+const { IpcServer } = require('./bridge_ipc');
+const IPC_SOCKET = process.env.KIOSK_IPC_SOCKET || '/tmp/kiosk_bridge.sock';
+const ipc = new IpcServer(IPC_SOCKET);
+ipc.listen();
+// Inherited by every helper spawned from here on
+process.env.KIOSK_IPC_SOCKET = IPC_SOCKET;
+
+ipc.on('connect', (helper, hello) => {
+    console.log(`IPC: ${helper} connected (pid ${hello.pid})`);
+    if (!USE_HARDWARE_SERVICE) return;
+    // A (re)started hardware service component starts out unconfigured
+    if (helper === 'scale') {
+        ipc.send('scale', { cmd: 'set_ports', ports: monitoredScalePorts });
+    } else if (helper === 'sip') {
+        sipConfigSent = false;
+        startSipBridge();
+    }
+});
+ipc.on('disconnect', (helper) => {
+    console.log(`IPC: ${helper} disconnected`);
+    if (helper === 'printer') handlePrintComplete(null);
+});
+ipc.on('message', (helper, header) => {
+    if (helper === 'scale') {
+        handleScaleMessage(header);
+    } else if (helper === 'sip') {
+        handleSipMessage(header);
+    } else if (helper === 'printer' && header.type === 'print_complete') {
+        handlePrintComplete(header);
+    }
+});
+
+function scaleMonitorActive() {
+    return USE_HARDWARE_SERVICE ? ipc.isConnected('scale') : !!scaleMonitorProcess;
+}
+
+function sipBridgeActive() {
+    return USE_HARDWARE_SERVICE ? ipc.isConnected('sip') : !!sipBridgeProcess;
+}
+
+function sendScaleCommand(command) {
+    if (ipc.send('scale', command)) return;
+    if (!scaleMonitorProcess) throw new Error('Scale monitor not running');
+    scaleMonitorProcess.stdin.write(JSON.stringify(command) + "\n");
+}
+
+function sendSipCommand(command) {
+    if (ipc.send('sip', command)) return;
+    if (!sipBridgeProcess) {
+        console.error(`SIP bridge not running, dropped ${command.cmd}`);
+        return;
+    }
+    sipBridgeProcess.stdin.write(JSON.stringify(command) + "\n");
+}
+
+// ============================
+// HARDWARE SERVICE
+// ============================
+// hardware_service.py hosts the scanner, scale monitor, printers, SIP and MQTT
+// drivers in one resident interpreter and restarts them individually. Its
+// components connect over IPC under the usual helper names, so the handlers
+// above serve both setups. KIOSK_HARDWARE_SERVICE=0 goes back to a process
+// per helper (and entrypoint.sh then starts mqtt_bridge.py itself).
+const USE_HARDWARE_SERVICE = process.env.KIOSK_HARDWARE_SERVICE !== '0';
+let hardwareServiceProcess = null;
+// Gets the BARCODE: lines the scanner prints when IPC is down
+let scannerService = null;
+
+function startHardwareService() {
+    if (hardwareServiceProcess) return;
+
+    console.log('Starting Hardware Service...');
+    const { spawn } = require('child_process');
+    hardwareServiceProcess = spawn('/opt/venv/bin/python3', ['-u', 'hardware_service.py'], {
+        cwd: __dirname
+    });
+
+    hardwareServiceProcess.stdout.on('data', (data) => {
+        data.toString().split('\n').forEach(line => {
+            line = line.trim();
+            if (!line || (scannerService && scannerService.handleLine(line))) return;
+            console.log(`[Hardware]: ${line}`);
+        });
+    });
+
+    hardwareServiceProcess.stderr.on('data', (data) => {
+        console.error(`[Hardware]: ${data.toString().trimEnd()}`);
+    });
+
+    hardwareServiceProcess.on('close', (code) => {
+        // Components restart inside the service; this is the service itself dying
+        console.log(`Hardware service exited with code ${code}, restarting in 5s...`);
+        hardwareServiceProcess = null;
+        setTimeout(startHardwareService, 5000);
     });
 }
 
@@ -140,24 +365,25 @@ app.post('/display-state', (req, res) => {
 
     if (displayState === 'OFF') {
         // Kill scale monitor if it's running
-        if (scaleMonitorProcess) {
+        if (USE_HARDWARE_SERVICE) {
+            // The hosted monitor stays up, it just closes the serial ports
+            console.log("Display OFF: Releasing scale ports");
+            startScaleMonitor([]);
+        } else if (scaleMonitorProcess) {
             console.log("Display OFF: Stopping Scale Monitor to save resources");
             scaleMonitorProcess.kill();
             scaleMonitorProcess = null;
-            currentScalePort = null;
+            monitoredScalePorts = [];
         }
     } else {
         // If ON, try to start immediately if we know the scale
         console.log("Display ON: Enabling devices check");
         checkDevices();
 
-        const keys = Object.keys(knownScales);
-        if (keys.length > 0) {
-            const port = keys[0];
-            if (!scaleMonitorProcess || currentScalePort !== port) {
-                console.log("Display ON: Immediate scale restart");
-                startScaleMonitor(port);
-            }
+        const ports = Object.keys(knownScales);
+        if (ports.length > 0) {
+            console.log("Display ON: Immediate scale restart");
+            startScaleMonitor(ports);
         }
     }
 
@@ -170,6 +396,189 @@ app.post('/display-state', (req, res) => {
     }
 });
 
+// Local command API (mqtt_bridge.py's MQTT command topics). Same handlers as
+// the backend's socket events; each request is answered once the job is done.
+// requestId and printerId end up in temp file names and print commands.
+const SAFE_ID = /^[\w:.-]+$/;
+
+function unsafeIds(body) {
+    return ['requestId', 'printerId'].some(key => body[key] !== undefined && !SAFE_ID.test(String(body[key])));
+}
+
+app.post('/print', (req, res) => {
+    const body = req.body || {};
+    if (unsafeIds(body)) return res.status(400).json({ success: false, message: 'Invalid requestId or printerId' });
+    handlePrintLabel(body, (result) => res.json(result));
+});
+
+app.post('/scale/tare', (req, res) => {
+    const body = req.body || {};
+    if (unsafeIds(body)) return res.status(400).json({ success: false, message: 'Invalid requestId' });
+    requestTare(body, (result) => res.json(result));
+});
+
+app.get('/scale/weight', (req, res) => {
+    readScale(req.query.port, (result) => res.json(result));
+});
+
+// Print request from the backend (print_label) or a local client (POST /print).
+// emitComplete gets { requestId, success, message } once the job has run.
+function handlePrintLabel(payload, emitComplete) {
+    console.log('Received print command:', payload);
+
+    const requestId = payload.requestId || `auto-${crypto.randomUUID()}`;
+
+    // Handle Receipt Printing
+    if (payload.type === 'RECEIPT') {
+        const dataObj = payload.data || {};
+
+        // Find a printer
+        let printerId = payload.printerId;
+        if (!printerId) {
+            const keys = Object.keys(knownReceiptPrinters);
+            if (keys.length > 0) printerId = keys[0];
+        }
+
+        if (!printerId) {
+            console.error("No receipt printer available for print job");
+            emitComplete({ requestId, success: false, message: "No receipt printer available" });
+            return;
+        }
+
+        const tmpFile = `/tmp/receipt_${requestId}.json`;
+        try {
+            fs.writeFileSync(tmpFile, JSON.stringify(dataObj));
+            enqueuePrintJob({
+                cmd: `/opt/venv/bin/python3 receipt_printer.py print "${tmpFile}" --printer "${printerId}"`,
+                ipcCommand: { cmd: 'print_receipt', file: tmpFile, printer: printerId },
+                tmpFile,
+                requestId,
+                type: 'RECEIPT',
+                successMessage: 'Receipt Printed',
+                onComplete: emitComplete
+            });
+        } catch (e) {
+            console.error("Error processing receipt:", e);
+            emitComplete({ requestId, success: false, message: "Bridge Error: " + e.message });
+        }
+        return;
+    }
+
+    // Handle Custom QR Receipt Printing
+    if (payload.type === 'CUSTOM_QR_RECEIPT') {
+        const dataObj = payload.data || {};
+
+        let printerId = payload.printerId;
+        if (!printerId) {
+            const keys = Object.keys(knownReceiptPrinters);
+            if (keys.length > 0) printerId = keys[0];
+        }
+
+        if (!printerId) {
+            console.error("No receipt printer available for custom QR print job");
+            emitComplete({ requestId, success: false, message: "No receipt printer available" });
+            return;
+        }
+
+        const tmpFile = `/tmp/custom_qr_receipt_${requestId}.json`;
+        try {
+            fs.writeFileSync(tmpFile, JSON.stringify(dataObj));
+            enqueuePrintJob({
+                cmd: `/opt/venv/bin/python3 receipt_printer.py print "${tmpFile}" --printer "${printerId}"`,
+                ipcCommand: { cmd: 'print_receipt', file: tmpFile, printer: printerId },
+                tmpFile,
+                requestId,
+                type: 'CUSTOM_QR_RECEIPT',
+                successMessage: 'Custom QR Receipt Printed',
+                onComplete: emitComplete
+            });
+        } catch (e) {
+            console.error("Error processing custom QR receipt:", e);
+            emitComplete({ requestId, success: false, message: "Bridge Error: " + e.message });
+        }
+        return;
+    }
+
+    // Handle Custom QR Label Printing
+    if (payload.type === 'CUSTOM_QR_LABEL') {
+        const dataObj = payload.data || {};
+
+        const tmpFile = `/tmp/custom_qr_label_${requestId}.json`;
+        try {
+            fs.writeFileSync(tmpFile, JSON.stringify(dataObj));
+            enqueuePrintJob({
+                cmd: `/opt/venv/bin/python3 print_label.py print ${tmpFile}`,
+                ipcCommand: { cmd: 'print_label', file: tmpFile },
+                tmpFile,
+                requestId,
+                type: 'CUSTOM_QR_LABEL',
+                successMessage: 'Custom QR Label Printed',
+                onComplete: emitComplete
+            });
+        } catch (e) {
+            console.error("Error preparing custom QR label data file:", e);
+            emitComplete({ requestId, success: false, message: "Failed to prepare print data file: " + e.message });
+        }
+        return;
+    }
+
+    if (payload.type === 'STOCK_LABEL' || payload.type === 'SAMPLE_LABEL' || payload.type === 'MODIFIER_LABEL' || payload.type === 'RECIPE_LABEL' || payload.type === 'QUICK_LABEL') {
+
+        // Start with data from payload
+        const dataObj = payload.data || {};
+
+        // Load local overrides/settings
+        try {
+            if (fs.existsSync(DEVICE_SETTINGS_FILE)) {
+                const settings = JSON.parse(fs.readFileSync(DEVICE_SETTINGS_FILE, 'utf8'));
+                console.log('Applying device settings to print job:', settings);
+
+                // Apply mapped settings
+                if (settings.autoCut !== undefined) dataObj.cut = settings.autoCut;
+                if (settings.highQuality !== undefined) dataObj.dither = settings.highQuality;
+            }
+        } catch (e) {
+            console.error("Error loading device settings for print:", e);
+        }
+
+        // Inject detected size if not present
+        let detectedSize = null;
+        Object.values(knownPrinters).forEach(p => {
+            if (p.detected_label && p.detected_label.width > 0 && p.detected_label.width < 30) {
+                detectedSize = '23mm';
+            }
+        });
+
+        if (detectedSize) {
+            console.log(`Injecting detected size: ${detectedSize}`);
+            dataObj.size = detectedSize;
+        }
+
+        payload.data = dataObj;
+        const data = JSON.stringify(dataObj);
+
+        const tmpFile = `/tmp/label_data_${requestId}.json`;
+        try {
+            fs.writeFileSync(tmpFile, data);
+            enqueuePrintJob({
+                cmd: `/opt/venv/bin/python3 print_label.py print ${tmpFile}`,
+                ipcCommand: { cmd: 'print_label', file: tmpFile },
+                tmpFile,
+                requestId,
+                type: payload.type,
+                successMessage: 'Print successful',
+                onComplete: emitComplete
+            });
+        } catch (e) {
+            console.error("Error preparing label data file:", e);
+            emitComplete({ requestId, success: false, message: "Failed to prepare print data file: " + e.message });
+        }
+        return;
+    }
+
+    emitComplete({ requestId, success: false, message: `Unknown print type: ${payload.type}` });
+}
+
 function connectSocket() {
     if (socket) {
         socket.disconnect();
@@ -256,6 +665,8 @@ function connectSocket() {
     socket.on('connect', () => {
         console.log('Connected to backend');
         checkDevices();
+        replayPendingScans();
+        syncProductCache();
     });
 
     socket.on('connect_error', (err) => {
@@ -358,187 +769,21 @@ function connectSocket() {
     });
 
     socket.on('print_label', (payload) => {
-        console.log('Received print command:', payload);
-
-        const requestId = payload.requestId || `auto-${crypto.randomUUID()}`;
-        const emitComplete = (result) => {
+        handlePrintLabel(payload, (result) => {
             if (socket && socket.connected) {
                 socket.emit('print_complete', result);
             }
-        };
-
-        // Handle Receipt Printing
-        if (payload.type === 'RECEIPT') {
-            const dataObj = payload.data || {};
-
-            // Find a printer
-            let printerId = payload.printerId;
-            if (!printerId) {
-                const keys = Object.keys(knownReceiptPrinters);
-                if (keys.length > 0) printerId = keys[0];
-            }
-
-            if (!printerId) {
-                console.error("No receipt printer available for print job");
-                emitComplete({ requestId, success: false, message: "No receipt printer available" });
-                return;
-            }
-
-            const tmpFile = `/tmp/receipt_${requestId}.json`;
-            try {
-                fs.writeFileSync(tmpFile, JSON.stringify(dataObj));
-                enqueuePrintJob({
-                    cmd: `/opt/venv/bin/python3 receipt_printer.py print "${tmpFile}" --printer "${printerId}"`,
-                    tmpFile,
-                    requestId,
-                    type: 'RECEIPT',
-                    successMessage: 'Receipt Printed',
-                    onComplete: emitComplete
-                });
-            } catch (e) {
-                console.error("Error processing receipt:", e);
-                emitComplete({ requestId, success: false, message: "Bridge Error: " + e.message });
-            }
-            return;
-        }
-
-        // Handle Custom QR Receipt Printing
-        if (payload.type === 'CUSTOM_QR_RECEIPT') {
-            const dataObj = payload.data || {};
-
-            let printerId = payload.printerId;
-            if (!printerId) {
-                const keys = Object.keys(knownReceiptPrinters);
-                if (keys.length > 0) printerId = keys[0];
-            }
-
-            if (!printerId) {
-                console.error("No receipt printer available for custom QR print job");
-                emitComplete({ requestId, success: false, message: "No receipt printer available" });
-                return;
-            }
-
-            const tmpFile = `/tmp/custom_qr_receipt_${requestId}.json`;
-            try {
-                fs.writeFileSync(tmpFile, JSON.stringify(dataObj));
-                enqueuePrintJob({
-                    cmd: `/opt/venv/bin/python3 receipt_printer.py print "${tmpFile}" --printer "${printerId}"`,
-                    tmpFile,
-                    requestId,
-                    type: 'CUSTOM_QR_RECEIPT',
-                    successMessage: 'Custom QR Receipt Printed',
-                    onComplete: emitComplete
-                });
-            } catch (e) {
-                console.error("Error processing custom QR receipt:", e);
-                emitComplete({ requestId, success: false, message: "Bridge Error: " + e.message });
-            }
-            return;
-        }
-
-        // Handle Custom QR Label Printing
-        if (payload.type === 'CUSTOM_QR_LABEL') {
-            const dataObj = payload.data || {};
-
-            const tmpFile = `/tmp/custom_qr_label_${requestId}.json`;
-            try {
-                fs.writeFileSync(tmpFile, JSON.stringify(dataObj));
-                enqueuePrintJob({
-                    cmd: `/opt/venv/bin/python3 print_label.py print ${tmpFile}`,
-                    tmpFile,
-                    requestId,
-                    type: 'CUSTOM_QR_LABEL',
-                    successMessage: 'Custom QR Label Printed',
-                    onComplete: emitComplete
-                });
-            } catch (e) {
-                console.error("Error preparing custom QR label data file:", e);
-                emitComplete({ requestId, success: false, message: "Failed to prepare print data file: " + e.message });
-            }
-            return;
-        }
-
-        if (payload.type === 'STOCK_LABEL' || payload.type === 'SAMPLE_LABEL' || payload.type === 'MODIFIER_LABEL' || payload.type === 'RECIPE_LABEL' || payload.type === 'QUICK_LABEL') {
-
-            // Start with data from payload
-            const dataObj = payload.data || {};
-
-            // Load local overrides/settings
-            try {
-                if (fs.existsSync(DEVICE_SETTINGS_FILE)) {
-                    const settings = JSON.parse(fs.readFileSync(DEVICE_SETTINGS_FILE, 'utf8'));
-                    console.log('Applying device settings to print job:', settings);
-
-                    // Apply mapped settings
-                    if (settings.autoCut !== undefined) dataObj.cut = settings.autoCut;
-                    if (settings.highQuality !== undefined) dataObj.dither = settings.highQuality;
-                }
-            } catch (e) {
-                console.error("Error loading device settings for print:", e);
-            }
-
-            // Inject detected size if not present
-            let detectedSize = null;
-            Object.values(knownPrinters).forEach(p => {
-                if (p.detected_label && p.detected_label.width > 0 && p.detected_label.width < 30) {
-                    detectedSize = '23mm';
-                }
-            });
-
-            if (detectedSize) {
-                console.log(`Injecting detected size: ${detectedSize}`);
-                dataObj.size = detectedSize;
-            }
-
-            payload.data = dataObj;
-            const data = JSON.stringify(dataObj);
-
-            const tmpFile = `/tmp/label_data_${requestId}.json`;
-            try {
-                fs.writeFileSync(tmpFile, data);
-                enqueuePrintJob({
-                    cmd: `/opt/venv/bin/python3 print_label.py print ${tmpFile}`,
-                    tmpFile,
-                    requestId,
-                    type: payload.type,
-                    successMessage: 'Print successful',
-                    onComplete: emitComplete
-                });
-            } catch (e) {
-                console.error("Error preparing label data file:", e);
-                emitComplete({ requestId, success: false, message: "Failed to prepare print data file: " + e.message });
-            }
-        }
+        });
     });
 
     socket.on('read_scale', (payload) => {
         const requestId = payload.requestId;
 
-        // Try to return info from monitor if available
+        // Answered by the monitor with its latest sample
         if (requestId) {
-            // Wait a brief moment to see if monitor had something?
-            // Or just return last known state
-
-            const keys = Object.keys(knownScales);
-            if (keys.length === 0) {
-                socket.emit('scale_reading', {
-                    requestId, success: false, message: "No scale available"
-                });
-                return;
-            }
-
-            if (lastScaleState && lastScaleState.weight !== null) {
-                socket.emit('scale_reading', {
-                    requestId,
-                    success: true,
-                    data: { weight: lastScaleState.weight, unit: 'g' }
-                });
-            } else {
-                // Not ready yet
-                socket.emit('scale_reading', {
-                    requestId, success: false, message: "Scale initializing..."
-                });
-            }
+            readScale(payload.port, (result) => {
+                if (socket && socket.connected) socket.emit('scale_reading', { requestId, ...result });
+            });
         }
     });
 
@@ -579,14 +824,11 @@ function connectSocket() {
         const requestId = payload.requestId;
         const { port, sketch } = payload;
 
-        // Stop monitor if active on this port
-        if (scaleMonitorProcess && currentScalePort === port) {
-            console.log("Stopping scale monitor for flashing...");
-            scaleMonitorProcess.kill();
-            scaleMonitorProcess = null;
-            // Don't clear currentScalePort so we can maybe restart it? 
-            // Or better, letting checkDevices() restart it later is safer.
-            currentScalePort = null;
+        // Release the port if the monitor holds it (other scales keep running).
+        // checkDevices() / the poll timer add it back afterwards.
+        if (monitoredScalePorts.includes(port)) {
+            console.log("Releasing scale port for flashing...");
+            startScaleMonitor(monitoredScalePorts.filter(p => p !== port));
         }
 
         const cmd = `/opt/venv/bin/python3 flash_tool.py flash --port "${port}" --sketch "${sketch}"`;
@@ -621,28 +863,9 @@ function connectSocket() {
 
     socket.on('tare_scale', (payload) => {
         console.log('Received tare_scale command:', payload);
-        const requestId = payload.requestId;
-
-        const keys = Object.keys(knownScales);
-        if (keys.length === 0) {
-            if (requestId) socket.emit('tare_complete', { requestId, success: false, message: "No scale found" });
-            return;
-        }
-        const port = keys[0];
-
-        // Send command to running monitor
-        if (scaleMonitorProcess && currentScalePort === port) {
-            const cmd = JSON.stringify({ cmd: 'tare', requestId: requestId }) + "\n";
-            try {
-                scaleMonitorProcess.stdin.write(cmd);
-            } catch (e) {
-                socket.emit('tare_complete', { requestId, success: false, message: "Monitor write failed" });
-            }
-        } else {
-            // Monitor not running? Should be. Try starting it or fail.
-            socket.emit('tare_complete', { requestId, success: false, message: "Scale monitor not active" });
-            // Optionally trigger checkDevices to restart it?
-        }
+        requestTare(payload, (result) => {
+            if (socket && socket.connected) socket.emit('tare_complete', result);
+        });
     });
 
     socket.on('calibrate_scale', (payload) => {
@@ -650,17 +873,16 @@ function connectSocket() {
         const requestId = payload.requestId;
         const { weight } = payload;
 
-        const keys = Object.keys(knownScales);
-        if (keys.length === 0) {
+        const port = resolveScalePort(payload.port);
+        if (!port) {
             if (requestId) socket.emit('calibration_complete', { requestId, success: false, message: "No scale found" });
             return;
         }
-        const port = keys[0];
 
-        if (scaleMonitorProcess && currentScalePort === port) {
-            const cmd = JSON.stringify({ cmd: 'calibrate', weight: weight, requestId: requestId }) + "\n";
+        if (scaleMonitorActive() && monitoredScalePorts.includes(port)) {
+            // reset: start a new calibration curve, fit: 'linear' (piecewise) or 'poly'
             try {
-                scaleMonitorProcess.stdin.write(cmd);
+                sendScaleCommand({ cmd: 'calibrate', port, weight: weight, reset: !!payload.reset, fit: payload.fit, requestId: requestId });
             } catch (e) {
                 socket.emit('calibration_complete', { requestId, success: false, message: "Monitor write failed" });
             }
@@ -674,9 +896,9 @@ function connectSocket() {
         const fs = require('fs');
         try {
             fs.writeFileSync(SIP_CONFIG_FILE, JSON.stringify(config));
-            if (sipBridgeProcess) {
-                const cmd = JSON.stringify({ cmd: 'configure', config: config }) + "\n";
-                sipBridgeProcess.stdin.write(cmd);
+            if (sipBridgeActive()) {
+                sendSipCommand({ cmd: 'configure', config: config });
+                sipConfigSent = true;
             } else {
                 startSipBridge();
             }
@@ -700,21 +922,18 @@ function connectSocket() {
     });
 
     socket.on('sip_dial', (payload) => {
-        if (!sipBridgeProcess) return;
-        const cmd = JSON.stringify({ cmd: 'dial', uri: payload.uri }) + "\n";
-        sipBridgeProcess.stdin.write(cmd);
+        if (!sipBridgeActive()) return;
+        sendSipCommand({ cmd: 'dial', uri: payload.uri });
     });
 
     socket.on('sip_hangup', () => {
-        if (!sipBridgeProcess) return;
-        const cmd = JSON.stringify({ cmd: 'hangup' }) + "\n";
-        sipBridgeProcess.stdin.write(cmd);
+        if (!sipBridgeActive()) return;
+        sendSipCommand({ cmd: 'hangup' });
     });
 
     socket.on('sip_answer', () => {
-        if (!sipBridgeProcess) return;
-        const cmd = JSON.stringify({ cmd: 'answer' }) + "\n";
-        sipBridgeProcess.stdin.write(cmd);
+        if (!sipBridgeActive()) return;
+        sendSipCommand({ cmd: 'answer' });
     });
 
 }
@@ -896,8 +1115,9 @@ function checkDevices() {
 }
 
 // Scale Monitor Process Management
+// A single monitor process serves every known scale; ports are added/removed live.
 let scaleMonitorProcess = null;
-let currentScalePort = null;
+let monitoredScalePorts = [];
 
 // Scale Debug Logging
 let scaleDebugLogging = false;
@@ -912,20 +1132,161 @@ try {
     }
 } catch (e) { /* ignore */ }
 
-function startScaleMonitor(port) {
-    if (scaleMonitorProcess && currentScalePort === port) return; // Already running
+// Pick the requested scale, or the first known one
+function resolveScalePort(port) {
+    if (port && knownScales[port]) return port;
+    const keys = Object.keys(knownScales);
+    return keys.length > 0 ? keys[0] : null;
+}
+
+// Tare requests waiting for the monitor's tare_complete, by requestId
+const pendingTares = new Map();
+const TARE_TIMEOUT = 15000;
+
+// Reads waiting for the monitor's read_complete, by requestId
+const pendingReads = new Map();
+const READ_TIMEOUT = 2000;
+
+// Current weight for /scale/weight and read_scale. scaleStates only changes on
+// events, which skip movement below the change threshold, so the monitor is
+// asked for its latest filtered sample instead.
+// onComplete gets { success, message } or { success, data: { weight, unit, stable, timestamp, port } }.
+function readScale(port, onComplete) {
+    port = resolveScalePort(port);
+    if (!port) {
+        onComplete({ success: false, message: "No scale available" });
+        return;
+    }
+    if (!scaleMonitorActive() || !monitoredScalePorts.includes(port)) {
+        onComplete({ success: false, message: "Scale initializing..." });
+        return;
+    }
+
+    const requestId = `read-${crypto.randomUUID()}`;
+    pendingReads.set(requestId, onComplete);
+    setTimeout(() => {
+        if (pendingReads.get(requestId) === onComplete) {
+            pendingReads.delete(requestId);
+            onComplete({ success: false, message: "No response from scale monitor" });
+        }
+    }, READ_TIMEOUT);
+
+    try {
+        sendScaleCommand({ cmd: 'read', port, requestId });
+    } catch (e) {
+        pendingReads.delete(requestId);
+        onComplete({ success: false, message: "Monitor write failed" });
+    }
+}
+
+// Tare request from the backend (tare_scale) or a local client (POST /scale/tare).
+// onComplete gets { requestId, port, success, message, data } when the monitor answers.
+function requestTare(payload, onComplete) {
+    const requestId = payload.requestId || `auto-${crypto.randomUUID()}`;
+
+    const port = resolveScalePort(payload.port);
+    if (!port) {
+        onComplete({ requestId, success: false, message: "No scale found" });
+        return;
+    }
+
+    // Send command to running monitor
+    if (!scaleMonitorActive() || !monitoredScalePorts.includes(port)) {
+        onComplete({ requestId, port, success: false, message: "Scale monitor not active" });
+        return;
+    }
+
+    pendingTares.set(requestId, onComplete);
+    // The monitor answers or times out on its own; this covers it dying in between
+    setTimeout(() => {
+        if (pendingTares.get(requestId) === onComplete) {
+            pendingTares.delete(requestId);
+            onComplete({ requestId, port, success: false, message: "No response from scale monitor" });
+        }
+    }, TARE_TIMEOUT);
+
+    try {
+        sendScaleCommand({ cmd: 'tare', port, requestId });
+    } catch (e) {
+        pendingTares.delete(requestId);
+        onComplete({ requestId, port, success: false, message: "Monitor write failed" });
+    }
+}
+
+// Monitor output, from IPC or (fallback) stdout JSON lines
+function handleScaleMessage(msg) {
+    if (msg.type === 'weight') {
+        handleWeightEvent(msg.port, msg);
+    } else if (msg.type === 'read_complete') {
+        const onComplete = pendingReads.get(msg.requestId);
+        if (onComplete) {
+            pendingReads.delete(msg.requestId);
+            if (!msg.success) {
+                onComplete({ success: false, message: msg.message });
+                return;
+            }
+            const { weight, unit, stable } = msg.data;
+            // Timestamp of the sample itself, not of the reply
+            const timestamp = Date.now() - Math.round((msg.data.age || 0) * 1000);
+            onComplete({ success: true, data: { weight, unit, stable, timestamp, port: msg.port } });
+        }
+    } else if (msg.type === 'tare_complete') {
+        const onComplete = pendingTares.get(msg.requestId);
+        if (onComplete) {
+            pendingTares.delete(msg.requestId);
+            onComplete({
+                requestId: msg.requestId,
+                port: msg.port,
+                success: msg.success,
+                message: msg.message,
+                data: msg.data
+            });
+        }
+    } else if (msg.type === 'calibration_complete' && socket && socket.connected) {
+        socket.emit('calibration_complete', {
+            requestId: msg.requestId,
+            port: msg.port,
+            success: msg.success,
+            message: msg.message,
+            data: msg.data
+        });
+    }
+}
+
+function startScaleMonitor(ports) {
+    const wanted = [...ports].sort();
+
+    if (USE_HARDWARE_SERVICE) {
+        // The service's monitor is always running, it only needs the ports.
+        // If it isn't connected yet it gets them on connect.
+        if (wanted.join(',') === monitoredScalePorts.join(',')) return;
+        if (scaleDebugLogging) console.log(`Scale Monitor ports: ${wanted.join(', ') || '(none)'}`);
+        monitoredScalePorts = wanted;
+        ipc.send('scale', { cmd: 'set_ports', ports: wanted });
+        return;
+    }
 
     if (scaleMonitorProcess) {
-        console.log("Stopping previous scale monitor...");
-        scaleMonitorProcess.kill();
-        scaleMonitorProcess = null;
+        if (wanted.join(',') === monitoredScalePorts.join(',')) return; // Already running
+
+        // Switch ports on the running monitor instead of restarting it
+        if (scaleDebugLogging) console.log(`Scale Monitor ports: ${wanted.join(', ') || '(none)'}`);
+        try {
+            sendScaleCommand({ cmd: 'set_ports', ports: wanted });
+            monitoredScalePorts = wanted;
+        } catch (e) {
+            console.error("Scale monitor port update failed:", e);
+        }
+        return;
     }
 
-    if (scaleDebugLogging) console.log(`Starting Scale Monitor on ${port}...`);
-    currentScalePort = port;
+    if (wanted.length === 0) return;
+
+    if (scaleDebugLogging) console.log(`Starting Scale Monitor on ${wanted.join(', ')}...`);
+    monitoredScalePorts = wanted;
     const { spawn } = require('child_process');
     // use spawn instead of exec to get a stream
-    scaleMonitorProcess = spawn('/opt/venv/bin/python3', ['scale_bridge.py', 'monitor', '--port', port], {
+    scaleMonitorProcess = spawn('/opt/venv/bin/python3', ['scale_bridge.py', 'monitor', '--port', wanted.join(',')], {
         cwd: __dirname
     });
 
@@ -933,36 +1294,10 @@ function startScaleMonitor(port) {
         const lines = data.toString().split('\n');
         lines.forEach(line => {
             line = line.trim();
-            if (line.startsWith('WEIGHT:')) {
-                const parts = line.split(' ');
-                const weightVal = parts[0].substring(7); // "WEIGHT:1.23" -> "1.23"
-                // There might be raw suffix like "(Raw: 123)"
-
-                const weight = parseFloat(weightVal);
-
-                // Process weight update
-                if (!isNaN(weight)) {
-                    handleWeightUpdate(port, weight);
-                }
-            } else if (line.startsWith('{')) {
+            if (line.startsWith('{')) {
                 // Potential JSON response
                 try {
-                    const msg = JSON.parse(line);
-                    if (msg.type === 'tare_complete') {
-                        socket.emit('tare_complete', {
-                            requestId: msg.requestId,
-                            success: msg.success,
-                            message: msg.message,
-                            data: msg.data
-                        });
-                    } else if (msg.type === 'calibration_complete') {
-                        socket.emit('calibration_complete', {
-                            requestId: msg.requestId,
-                            success: msg.success,
-                            message: msg.message,
-                            data: msg.data
-                        });
-                    }
+                    handleScaleMessage(JSON.parse(line));
                 } catch (e) {
                     // Ignore invalid JSON
                 }
@@ -977,25 +1312,23 @@ function startScaleMonitor(port) {
     scaleMonitorProcess.on('close', (code) => {
         if (scaleDebugLogging) console.log(`Scale Monitor exited with code ${code}`);
         scaleMonitorProcess = null;
-        currentScalePort = null;
+        monitoredScalePorts = [];
     });
 }
 
-// Logic to handle weight updates and debounce/throttle
-let lastScaleState = { weight: null, timestamp: 0 };
-
-// Storage mode detection: scale on its side reads < -50g
-let negativeReadingSince = null; // timestamp when persistent < -50g started
-let isInStorageMode = false;
-const STORAGE_MODE_THRESHOLD = -50; // grams
-const STORAGE_MODE_DELAY = 5 * 60 * 1000; // 5 minutes in ms
+// Last weight reported by the monitor per port (settle/change/heartbeat events).
+// Storage mode (scale on its side) is detected by the monitor and reported as an event.
+const scaleStates = {};
 
 
 // SIP / PBX Bridge Management
 let sipBridgeProcess = null;
+// Hardware service: the hosted bridge got the saved config since it connected
+let sipConfigSent = false;
 
 function startSipBridge() {
     if (sipBridgeProcess) return;
+    if (USE_HARDWARE_SERVICE && (sipConfigSent || !ipc.isConnected('sip'))) return;
 
     const fs = require('fs');
     if (!fs.existsSync(SIP_CONFIG_FILE)) {
@@ -1003,6 +1336,17 @@ function startSipBridge() {
         return;
     }
 
+    if (USE_HARDWARE_SERVICE) {
+        try {
+            const config = JSON.parse(fs.readFileSync(SIP_CONFIG_FILE, 'utf8'));
+            sendSipCommand(config.enabled ? { cmd: 'configure', config: config } : { cmd: 'stop' });
+            sipConfigSent = true;
+        } catch (e) {
+            console.error("Error loading SIP config:", e);
+        }
+        return;
+    }
+
     console.log("Starting SIP Bridge...");
     const { spawn } = require('child_process');
 
@@ -1040,8 +1384,7 @@ function startSipBridge() {
     try {
         const config = JSON.parse(fs.readFileSync(SIP_CONFIG_FILE, 'utf8'));
         if (config.enabled) {
-            const cmd = JSON.stringify({ cmd: 'configure', config: config }) + "\n";
-            sipBridgeProcess.stdin.write(cmd);
+            sendSipCommand({ cmd: 'configure', config: config });
         } else {
             console.log("SIP config exists but disabled.");
             if (sipBridgeProcess) {
@@ -1065,54 +1408,38 @@ function handleSipMessage(msg) {
         socket.emit('sip_reg_state', msg.data);
     }
 }
-function handleWeightUpdate(port, currentWeight) {
-    const now = Date.now();
-    const last = lastScaleState;
-
-    // Round to nearest 0.1
-    const roundedWeight = Math.round(currentWeight * 10) / 10;
-
-    // --- Storage mode detection ---
-    if (roundedWeight < STORAGE_MODE_THRESHOLD) {
-        if (negativeReadingSince === null) {
-            negativeReadingSince = now;
-        } else if (!isInStorageMode && (now - negativeReadingSince) >= STORAGE_MODE_DELAY) {
-            isInStorageMode = true;
-            console.log(`Scale entered storage mode (reading ${roundedWeight}g < ${STORAGE_MODE_THRESHOLD}g for 5+ min). Pausing auto-reports.`);
-        }
-    } else {
-        // Reading is back above threshold
-        if (isInStorageMode) {
-            console.log(`Scale exited storage mode (reading ${roundedWeight}g). Resuming auto-reports.`);
-        }
-        negativeReadingSince = null;
-        isInStorageMode = false;
+function handleWeightEvent(port, msg) {
+    const weight = msg.weight;
+    const previous = scaleStates[port] || { storageMode: false };
+    let isInStorageMode = previous.storageMode;
+
+    if (msg.event === 'storage_mode') {
+        isInStorageMode = !!msg.active;
+        console.log(isInStorageMode
+            ? `Scale ${port} entered storage mode (reading ${weight}g). Pausing auto-reports.`
+            : `Scale ${port} exited storage mode (reading ${weight}g). Resuming auto-reports.`);
+    } else if (msg.event === 'overload') {
+        console.log(`Scale ${port} overload ${msg.active ? 'detected' : 'cleared'} (reading ${weight}g)`);
     }
 
-    // Always update lastScaleState so explicit read_scale requests get fresh data
-    // Check for change based on rounded value
-    const weightChanged = last.weight === null || roundedWeight !== last.weight;
-    const timeElapsed = (now - last.timestamp) >= 10000; // 10s heartbeat
+    // Always update the port state so explicit read_scale requests get fresh data
+    scaleStates[port] = { weight, stable: msg.stable, timestamp: Date.now(), storageMode: isInStorageMode };
 
-    if (weightChanged || timeElapsed) {
-        lastScaleState = { weight: roundedWeight, timestamp: now };
-
-        if (scaleDebugLogging) {
-            console.log(`Scale: ${roundedWeight}g${isInStorageMode ? ' (storage mode - suppressed)' : ''}`);
-        }
+    if (scaleDebugLogging) {
+        console.log(`Scale ${port} ${msg.event}: ${weight}g${isInStorageMode ? ' (storage mode - suppressed)' : ''}`);
+    }
 
-        // In storage mode, do not emit automatic readings to backend
-        if (isInStorageMode) {
-            return;
-        }
+    // In storage mode, do not emit automatic readings to backend
+    if (isInStorageMode) {
+        return;
+    }
 
-        if (socket && socket.connected) {
-            socket.emit('scale_reading', {
-                requestId: 'poll',
-                success: true,
-                data: { weight: roundedWeight, unit: 'g' }
-            });
-        }
+    if (socket && socket.connected) {
+        socket.emit('scale_reading', {
+            requestId: 'poll',
+            success: true,
+            data: { weight, unit: msg.unit || 'g', event: msg.event, stable: msg.stable, port }
+        });
     }
 }
 
@@ -1124,12 +1451,9 @@ setInterval(() => {
     // Also ensure monitor is running if we have a scale
     // BUT only if display is ON
     if (isDisplayOn) {
-        const keys = Object.keys(knownScales);
-        if (keys.length > 0) {
-            const port = keys[0];
-            if (!scaleMonitorProcess || currentScalePort !== port) {
-                startScaleMonitor(port);
-            }
+        const ports = Object.keys(knownScales);
+        if (ports.length > 0) {
+            startScaleMonitor(ports);
         }
     }
 }, 30000);
@@ -1139,34 +1463,173 @@ setInterval(() => {
 // Run initial check
 checkDevices();
 
+// ============================
+// PRODUCT CACHE & PENDING SCANS
+// ============================
+// product_cache.py keeps a barcode -> product index in SQLite that
+// scanner_bridge.py uses to tag scans locally. It is refreshed incrementally
+// from GET /barcodes/index?since=, with a full fetch once a day to drop
+// deleted barcodes. Scans made while the backend is unreachable are queued
+// on disk and replayed on reconnect.
+const PRODUCT_SYNC_INTERVAL = 10 * 60 * 1000;
+const PRODUCT_FULL_SYNC_INTERVAL = 24 * 60 * 60 * 1000;
+const PENDING_SCANS_FILE = useDataDir ? path.join(DATA_DIR, 'pending_scans.json') : 'pending_scans.json';
+const MAX_PENDING_SCANS = 500;
+
+const productSync = { running: false, since: null, lastFull: 0, loaded: false, last: null };
+
+function runProductCache(args, input) {
+    return new Promise((resolve, reject) => {
+        const { spawn } = require('child_process');
+        const proc = spawn('/opt/venv/bin/python3', ['product_cache.py', ...args], { cwd: __dirname });
+        let stdout = '';
+        let stderr = '';
+        proc.stdout.on('data', (data) => { stdout += data; });
+        proc.stderr.on('data', (data) => { stderr += data; });
+        proc.on('error', reject);
+        proc.on('close', () => {
+            try {
+                const result = JSON.parse(stdout);
+                if (result.success) resolve(result);
+                else reject(new Error(result.message || stderr));
+            } catch (e) {
+                reject(new Error(stderr || stdout || e.message));
+            }
+        });
+        if (input !== undefined) proc.stdin.end(input);
+        else proc.stdin.end();
+    });
+}
+
+async function syncProductCache() {
+    if (productSync.running || !state.token) return;
+    productSync.running = true;
+    try {
+        if (!productSync.loaded) {
+            // Resume from the last sync stored alongside the cache
+            const status = await runProductCache(['status']);
+            productSync.since = status.synced_at;
+            productSync.lastFull = status.full_synced_at ? Date.parse(status.full_synced_at) : 0;
+            productSync.loaded = true;
+        }
+
+        const full = !productSync.since || Date.now() - productSync.lastFull > PRODUCT_FULL_SYNC_INTERVAL;
+        const url = new URL(state.backendUrl.replace(/\/$/, '') + '/barcodes/index');
+        if (!full) url.searchParams.set('since', productSync.since);
+
+        const response = await fetch(url, { headers: { Authorization: `Bearer ${state.token}` } });
+        if (response.status === 401) throw new Error('HTTP 401, the backend did not accept the kiosk token');
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const index = await response.json();
+
+        // Nothing changed: skip spawning the importer, just move the marker
+        if (!full && index.rows.length === 0) {
+            productSync.since = index.generatedAt;
+            productSync.last = { at: index.generatedAt, full, rows: 0, error: null };
+            return;
+        }
+        if (full && index.rows.length === 0) {
+            console.warn('[ProductCache] Full sync returned no barcodes, scans will not be tagged locally');
+        }
+
+        const result = await runProductCache(['import'], JSON.stringify(index));
+        productSync.since = index.generatedAt;
+        if (full) productSync.lastFull = Date.parse(index.generatedAt);
+        productSync.last = { at: index.generatedAt, full, rows: index.rows.length, cached: result.rows, error: null };
+        console.log(`[ProductCache] ${full ? 'Full' : 'Incremental'} sync: ${result.changed} changed, ${result.rows} cached`);
+    } catch (e) {
+        productSync.last = { at: new Date().toISOString(), error: e.message };
+        console.error('[ProductCache] Sync failed:', e.message);
+    } finally {
+        productSync.running = false;
+    }
+}
+
+setInterval(syncProductCache, PRODUCT_SYNC_INTERVAL);
+
+let pendingScans = [];
+try {
+    if (fs.existsSync(PENDING_SCANS_FILE)) {
+        pendingScans = JSON.parse(fs.readFileSync(PENDING_SCANS_FILE, 'utf8'));
+    }
+} catch (e) {
+    console.error('Error loading pending scans:', e);
+}
+
+function savePendingScans() {
+    fs.writeFile(PENDING_SCANS_FILE, JSON.stringify(pendingScans), (err) => {
+        if (err) console.error('Error saving pending scans:', err);
+    });
+}
+
+function queueScan(payload) {
+    pendingScans.push(payload);
+    // Oldest scans go first if the backend stays away for a long time
+    if (pendingScans.length > MAX_PENDING_SCANS) pendingScans.splice(0, pendingScans.length - MAX_PENDING_SCANS);
+    savePendingScans();
+    console.log(`Socket not connected, queued scan (${pendingScans.length} pending)`);
+}
+
+function replayPendingScans() {
+    if (pendingScans.length === 0 || !socket || !socket.connected) return;
+    console.log(`Replaying ${pendingScans.length} queued scan(s)`);
+    pendingScans.forEach(payload => socket.emit('barcode_scan', { ...payload, queued: true }));
+    pendingScans = [];
+    savePendingScans();
+}
+
 // Initialize Hardware Scanner Service
+const scannerStats = { scans: 0, lastScanAt: null, lastDevice: null };
+
 try {
     const ScannerService = require('./scanner_service');
-    const scanner = new ScannerService();
+    const scanner = new ScannerService(ipc, { spawn: !USE_HARDWARE_SERVICE });
+    scannerService = scanner;
 
-    scanner.on('scan', (barcode) => {
-        console.log('Hardware Scanner Scan:', barcode);
+    scanner.on('scan', (barcode, info = {}) => {
+        console.log('Hardware Scanner Scan:', barcode, info.device || '');
+        scannerStats.scans++;
+        scannerStats.lastScanAt = new Date().toISOString();
+        scannerStats.lastDevice = info.device || null;
 
         // Log to bridge.log
         const fs = require('fs');
-        const logEntry = `${new Date().toISOString()} - ${barcode}\n`;
+        const logEntry = `${new Date().toISOString()} - ${barcode}${info.count ? ` x${info.count}` : ''}${info.device ? ` [${info.device}]` : ''}\n`;
 
         fs.appendFile('bridge.log', logEntry, (err) => {
             if (err) console.error('Error writing to bridge.log:', err);
         });
 
+        const { device, type, count, product_id, product, raw, ...gs1 } = info;
+        const payload = { barcode, device, scannedAt: new Date().toISOString() };
+        // The code as scanned when normalization changed it; the backend uses it
+        // for products stored under the raw form
+        if (raw) payload.raw = raw;
+        // Resolved from the local product cache, before any backend round trip
+        if (product_id) {
+            payload.productId = parseInt(product_id, 10);
+            payload.productName = product;
+        }
+        if (type) payload.symbology = type;
+        // Burst mode coalesces repeated scans into one event with a count
+        if (count) payload.quantity = parseInt(count, 10);
+        // Dates / batch parsed from GS1 codes (best_before, expiry, batch, ...)
+        if (Object.keys(gs1).length) payload.gs1 = gs1;
+
         // Emit to backend
         if (socket && socket.connected) {
             console.log('Emitting barcode to backend');
-            socket.emit('barcode_scan', { barcode });
+            socket.emit('barcode_scan', payload);
         } else {
-            console.log('Socket not connected, generic barcode scan not sent');
+            queueScan(payload);
         }
     });
 } catch (e) {
     console.error('Failed to initialize ScannerService:', e);
 }
 
+if (USE_HARDWARE_SERVICE) startHardwareService();
+
 const PORT = 8080;
 app.listen(PORT, () => {
     console.log(`Bridge running on port ${PORT}`);
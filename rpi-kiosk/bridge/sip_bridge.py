@@ -5,31 +5,66 @@ import threading
 import time
 import logging
 import os
+import functools
 import pexpect
 import re
 
+import metrics
+import bridge_ipc
+import baresip_ctrl
+
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', filename='sip_bridge.log')
+logging.basicConfig(level=logging.DEBUG if os.getenv('SIP_BRIDGE_DEBUG') else logging.INFO, format='%(asctime)s %(levelname)s %(message)s', filename='sip_bridge.log')
 
 # Global
 child = None
 current_config = None
+# A configure that arrived during a call, applied when the call ends
+pending_config = None
+config_lock = threading.Lock()
+# Connection to server.js (bridge_ipc), None = JSON lines on stdout
+ipc = None
+monitor_thread = None
+# baresip's ctrl_tcp connection; None until it is up, then commands and
+# events go through it instead of the stdio menu
+ctrl = None
+CTRL_PORT = int(os.getenv('SIP_CTRL_PORT', baresip_ctrl.DEFAULT_PORT))
+
+PARSE_TIME = metrics.histogram("sip_parse_seconds", "Cleaning and matching one baresip output line")
+SIP_LINES = metrics.counter("sip_lines_total", "Lines read from baresip")
 
 def log_json(msg_type, data):
     msg = {"type": msg_type, "data": data}
+    if ipc is not None and ipc.send(msg):
+        return
     print(json.dumps(msg))
     sys.stdout.flush()
 
-def create_baresip_config(config):
-    # Setup directories
-    home_dir = os.path.expanduser("~")
-    baresip_dir = os.path.join(home_dir, ".baresip")
-    os.makedirs(baresip_dir, exist_ok=True)
+BARESIP_DIR = os.path.join(os.path.expanduser("~"), ".baresip")
 
-    # 1. Accounts
+MODULE_SEARCH_PATHS = [
+    "/usr/lib/baresip/modules",
+    "/usr/local/lib/baresip/modules",
+    "/usr/lib/x86_64-linux-gnu/baresip/modules",
+    "/usr/lib/aarch64-linux-gnu/baresip/modules",
+    "/usr/lib/arm-linux-gnueabihf/baresip/modules"
+]
+
+@functools.lru_cache(maxsize=None)
+def find_modules():
+    """Returns (module path, whether ctrl_tcp is there). Probed once per process."""
+    module_path = "/usr/lib/baresip/modules" # Default fallback
+    for p in MODULE_SEARCH_PATHS:
+        if os.path.isdir(p):
+            module_path = p
+            break
+    return module_path, os.path.exists(os.path.join(module_path, "ctrl_tcp.so"))
+
+def account_line(config):
+    """The baresip accounts line for a SIP config, or None if it is incomplete."""
     # Format: <sip:user:password@domain;transport=udp>;regint=3600
     if not config.get('domain') or not config.get('username'):
-        return False
+        return None
         
     user = config['username']
     pwd = config.get('password', '')
@@ -37,49 +72,247 @@ def create_baresip_config(config):
     
     # New format requested by user
     # <sip:user@domain>;auth_user=user;auth_pass=pwd;transport=udp;regint=3600;answermode=manual
-    account_line = f"<sip:{user}@{domain}>;auth_user={user};auth_pass={pwd};transport=udp;regint=3600;answermode=manual"
+    return f"<sip:{user}@{domain}>;auth_user={user};auth_pass={pwd};transport=udp;regint=3600;answermode=manual"
 
-    with open(os.path.join(baresip_dir, "accounts"), "w") as f:
-        f.write(account_line + "\n")
+def account_aor(line):
+    return line[1:line.index(">")]
 
-    # 2. Config
-    # Find module path
-    module_path = "/usr/lib/baresip/modules" # Default fallback
-    search_paths = [
-        "/usr/lib/baresip/modules",
-        "/usr/local/lib/baresip/modules",
-        "/usr/lib/x86_64-linux-gnu/baresip/modules",
-        "/usr/lib/aarch64-linux-gnu/baresip/modules",
-        "/usr/lib/arm-linux-gnueabihf/baresip/modules"
+def write_if_changed(path, content):
+    try:
+        with open(path) as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
+    with open(path, "w") as f:
+        f.write(content)
+
+def write_baresip_config(account):
+    os.makedirs(BARESIP_DIR, exist_ok=True)
+
+    # 1. Accounts
+    write_if_changed(os.path.join(BARESIP_DIR, "accounts"), account + "\n")
+
+    # 2. Config, the same for every account
+    module_path, has_ctrl = find_modules()
+    lines = [
+        f"module_path\t\t{module_path}",
+        "poll_method\t\tpoll",
+        # Ensure audio modules are loaded.
+        "audio_player\t\talsa,default",
+        "audio_source\t\talsa,default",
+        "audio_alert\t\talsa,default",
     ]
-    
-    for p in search_paths:
-        if os.path.exists(p) and os.path.isdir(p):
-            module_path = p
-            break
-            
-    # Ensure audio modules are loaded.
-    with open(os.path.join(baresip_dir, "config"), "w") as f:
-        f.write(f"module_path\t\t{module_path}\n")
-        f.write("poll_method\t\tpoll\n")
-        f.write("audio_player\t\talsa,default\n")
-        f.write("audio_source\t\talsa,default\n")
-        f.write("audio_alert\t\talsa,default\n")
-        # Modules
-        f.write("module\t\t\tstdio.so\n")
-        f.write("module\t\t\talsa.so\n")
-        f.write("module\t\t\tg711.so\n")
-        f.write("module\t\t\tg722.so\n")
-        f.write("module\t\t\topus.so\n")
-        f.write("module\t\t\taccount.so\n")
-        f.write("module\t\t\tmenu.so\n") # Interactive menu
-        f.write("module\t\t\tuuid.so\n")
-    
-    return True
+    if has_ctrl:
+        lines.append(f"ctrl_tcp_listen\t\t127.0.0.1:{CTRL_PORT}")
+    # Modules
+    for module in ["stdio", "alsa", "g711", "g722", "opus", "account",
+                   "menu", # Interactive menu
+                   "uuid"]:
+        lines.append(f"module\t\t\t{module}.so")
+    if has_ctrl:
+        lines.append("module\t\t\tctrl_tcp.so")
+    write_if_changed(os.path.join(BARESIP_DIR, "config"), "\n".join(lines) + "\n")
 
 # regex for ansi codes
 ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 
+def _uri(group):
+    return rf'<?(?P<{group}>z?sips?:[^>\s"]+)>?'
+
+CALL_ID = re.compile(r'\b(?:[Cc]all[-_ ]?[Ii][Dd]|Call-ID)[:=]\s*(?P<id>[^\s;,\]]+)')
+STATUS_CODE = re.compile(r'^(?P<code>[1-6]\d\d)\b\s*(?P<reason>.*)')
+
+# Remote URI / call id of the current call, added to the events that don't repeat them
+active_call = {}
+
+def _call_state(state, line, code=None, reason=None, uri=None, **extra):
+    if uri:
+        active_call["remote_uri"] = uri
+    match = CALL_ID.search(line)
+    if match:
+        active_call["call_id"] = match.group('id')
+    data = {"state": state}
+    if code is not None:
+        data["code"] = code
+    if reason:
+        data["reason"] = reason
+    data.update(active_call)
+    data.update(extra)
+    return "call_state", data
+
+def _incoming(m, line):
+    uri = m.group('uri') or "Unknown"
+    active_call.clear()
+    active_call["remote_uri"] = uri
+    data = {"remote_uri": uri, "remote_contact": uri}
+    if m.group('name'):
+        data["display_name"] = m.group('name').strip(' -:')
+    match = CALL_ID.search(line)
+    if match:
+        active_call["call_id"] = data["call_id"] = match.group('id')
+    return "incoming_call", data
+
+def _progress(m, line):
+    code = int(m.group('code'))
+    # 183 Session Progress carries early media (ringback / announcements from the far end)
+    state = "EARLY" if code == 183 else "RINGING"
+    return _call_state(state, line, code, m.group('reason').strip())
+
+def _closed(m, line):
+    reason = m.group('reason').strip()
+    status = STATUS_CODE.match(reason)
+    if status:
+        event = _call_state("DISCONNECTED", line, int(status.group('code')), status.group('reason'))
+    else:
+        event = _call_state("DISCONNECTED", line, 0, reason)
+    active_call.clear()
+    return event
+
+def _registration(m, line):
+    code = int(m.group('code'))
+    return "reg_state", {"code": code, "reason": m.group('reason').strip(), "active": 200 <= code < 300}
+
+# Event grammar for baresip's stdio (menu module) output, in priority order:
+# (lower case anchors, pattern, handler). The anchors are plain substring
+# checks against the lower-cased line, so the noise baresip prints (codec,
+# media and network chatter) costs a few `in` tests and no regex at all;
+# only an anchored event runs its precompiled pattern. Upper case names are
+# baresip's own event names as newer versions print them.
+SIP_GRAMMAR = [
+    (("incoming call", "call_incoming"),
+     r'(?:Incoming call from:?|CALL_INCOMING)\s*(?:(?:"?(?P<name>[^<"]*?)"?\s*)?' + _uri('uri') + ')?', _incoming),
+    (("sip progress",),
+     r'SIP Progress:\s*(?P<code>1\d\d)\s*(?P<reason>[^(\n]*)', _progress),
+    (("call ringing", "call_ringing"),
+     r'[Cc]all ringing|CALL_RINGING', lambda m, line: _call_state("RINGING", line, 180)),
+    (("early media", "call progress", "call_progress"),
+     r'[Ee]arly media|[Cc]all progress|CALL_PROGRESS', lambda m, line: _call_state("EARLY", line, 183)),
+    (("call established", "call_established"),
+     r'(?:[Cc]all established|CALL_ESTABLISHED)(?::?\s*' + _uri('uri') + ')?',
+     lambda m, line: _call_state("CONFIRMED", line, 200, uri=m.group('uri'))),
+    (("call closed", "session closed", "call_closed"),
+     r'(?:(?:[Cc]all|[Ss]ession) closed|CALL_CLOSED):?\s*(?P<reason>.*)', _closed),
+    (("remote",),
+     r'[Rr]emote (?:party )?(?:put (?:the )?call on )?hold|[Cc]all held by remote',
+     lambda m, line: _call_state("HOLD", line, remote=True)),
+    (("hold",),
+     r'[Cc]all(?: is)? (?:put )?on[- ]hold|call: hold|CALL_HOLD', lambda m, line: _call_state("HOLD", line, remote=False)),
+    (("resume",),
+     r'[Cc]all resumed|call: resume|CALL_RESUME', lambda m, line: _call_state("RESUMED", line)),
+    (("transfer failed", "transfer_failed"),
+     r'(?:[Tt]ransfer failed|CALL_TRANSFER_FAILED):?\s*(?P<reason>.*)',
+     lambda m, line: _call_state("TRANSFER_FAILED", line, reason=m.group('reason').strip())),
+    (("transfer", "refer to"),
+     r'(?:[Tt]ransfer(?:ring)?(?: call)? to|REFER to|CALL_TRANSFER):?\s*' + _uri('uri'),
+     lambda m, line: _call_state("TRANSFER", line, target=m.group('uri'))),
+    # "{0/UDP/v4} 200 OK (Asterisk) [1 binding]", "reg: sip:100@pbx: 403 Forbidden"
+    (("{", "reg"),
+     r'(?:\{\d+/\w+/\w+\}|\b[Rr]eg(?:ister)?:(?:\s*z?sips?:\S+?:)?)\s*(?P<code>\d{3})\s+(?P<reason>[^(\[\n]*)', _registration),
+    (("401 ", "403 ", "407 "),
+     r'\b(?P<code>401|403|407) (?P<reason>Unauthorized|Forbidden|Proxy Authentication Required)\b', _registration),
+]
+SIP_EVENTS = [(anchors, re.compile(pattern), handler) for anchors, pattern, handler in SIP_GRAMMAR]
+
+def parse_line(line):
+    """Returns (msg_type, data) for a baresip output line, or None."""
+    if '\x1b' in line:
+        line = ansi_escape.sub('', line)
+    low = line.lower()
+    for anchors, pattern, handler in SIP_EVENTS:
+        for anchor in anchors:
+            if anchor in low:
+                m = pattern.search(line)
+                if m is not None:
+                    return handler(m, line)
+                break
+    return None
+
+def _status(param, default_code):
+    """Splits a "486 Busy Here" event parameter into code and reason."""
+    status = STATUS_CODE.match(param)
+    if status:
+        return int(status.group('code')), status.group('reason').strip()
+    return default_code, param
+
+# ctrl_tcp event types -> call_state (state, code); the rest are handled in ctrl_event()
+CTRL_CALL_STATES = {
+    "CALL_RINGING": ("RINGING", 180),
+    "CALL_PROGRESS": ("EARLY", 183),
+    "CALL_ESTABLISHED": ("CONFIRMED", 200),
+    "CALL_RESUME": ("RESUMED", None),
+}
+
+def ctrl_event(msg):
+    """Returns (msg_type, data) for a ctrl_tcp event, the same events parse_line() gives."""
+    kind = msg.get("type", "")
+    param = msg.get("param") or ""
+
+    if kind in ("REGISTER_OK", "REGISTER_FAIL"):
+        code, reason = _status(param, 200 if kind == "REGISTER_OK" else 0)
+        return "reg_state", {"code": code, "reason": reason, "active": kind == "REGISTER_OK" and 200 <= code < 300}
+    if msg.get("class") != "call":
+        return None
+
+    uri = msg.get("peeruri")
+    if kind == "CALL_INCOMING":
+        active_call.clear()
+        uri = uri or "Unknown"
+    if uri:
+        active_call["remote_uri"] = uri
+    if msg.get("id"):
+        active_call["call_id"] = msg["id"]
+
+    if kind == "CALL_INCOMING":
+        data = {"remote_uri": uri, "remote_contact": uri}
+        if msg.get("peerdisplayname"):
+            data["display_name"] = msg["peerdisplayname"]
+        if msg.get("id"):
+            data["call_id"] = msg["id"]
+        return "incoming_call", data
+    if kind in CTRL_CALL_STATES:
+        state, code = CTRL_CALL_STATES[kind]
+        return _call_state(state, "", code)
+    if kind == "CALL_CLOSED":
+        code, reason = _status(param, 0)
+        event = _call_state("DISCONNECTED", "", code, reason)
+        active_call.clear()
+        return event
+    if kind == "CALL_HOLD":
+        return _call_state("HOLD", "", remote=True)
+    if kind == "CALL_TRANSFER":
+        return _call_state("TRANSFER", "", target=param)
+    if kind == "CALL_TRANSFER_FAILED":
+        return _call_state("TRANSFER_FAILED", "", reason=param)
+    return None
+
+def on_ctrl_event(msg):
+    logging.debug("Baresip event: %s", msg)
+    event = ctrl_event(msg)
+    if event is not None:
+        log_json(*event)
+        apply_pending_config()
+
+def on_ctrl_close(client):
+    global ctrl
+    if ctrl is client:
+        ctrl = None
+        logging.info("baresip control connection closed")
+
+def connect_ctrl(proc):
+    """Connects to the ctrl_tcp socket of a baresip we just spawned (on a thread)."""
+    global ctrl
+    client = baresip_ctrl.connect(on_ctrl_event, on_ctrl_close, port=CTRL_PORT, alive=proc.isalive)
+    if client is None:
+        logging.warning("baresip ctrl_tcp not reachable, using the stdio menu")
+        return
+    if child is not proc:
+        # Restarted while we were connecting
+        client.close()
+        return
+    ctrl = client
+    logging.info(f"Connected to baresip ctrl_tcp on port {CTRL_PORT}")
+
 def monitor_baresip():
     global child
     while True:
@@ -90,42 +323,26 @@ def monitor_baresip():
                 
             # Read line
             try:
-                line = child.readline().decode('utf-8').strip()
+                line = child.readline().decode('utf-8', 'replace').strip()
                 if not line:
                     continue
-                
-                # Strip ANSI codes
-                line = ansi_escape.sub('', line)
-                logging.info(f"Baresip: {line}")
-                
-                # Parse Events
-                if "Incoming call from" in line:
-                    # Incoming call from sip:100@192.168.1.100 ...
-                    # Parse URI
-                    # Parse URI
-                    # Look for sip:user@domain or sips:user@domain
-                    match = re.search(r'(z?sips?:[^>\s"]+)', line)
-                    if match:
-                        uri = match.group(1)
-                    else:
-                        uri = "Unknown"
-
-                    log_json("incoming_call", {"remote_uri": uri, "remote_contact": uri})
-                    
-                elif "Call established" in line:
-                    log_json("call_state", {"state": "CONFIRMED", "code": 200})
-                    
-                elif "Call closed" in line or "Session closed" in line:
-                    log_json("call_state", {"state": "DISCONNECTED", "code": 0})
-                    
-                elif "Reg: 200 OK" in line:
-                    log_json("reg_state", {"code": 200, "reason": "OK", "active": True})
-                    
-                elif "401 Unauthorized" in line or "403 Forbidden" in line:
-                    log_json("reg_state", {"code": 401, "reason": "Unauthorized", "active": False})
+                started = time.perf_counter()
+                SIP_LINES.inc()
+                # Every line at INFO filled the SD card; SIP_BRIDGE_DEBUG=1 brings it back
+                logging.debug("Baresip: %s", line)
+
+                # With ctrl_tcp up its events are the source, the console would only duplicate them
+                if ctrl is None:
+                    event = parse_line(line)
+                    if event is not None:
+                        log_json(*event)
+                        apply_pending_config()
+
+                PARSE_TIME.observe(time.perf_counter() - started)
                     
-            except pexpect.exceptions.TIMEOUT:
-                pass
+            except (pexpect.exceptions.TIMEOUT, pexpect.exceptions.EOF):
+                # EOF: baresip exited, isalive() catches it on the next pass
+                time.sleep(0.1)
             except Exception as e:
                 logging.error(f"Reader error: {e}")
                 
@@ -133,66 +350,203 @@ def monitor_baresip():
             logging.error(f"Monitor error: {outer}")
             time.sleep(1)
 
-def handle_command(line):
+def start_monitor():
+    global monitor_thread
+    if monitor_thread is None:
+        monitor_thread = threading.Thread(target=monitor_baresip, daemon=True)
+        monitor_thread.start()
+
+def stop_baresip():
+    global child, ctrl, current_config
+    if ctrl is not None:
+        ctrl.close()
+        ctrl = None
+    if child:
+        child.close()
+        child = None
+    current_config = None
+    active_call.clear()
+
+def start_baresip():
     global child
+    stop_baresip()
+
+    # Force config path to ~/.baresip just to be explicit/safe
+    logging.info(f"Starting baresip with config from {BARESIP_DIR}")
+    # The timeout only wakes an idle monitor thread so it notices a replaced child;
+    # lines are returned as soon as baresip prints them
+    child = pexpect.spawn(f'baresip -f "{BARESIP_DIR}"', timeout=1)
+    if find_modules()[1]:
+        threading.Thread(target=connect_ctrl, args=(child,), daemon=True).start()
+
+def swap_account(old, new):
+    """Replaces the running baresip's account over ctrl_tcp. False if that didn't work."""
+    client = ctrl
+    if client is None:
+        return False
+    try:
+        # Delete first: with only the password changed both lines have the same AOR
+        client.command("uadel", account_aor(old))
+        client.command("uanew", new)
+        return True
+    except baresip_ctrl.CtrlError as e:
+        logging.warning(f"Live account change failed ({e}), restarting baresip")
+        return False
+
+def configure(config):
+    """Applies a SIP config, touching baresip only as much as the change needs.
+
+    server.js sends the config again on every (re)connect, so the same
+    account is a no-op. A changed account is swapped in the running baresip
+    over ctrl_tcp; baresip is only (re)started when that isn't possible.
+    During a call nothing is changed until the call is over.
+    """
+    global current_config, pending_config
+    account = account_line(config)
+    if account is None:
+        log_json("error", {"message": "Invalid config"})
+        return
+
+    with config_lock:
+        running = child is not None and child.isalive()
+        current = account_line(current_config) if running and current_config else None
+        if account == current:
+            pending_config = None
+            log_json("configured", {"success": True, "changed": False})
+            return
+        if running and active_call:
+            pending_config = config
+            logging.info("Call in progress, applying the new SIP config when it ends")
+            log_json("configured", {"success": True, "deferred": True})
+            return
+        pending_config = None
+
+        started = time.perf_counter()
+        # Written either way, so a later restart comes up with this account
+        write_baresip_config(account)
+        if current is not None and swap_account(current, account):
+            mode = "live"
+        else:
+            start_baresip()
+            mode = "restart"
+        current_config = config
+        metrics.histogram("sip_reconfigure_seconds", "Applying a changed SIP config", {"mode": mode}).observe(
+            time.perf_counter() - started)
+        logging.info(f"SIP config applied ({mode})")
+        log_json("configured", {"success": True, "changed": True, "mode": mode})
+
+def apply_pending_config():
+    """Applies a configure that waited for the call to end (on its own thread, as
+    this runs on the event readers and swap_account() waits for ctrl_tcp)."""
+    global pending_config
+    config = pending_config
+    if config is not None and not active_call:
+        pending_config = None
+        threading.Thread(target=configure, args=(config,), daemon=True).start()
+
+def control(command, params=None):
+    """Runs a command over ctrl_tcp: True if it worked, False if it failed
+    (and was reported), None when ctrl_tcp isn't connected."""
+    client = ctrl
+    if client is None:
+        return None
+    try:
+        client.command(command, params)
+        return True
+    except baresip_ctrl.CtrlError as e:
+        log_json("error", {"message": f"{command} failed: {e}"})
+        return False
+
+def handle_command(line):
     try:
         cmd_obj = json.loads(line)
+    except ValueError as e:
+        log_json("error", {"message": f"Command processing error: {str(e)}"})
+        return
+    run_command(cmd_obj)
+
+def run_command(cmd_obj):
+    try:
         cmd = cmd_obj.get("cmd")
         
         if cmd == "configure":
-            config = cmd_obj.get("config", {})
-            if create_baresip_config(config):
-                # Start or Restart Baresip
-                if child and child.isalive():
-                    child.close()
-                
-                # Start baresip
-                # Force config path to ~/.baresip just to be explicit/safe
-                home_dir = os.path.expanduser("~")
-                baresip_dir = os.path.join(home_dir, ".baresip")
-                
-                logging.info(f"Starting baresip with config from {baresip_dir}")
-                child = pexpect.spawn(f'baresip -f "{baresip_dir}"', timeout=0.1)
-                log_json("configured", {"success": True})
-            else:
-                 log_json("error", {"message": "Invalid config"})
+            configure(cmd_obj.get("config", {}))
                 
         if cmd == "dial":
             if child and child.isalive():
                 uri = cmd_obj.get("uri")
                 if uri:
-                    # 'd' triggers "Dial: " prompt
-                    child.send("d")
-                    # Wait a tiny bit for prompt?
-                    time.sleep(0.1)
-                    child.sendline(uri)
-                    log_json("dialing", {"uri": uri})
+                    sent = control("dial", uri)
+                    if sent is None:
+                        # stdio menu: 'd' triggers "Dial: " prompt
+                        child.send("d")
+                        # Wait a tiny bit for prompt?
+                        time.sleep(0.1)
+                        child.sendline(uri)
+                    if sent is not False:
+                        log_json("dialing", {"uri": uri})
             else:
                 log_json("error", {"message": "Baresip not running"})
 
         elif cmd == "hangup":
             if child and child.isalive():
-                child.send("b") 
+                if control("hangup") is None:
+                    child.send("b")
                 
         elif cmd == "answer":
             if child and child.isalive():
-                child.send("a")
-                log_json("answered", {})
+                sent = control("accept")
+                if sent is None:
+                    child.send("a")
+                if sent is not False:
+                    log_json("answered", {})
+
+        elif cmd == "stop":
+            # SIP disabled; keep the bridge itself running
+            stop_baresip()
 
         elif cmd == "quit":
-            if child:
-                child.close()
+            stop_baresip()
             sys.exit(0)
 
     except Exception as e:
         log_json("error", {"message": f"Command processing error: {str(e)}"})
         logging.error(f"Error: {e}")
 
+def ipc_reader():
+    """Runs commands that server.js sends over IPC."""
+    for header, _ in ipc.frames():
+        run_command(header)
+
+def run_hosted():
+    """Entry point inside hardware_service.py.
+
+    Commands only come over IPC. When the connection drops baresip is stopped
+    and ConnectionError raised, so the service restarts us and server.js sends
+    the configuration again once we are back.
+    """
+    global ipc
+    ipc = bridge_ipc.connect("sip")
+    if ipc is None:
+        raise ConnectionError("SIP bridge needs the bridge IPC socket when hosted")
+    start_monitor()
+    log_json("ready", {})
+    try:
+        ipc_reader()
+    finally:
+        ipc.close()
+        stop_baresip()
+    raise ConnectionError("Bridge IPC connection closed")
+
 def main():
-    # Start monitor thread
-    t = threading.Thread(target=monitor_baresip)
-    t.daemon = True
-    t.start()
+    global ipc
+    metrics.start("sip_bridge")
+
+    ipc = bridge_ipc.connect("sip")
+    if ipc is not None:
+        threading.Thread(target=ipc_reader, daemon=True).start()
+
+    start_monitor()
     
     log_json("ready", {})
     
@@ -207,8 +561,7 @@ def main():
         except Exception as e:
             logging.error(f"Main loop error: {e}")
             
-    if child:
-        child.close()
+    stop_baresip()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,139 @@
+"""Cold start benchmark for the one-shot printer CLIs.
+
+server.js runs print_label.py and receipt_printer.py discover / status
+every 30 s for device registration, and every print without the hardware
+service, so their start-up cost is paid over and over. This runs each
+subcommand in a fresh interpreter with -X importtime and checks the import
+time against a per-subcommand budget:
+
+    /opt/venv/bin/python3 startup_bench.py             # table, exit 1 if over budget
+    /opt/venv/bin/python3 startup_bench.py --json
+    python3 startup_bench.py --budget-scale 0.2        # on a desktop
+
+Import time is the sum of the top-level entries of the -X importtime
+report, so it covers everything a subcommand imports (the interpreter's
+own start-up included) and doesn't depend on what the command then does.
+Wall time is reported alongside. The commands are pointed at a printer
+that can't exist (USB 0x0000:0x0000): print renders and converts as usual
+and then fails to open the printer, so no hardware is touched. Run it
+with the venv interpreter, a missing library shows up as an error.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+NO_LABEL_PRINTER = "usb://0x0000:0x0000"
+NO_RECEIPT_PRINTER = "usb:0x0000:0x0000"
+
+LABEL = {"title": "Startup bench", "stockId": 1, "expirationDate": "2030-01-01"}
+RECEIPT = {"title": "Startup bench", "text": "Startup bench"}
+
+# (name, argv, import budget in ms on a Raspberry Pi 4, about 5x a desktop).
+# {label}, {receipt} and {config} are replaced by input files in a
+# temporary directory.
+CASES = [
+    ("print_label discover", ["print_label.py", "discover"], 400),
+    ("print_label status", ["print_label.py", "status", "--printer", NO_LABEL_PRINTER], 300),
+    ("print_label configure", ["print_label.py", "configure", NO_LABEL_PRINTER, "{config}"], 700),
+    ("print_label print", ["print_label.py", "print", "{label}", "--printer", NO_LABEL_PRINTER], 900),
+    ("receipt_printer discover", ["receipt_printer.py", "discover"], 400),
+    ("receipt_printer status", ["receipt_printer.py", "status", "--printer", NO_RECEIPT_PRINTER], 400),
+    # python-escpos alone is most of this
+    ("receipt_printer print", ["receipt_printer.py", "print", "{receipt}", "--printer", NO_RECEIPT_PRINTER], 2500),
+]
+
+def import_time(report):
+    """Sums the cumulative microseconds of the top-level imports in an -X importtime report."""
+    total = 0
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        # Nested imports are indented below their parent; the header line has no number
+        if len(parts) != 3 or parts[2].startswith("  "):
+            continue
+        try:
+            total += int(parts[1])
+        except ValueError:
+            continue
+    return total / 1000.0
+
+def run_case(argv, env):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=HERE, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=60)
+    wall = (time.perf_counter() - started) * 1000.0
+    report = proc.stderr
+    error = None
+    for line in (proc.stdout + report).splitlines():
+        # A missing library makes the numbers meaningless, whether the CLI dies or just logs it
+        if "No module named" in line or "Could not import" in line or "library not found" in line:
+            error = line.strip()
+    return import_time(report), wall, error
+
+def bench(repeat, budget_scale, only=None):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="startup_bench.") as tmp:
+        files = {}
+        for key, content in (("label", LABEL), ("receipt", RECEIPT), ("config", {})):
+            files[key] = os.path.join(tmp, f"{key}.json")
+            with open(files[key], "w") as f:
+                json.dump(content, f)
+
+        env = dict(os.environ)
+        # Failed bench prints must not land in the kiosk's real counters
+        env["KIOSK_METRICS_DIR"] = os.path.join(tmp, "metrics")
+        env.pop("KIOSK_IPC_SOCKET", None)
+
+        for name, argv, budget in CASES:
+            if only and not any(name.startswith(o) for o in only):
+                continue
+            argv = [arg.format(**files) for arg in argv]
+            # The first run compiles bytecode, like the very first call on a fresh image
+            run_case(argv, env)
+            imports, walls, error = [], [], None
+            for _ in range(repeat):
+                ms, wall, error = run_case(argv, env)
+                imports.append(ms)
+                walls.append(wall)
+            limit = budget * budget_scale
+            median = statistics.median(imports)
+            results.append({
+                "command": name,
+                "import_ms": round(median, 1),
+                "import_ms_max": round(max(imports), 1),
+                "wall_ms": round(statistics.median(walls), 1),
+                "budget_ms": round(limit, 1),
+                "ok": error is None and median <= limit,
+                "error": error,
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start benchmark for print_label.py / receipt_printer.py')
+    parser.add_argument('commands', nargs='*', help='Only these, e.g. "print_label" or "receipt_printer print"')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per subcommand, the median counts')
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='Multiply the Raspberry Pi 4 budgets, e.g. 0.2 on a desktop')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = bench(max(1, args.repeat), args.budget_scale, args.commands)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'command':<26} {'imports':>9} {'budget':>9} {'wall':>9}")
+        for r in results:
+            status = "ok" if r["ok"] else (r["error"] or "OVER BUDGET")
+            print(f"{r['command']:<26} {r['import_ms']:>7.1f}ms {r['budget_ms']:>7.1f}ms {r['wall_ms']:>7.1f}ms  {status}")
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -89,7 +89,8 @@ echo "Starting Hardware Bridge..."
 cd /bridge
 node server.js > /var/log/bridge.log 2>&1 &
 
-if [ -n "$MQTT_BROKER" ]; then
+# server.js runs MQTT inside hardware_service.py unless KIOSK_HARDWARE_SERVICE=0
+if [ -n "$MQTT_BROKER" ] && [ "$KIOSK_HARDWARE_SERVICE" = "0" ]; then
     echo "Starting MQTT Bridge..."
     /opt/venv/bin/python3 -u mqtt_bridge.py > /var/log/mqtt_bridge.log 2>&1 &
 fi
@@ -0,0 +1,32 @@
+// Checks that the kiosk product cache can sync from a real backend:
+// GET /barcodes/index with the kiosk's token must succeed and return rows.
+//
+//   node scripts/check-product-sync.js https://pantry.example.com <kiosk token>
+//
+// The kiosk token is the one in the bridge's kiosk config (state.token).
+// Exits 1 if the request is rejected or the index is empty.
+const [backendUrl, token] = process.argv.slice(2);
+
+if (!backendUrl || !token) {
+    console.error('Usage: node scripts/check-product-sync.js <backend url> <kiosk token>');
+    process.exit(2);
+}
+
+(async () => {
+    const url = backendUrl.replace(/\/$/, '') + '/barcodes/index';
+    const response = await fetch(url, { headers: { Authorization: `Bearer ${token}` } });
+    if (!response.ok) {
+        console.error(`FAIL: ${url} answered HTTP ${response.status}` +
+            (response.status === 401 ? ' (kiosk token not accepted)' : ''));
+        process.exit(1);
+    }
+    const index = await response.json();
+    if (!Array.isArray(index.rows) || index.rows.length === 0) {
+        console.error('FAIL: the barcode index is empty, product_cache.db would stay empty');
+        process.exit(1);
+    }
+    console.log(`OK: ${index.rows.length} barcode rows, generated at ${index.generatedAt}`);
+})().catch((e) => {
+    console.error(`FAIL: ${e.message}`);
+    process.exit(1);
+});